@@ -0,0 +1,197 @@
+"""Load test for the dashboard server and the Ask the Thesis search path.
+
+Starts ``enhanced_server`` in-process on a free port, then replays a full
+dashboard page load (index, every component, CSS/JS and the images the
+components reference) from several concurrent virtual users, followed by a
+stream of Ask the Thesis queries against ``/api/search``. The search service
+is also timed in-process to separate ranking cost from HTTP overhead.
+Reports p50/p95/p99 latency, throughput and RSS, and writes the results as
+JSON under ``benchmarks/results/``. Requires a built index
+(``python scripts/build_thesis_index.py``).
+
+Usage:
+  python benchmarks/bench_dashboard.py --users 8 --page-loads 20 --queries 500
+  python benchmarks/bench_dashboard.py --compare benchmarks/results/dashboard-<stamp>.json
+"""
+
+from __future__ import annotations
+import argparse
+import http.client
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import quote, urljoin
+
+from bench_utils import ROOT, Timer, compare_results, current_rss_mb, summarize_latencies, write_results
+
+import enhanced_server
+from thesis_search import load_search
+
+DASHBOARD_DIR = ROOT / "dashboard"
+ASSET_RE = re.compile(r'(?:src|href)="([^"#]+)"')
+
+# Questions offered by components/ask.html plus typical free-form variants
+DEFAULT_QUERIES = [
+    "What were the exclusion criteria?",
+    "How was data collected?",
+    "What statistical methods were used?",
+    "Summarize the main findings.",
+    "Which histopathological pattern was most common?",
+    "How does age correlate with endometrial hyperplasia?",
+    "What is the role of hormonal drug intake?",
+    "Describe the PALM-COEIN classification of abnormal uterine bleeding.",
+]
+
+
+def dashboard_page_urls() -> List[str]:
+    """URLs fetched by a browser for one complete dashboard page load."""
+    urls = ["/dashboard/", "/dashboard/index.html"]
+    html_files = [DASHBOARD_DIR / "index.html"] + sorted((DASHBOARD_DIR / "components").glob("*.html"))
+    for html in html_files:
+        if html.parent.name == "components":
+            urls.append(f"/dashboard/components/{html.name}")
+        for ref in ASSET_RE.findall(html.read_text(encoding="utf-8", errors="ignore")):
+            if ref.startswith(("http:", "https:", "mailto:", "javascript:", "data:")):
+                continue
+            # Components are injected into index.html, so resolve against /dashboard/
+            url = urljoin("/dashboard/", ref)
+            if url not in urls:
+                urls.append(url)
+    return [quote(u, safe="/:?=&%") for u in urls]
+
+
+def fetch(conn: http.client.HTTPConnection, url: str) -> int:
+    conn.request("GET", url)
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def run_page_loads(port: int, users: int, page_loads: int) -> Dict:
+    """Replay ``page_loads`` dashboard loads spread across ``users`` connections."""
+    urls = dashboard_page_urls()
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    lock = threading.Lock()
+
+    def user(loads: int):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local, local_status = [], {}
+        for _ in range(loads):
+            for url in urls:
+                start = time.perf_counter()
+                status = fetch(conn, url)
+                local.append(time.perf_counter() - start)
+                local_status[status] = local_status.get(status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            for status, count in local_status.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    shares = [page_loads // users + (1 if i < page_loads % users else 0) for i in range(users)]
+    with Timer() as timer, ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, [s for s in shares if s]))
+    summary = summarize_latencies(latencies, timer.seconds)
+    summary["urls_per_page"] = len(urls)
+    summary["pages_per_sec"] = round(page_loads / timer.seconds, 2) if timer.seconds else 0.0
+    summary["status_counts"] = {str(k): v for k, v in sorted(statuses.items())}
+    return summary
+
+
+def run_queries(port: int, users: int, num_queries: int, queries: List[str]) -> Dict:
+    """Send ``num_queries`` Ask the Thesis queries to ``/api/search`` from ``users`` connections."""
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    lock = threading.Lock()
+
+    def user(indices: List[int]):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local, local_status = [], {}
+        for i in indices:
+            url = enhanced_server.SEARCH_PATH + "?q=" + quote(queries[i % len(queries)])
+            start = time.perf_counter()
+            status = fetch(conn, url)
+            local.append(time.perf_counter() - start)
+            local_status[status] = local_status.get(status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            for status, count in local_status.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    with Timer() as timer, ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, [list(range(u, num_queries, users)) for u in range(users)]))
+    summary = summarize_latencies(latencies, timer.seconds)
+    summary["status_counts"] = {str(k): v for k, v in sorted(statuses.items())}
+    return summary
+
+
+def run_search_service(num_queries: int, queries: List[str], backend: str) -> Dict:
+    """Time the search service in-process, without HTTP overhead."""
+    with Timer() as timer:
+        service = load_search(backend=backend)
+    latencies: List[float] = []
+    with Timer() as wall:
+        for i in range(num_queries):
+            start = time.perf_counter()
+            service.answer(queries[i % len(queries)])
+            latencies.append(time.perf_counter() - start)
+    summary = summarize_latencies(latencies, wall.seconds)
+    summary["index_load_seconds"] = round(timer.seconds, 4)
+    summary["passages"] = len(service.documents)
+    summary["backend"] = type(service).__name__
+    if hasattr(service, "search_batch"):
+        batch = [queries[i % len(queries)] for i in range(num_queries)]
+        with Timer() as batch_timer:
+            service.search_batch(batch)
+        summary["batch_throughput_per_sec"] = round(num_queries / batch_timer.seconds, 2) if batch_timer.seconds else 0.0
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard server and search load test")
+    parser.add_argument("--users", type=int, default=4, help="Concurrent virtual users")
+    parser.add_argument("--page-loads", type=int, default=10, help="Total dashboard page loads to replay")
+    parser.add_argument("--queries", type=int, default=200, help="Total Ask the Thesis queries to run")
+    parser.add_argument("--queries-file", type=Path, help="Text file with one query per line")
+    parser.add_argument("--backend", choices=["auto", "python", "sparse"], default="auto", help="Scoring backend for the in-process search timing")
+    parser.add_argument("--output", type=Path, help="Where to write the JSON results")
+    parser.add_argument("--compare", type=Path, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        queries = [q.strip() for q in args.queries_file.read_text(encoding="utf-8").splitlines() if q.strip()]
+
+    results: Dict = {"config": {"users": args.users, "page_loads": args.page_loads, "queries": args.queries}}
+    results["rss_start_mb"] = current_rss_mb()
+
+    httpd = enhanced_server.create_server(0, directory=str(ROOT))
+    port = httpd.server_address[1]
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    print(f"[bench] Server listening on port {port}")
+    try:
+        results["page_load"] = run_page_loads(port, args.users, args.page_loads)
+        print(f"[bench] page_load: {results['page_load']}")
+        results["search"] = run_queries(port, args.users, args.queries, queries)
+        print(f"[bench] search: {results['search']}")
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    results["search_service"] = run_search_service(args.queries, queries, args.backend)
+    print(f"[bench] search_service: {results['search_service']}")
+    results["rss_end_mb"] = current_rss_mb()
+
+    write_results("dashboard", results, args.output)
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
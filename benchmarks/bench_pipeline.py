@@ -0,0 +1,114 @@
+"""Microbenchmarks for the offline pipelines.
+
+Times the stages of ``scripts/build_thesis_index.py`` (reading, tokenizing,
+IDF and serialization) and of the chart pipeline in
+``scripts/thesis_analysis.py`` (data cleaning and every chart builder, written
+to a temporary directory so ``figures/`` is never touched). Each stage is run
+``--repeat`` times and the results are written as JSON under
+``benchmarks/results/``. ``--data`` runs the chart pipeline on another
+register, e.g. a large one from ``scripts/synthetic_masterchart.py``.
+
+Usage:
+  python benchmarks/bench_pipeline.py --mode index --repeat 5
+  python benchmarks/bench_pipeline.py --mode charts --repeat 1
+  python benchmarks/bench_pipeline.py --mode charts --data data/synthetic/parquet/Masterchart-1000000-seed0.parquet
+  python benchmarks/bench_pipeline.py --compare benchmarks/results/pipeline-<stamp>.json
+"""
+
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from bench_utils import ROOT, compare_results, current_rss_mb, summarize_latencies, write_results
+
+DATA_PATH = ROOT / "data" / "Masterchart.csv"
+
+
+def time_stage(func: Callable, repeat: int) -> Dict:
+    """Run ``func`` ``repeat`` times and summarize the timings."""
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    summary = summarize_latencies(timings, sum(timings))
+    summary["seconds"] = round(min(timings), 6)
+    return summary
+
+
+def bench_index(repeat: int) -> Dict:
+    """Stage timings for the thesis index builder."""
+    import build_thesis_index as bti
+
+    results: Dict = {}
+    texts = [p.read_bytes().splitlines(keepends=True) for p in sorted(bti.MANUSCRIPT_DIR.glob("*.md"))]
+    results["index.parse_markdown"] = time_stage(lambda: [list(bti.parse_markdown(t)) for t in texts], repeat)
+    paragraphs = [p["text"] for t in texts for p in bti.parse_markdown(t)]
+    results["index.tokenize"] = time_stage(lambda: [bti.tokenize(p) for p in paragraphs], repeat)
+    results["index.build_documents"] = time_stage(bti.build_documents, repeat)
+    documents, doc_freq = bti.build_documents()
+    results["index.compute_idf"] = time_stage(lambda: bti.compute_idf(doc_freq, len(documents)), repeat)
+    payload = {"documents": documents, "idf": bti.compute_idf(doc_freq, len(documents))}
+    results["index.serialize"] = time_stage(lambda: json.dumps(payload, ensure_ascii=False, indent=2), repeat)
+    results["index.size"] = {
+        "passages": len(documents),
+        "vocabulary": len(doc_freq),
+        "json_bytes": len(json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")),
+    }
+    return results
+
+
+def bench_charts(repeat: int, data_path: Path = DATA_PATH) -> Dict:
+    """Stage timings for data cleaning and each chart builder."""
+    import matplotlib
+    matplotlib.use("Agg")
+    start = time.perf_counter()
+    import thesis_analysis as ta
+    results: Dict = {"charts.import": {"seconds": round(time.perf_counter() - start, 6)}}
+
+    results["charts.load_and_clean_data"] = time_stage(lambda: ta.load_and_clean_data(str(data_path)), repeat)
+    df = ta.load_and_clean_data(str(data_path))
+    results["charts.rows"] = {"rows": len(df)}
+    ta.set_plot_style()
+    with tempfile.TemporaryDirectory() as figures_dir:
+        for name, chart in ta.CHARTS.items():
+            # The chart builders print progress for every file; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[f"charts.{name}"] = time_stage(
+                    lambda: chart["builder"](df, figures_dir, **chart["kwargs"]), repeat)
+            print(f"[bench] charts.{name}: {results[f'charts.{name}']['seconds']:.3f}s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index builder and chart pipeline microbenchmarks")
+    parser.add_argument("--mode", choices=["index", "charts", "all"], default="all")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage (best run is reported as 'seconds')")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="Register for the chart pipeline (CSV, XLSX or Parquet)")
+    parser.add_argument("--output", type=Path, help="Where to write the JSON results")
+    parser.add_argument("--compare", type=Path, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    results: Dict = {"config": {"mode": args.mode, "repeat": args.repeat, "data": str(args.data)}}
+    if args.mode in ("index", "all"):
+        results.update(bench_index(args.repeat))
+    if args.mode in ("charts", "all"):
+        results.update(bench_charts(args.repeat, args.data))
+    results["rss_end_mb"] = current_rss_mb()
+
+    for name, values in results.items():
+        if isinstance(values, dict) and "seconds" in values:
+            print(f"[bench] {name:<36} {values['seconds'] * 1000:10.2f} ms")
+    write_results("pipeline", results, args.output)
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
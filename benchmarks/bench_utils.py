@@ -0,0 +1,122 @@
+"""Shared helpers for the dashboard and pipeline benchmarks.
+
+Provides latency summaries, process memory readings and JSON result files
+that can be compared across runs to spot regressions.
+"""
+
+from __future__ import annotations
+import json
+import math
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = ROOT / "scripts"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Make the server module and the scripts importable from the benchmarks
+for _path in (ROOT, SCRIPTS_DIR):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100.0 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+def summarize_latencies(latencies: List[float], wall_seconds: float) -> Dict[str, float]:
+    """Summarize per-operation latencies (seconds) as milliseconds plus throughput."""
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "count": count,
+        "wall_seconds": round(wall_seconds, 4),
+        "throughput_per_sec": round(count / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "mean_ms": round(1000 * sum(values) / count, 3) if count else 0.0,
+        "p50_ms": round(1000 * percentile(values, 50), 3),
+        "p95_ms": round(1000 * percentile(values, 95), 3),
+        "p99_ms": round(1000 * percentile(values, 99), 3),
+        "max_ms": round(1000 * values[-1], 3) if count else 0.0,
+    }
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size of this process in MiB, if it can be determined."""
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 2)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return peak_rss_mb()
+    return round(psutil.Process().memory_info().rss / 2**20, 2)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MiB, if it can be determined."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    divisor = 2**20 if sys.platform == "darwin" else 2**10
+    return round(peak / divisor, 2)
+
+
+class Timer:
+    """Context manager measuring wall-clock seconds."""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        return False
+
+
+def write_results(name: str, results: Dict, output: Optional[Path] = None) -> Path:
+    """Write a benchmark result document as JSON and return its path."""
+    payload = {
+        "benchmark": name,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{name}-{stamp}.json"
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    print(f"[bench] Results written to {output}")
+    return output
+
+
+def compare_results(baseline_path: Path, current: Dict, metrics=("p50_ms", "p95_ms", "p99_ms", "throughput_per_sec", "seconds")) -> None:
+    """Print relative changes between a saved baseline and the current results."""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))["results"]
+    print(f"\n[bench] Comparison against {baseline_path}")
+    for section, values in current.items():
+        old = baseline.get(section)
+        if not isinstance(values, dict) or not isinstance(old, dict):
+            continue
+        for metric in metrics:
+            if metric in values and old.get(metric):
+                change = 100.0 * (values[metric] - old[metric]) / old[metric]
+                print(f"  {section:<32} {metric:<20} {old[metric]:>10} -> {values[metric]:>10} ({change:+.1f}%)")
@@ -0,0 +1,231 @@
+"""Retrieval quality and latency of an Ask the Thesis index build.
+
+Runs every question of a golden file (default: ``golden_questions.json``, the
+questions of ``components/ask.html`` plus typical variants, each with the
+passages that answer it) against an index build and ranking backend, and
+reports:
+
+- recall@k (share of a question's relevant passages in its top k), hit@k
+  (share of questions with a relevant passage in the top k) and MRR (mean
+  reciprocal rank of the first relevant passage)
+- per-query latency of tokenizing and ranking, over ``--repeat`` runs, and
+  the wall time of ranking all questions in one batch (sparse backends)
+
+``--baseline-index``/``--baseline-backend`` evaluate a second build or backend
+in the same run, and ``--compare`` a results file of an earlier run; both are
+printed side by side with the current build, question by question. Results are
+written as JSON under ``benchmarks/results/``.
+
+An index is given as a ``thesis_index.json`` path, a published version
+directory or a version name from ``python scripts/publish.py --list``. The
+``lsa`` backend needs an index built with ``build_thesis_index.py --lsa``.
+
+Usage:
+  python benchmarks/eval_retrieval.py
+  python benchmarks/eval_retrieval.py --backend lsa --baseline-backend sparse
+  python benchmarks/eval_retrieval.py --index 20261019T185305933470 --baseline-index dashboard/thesis_index.json
+  python benchmarks/eval_retrieval.py --compare benchmarks/results/retrieval-<stamp>.json
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from bench_utils import percentile, summarize_latencies, write_results
+
+from build_thesis_index import published_index_path
+from publish import INDEX_ARTIFACT
+from thesis_search import load_search
+
+GOLDEN_PATH = Path(__file__).resolve().parent / "golden_questions.json"
+DEFAULT_K = (1, 3, 5, 10)
+BACKENDS = ["auto", "python", "sparse", "lsa"]
+
+
+def resolve_index(spec: Optional[str]) -> Path:
+    """Index file of a path, version directory or published version name."""
+    if not spec:
+        return published_index_path()
+    path = Path(spec)
+    if not path.exists() and (INDEX_ARTIFACT / "versions" / spec).is_dir():
+        path = INDEX_ARTIFACT / "versions" / spec
+    if path.is_dir():
+        path = path / "thesis_index.json"
+    if not path.is_file():
+        raise SystemExit(f"No index at {path}")
+    return path
+
+
+def load_golden(path: Path) -> List[Dict]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))["questions"]
+
+
+def matches(doc: Dict, matcher: Dict) -> bool:
+    """Whether a passage satisfies every key of a golden 'relevant' entry."""
+    if "id" in matcher and doc["id"] != matcher["id"]:
+        return False
+    if "section" in matcher:
+        section = " › ".join(doc.get("section_path") or [doc.get("section") or ""])
+        if matcher["section"].lower() not in section.lower():
+            return False
+    return "text" not in matcher or matcher["text"].lower() in doc["text"].lower()
+
+
+def relevant_passages(documents: List[Dict], golden: List[Dict]) -> List[set]:
+    """Document numbers of the relevant passages of every golden question."""
+    return [{i for i, doc in enumerate(documents) if any(matches(doc, m) for m in q["relevant"])}
+            for q in golden]
+
+
+def evaluate(index_path: Path, backend: str, golden: List[Dict], ks=DEFAULT_K, repeat: int = 20,
+             lsa_weight: float | None = None) -> Dict:
+    """Quality metrics and latencies of one index build and backend."""
+    start = time.perf_counter()
+    try:
+        service = load_search(index_path, backend)
+    except ValueError as e:
+        # e.g. --backend lsa on an index built without build_thesis_index.py --lsa
+        raise SystemExit(f"Cannot load {index_path} with the {backend} backend: {e}")
+    load_seconds = time.perf_counter() - start
+    if lsa_weight is not None and hasattr(service, "weight"):
+        service.weight = lsa_weight
+    relevant = relevant_passages(service.documents, golden)
+    depth = max(ks)
+
+    questions: List[Dict] = []
+    samples: List[float] = []
+    for q, rel in zip(golden, relevant):
+        tokens = service.tokenize(q["question"])
+        ranked = [i for _, i in service.rank(tokens, depth)]
+        timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            service.rank(service.tokenize(q["question"]), depth)
+            timings.append(time.perf_counter() - t0)
+        samples.extend(timings)
+        timings.sort()
+        first = next((r for r, i in enumerate(ranked, 1) if i in rel), None)
+        entry = {
+            "question": q["question"],
+            "relevant": len(rel),
+            "first_relevant_rank": first,
+            "reciprocal_rank": round(1.0 / first, 4) if first else 0.0,
+            "top": [service.documents[i]["id"] for i in ranked[:5]],
+            "p50_ms": round(1000 * percentile(timings, 50), 3),
+            "p95_ms": round(1000 * percentile(timings, 95), 3),
+        }
+        for k in ks:
+            hits = len(rel.intersection(ranked[:k]))
+            entry[f"recall@{k}"] = round(hits / len(rel), 4) if rel else 0.0
+        questions.append(entry)
+
+    count = len(questions) or 1
+    metrics = {"mrr": round(sum(q["reciprocal_rank"] for q in questions) / count, 4)}
+    for k in ks:
+        metrics[f"recall@{k}"] = round(sum(q[f"recall@{k}"] for q in questions) / count, 4)
+        metrics[f"hit@{k}"] = round(sum(1 for q in questions if q["first_relevant_rank"]
+                                        and q["first_relevant_rank"] <= k) / count, 4)
+    unanswerable = [q["question"] for q, rel in zip(golden, relevant) if not rel]
+
+    results = {
+        "config": {
+            "index": str(index_path),
+            "built_at": service.meta.get("built_at"),
+            "backend": type(service).__name__,
+            "lsa_weight": getattr(service, "weight", None),
+            "passages": len(service.documents),
+            "questions": len(golden),
+            "repeat": repeat,
+            "load_seconds": round(load_seconds, 4),
+        },
+        "metrics": metrics,
+        "latency": summarize_latencies(samples, sum(samples)),
+        "questions": questions,
+    }
+    if unanswerable:
+        results["config"]["no_relevant_passages"] = unanswerable
+    if hasattr(service, "rank_batch"):
+        token_lists = [service.tokenize(q["question"]) for q in golden]
+        walls = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            service.rank_batch(token_lists, depth)
+            walls.append(time.perf_counter() - t0)
+        results["batch"] = summarize_latencies(walls, sum(walls))
+        results["batch"]["per_query_ms"] = round(1000 * min(walls) / count, 4)
+    return results
+
+
+def print_results(results: Dict):
+    config, latency = results["config"], results["latency"]
+    print(f"[eval] {config['backend']} on {config['index']} ({config['passages']} passages)")
+    for q in results["questions"]:
+        rank = q["first_relevant_rank"] or "-"
+        print(f"  {str(rank):>3}  {q['p50_ms']:8.3f} ms  {q['question']}")
+    print("  " + "  ".join(f"{name}={value:.3f}" for name, value in results["metrics"].items()))
+    print(f"  latency p50={latency['p50_ms']} ms p95={latency['p95_ms']} ms p99={latency['p99_ms']} ms")
+    if "batch" in results:
+        print(f"  batch of {config['questions']}: {results['batch']['p50_ms']} ms "
+              f"({results['batch']['per_query_ms']} ms per query)")
+    for question in config.get("no_relevant_passages", []):
+        print(f"  ! no passage of this build matches the golden entry of: {question}")
+
+
+def print_diff(current: Dict, baseline: Dict, label: str):
+    """Side-by-side rank of the first relevant passage, latency and metrics of two runs."""
+    print(f"\n[eval] {current['config']['backend']} ({current['config']['index']})"
+          f" vs {label}: {baseline['config']['backend']} ({baseline['config']['index']})")
+    print(f"  {'rank':>4} {'base':>4}  {'p50 ms':>8} {'base':>8}  question")
+    before = {q["question"]: q for q in baseline["questions"]}
+    for q in current["questions"]:
+        old = before.get(q["question"])
+        if old is None:
+            continue
+        rank, old_rank = q["first_relevant_rank"] or 0, old["first_relevant_rank"] or 0
+        marker = " " if rank == old_rank else ("+" if rank and (not old_rank or rank < old_rank) else "-")
+        print(f"{marker} {rank or '-':>4} {old_rank or '-':>4}  {q['p50_ms']:8.3f} {old['p50_ms']:8.3f}  {q['question']}")
+    rows = [(name, value, baseline["metrics"].get(name)) for name, value in current["metrics"].items()]
+    rows += [(f"latency {name}", current["latency"][name], baseline["latency"].get(name))
+             for name in ("p50_ms", "p95_ms", "p99_ms")]
+    for name, value, old in rows:
+        if old is None:
+            continue
+        change = f"({100.0 * (value - old) / old:+.1f}%)" if old else ""
+        print(f"  {name:<18} {old:>10} -> {value:>10} {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and latency on golden questions")
+    parser.add_argument("--golden", type=Path, default=GOLDEN_PATH, help="Golden question file")
+    parser.add_argument("--index", help="Index file, version directory or version name (default: published)")
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    parser.add_argument("--lsa-weight", type=float, help="Override the LSA weight of an lsa backend")
+    parser.add_argument("--baseline-index", help="Second build to evaluate side by side")
+    parser.add_argument("--baseline-backend", choices=BACKENDS, help="Backend of the second run (default: --backend)")
+    parser.add_argument("-k", type=int, nargs="+", default=list(DEFAULT_K), help="Cutoffs for recall@k/hit@k")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per question")
+    parser.add_argument("--output", type=Path, help="Where to write the JSON results")
+    parser.add_argument("--compare", type=Path, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    golden = load_golden(args.golden)
+    ks = sorted(set(args.k))
+    results = evaluate(resolve_index(args.index), args.backend, golden, ks, args.repeat, args.lsa_weight)
+    print_results(results)
+    if args.baseline_index or args.baseline_backend:
+        index = resolve_index(args.baseline_index or args.index)
+        results["baseline"] = evaluate(index, args.baseline_backend or args.backend, golden, ks, args.repeat)
+        print()
+        print_results(results["baseline"])
+        print_diff(results, results["baseline"], "baseline")
+    write_results("retrieval", results, args.output)
+    if args.compare:
+        saved = json.loads(args.compare.read_text(encoding="utf-8"))["results"]
+        print_diff(results, saved, str(args.compare))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,21 @@
 /**
  * Advanced Visualizations JavaScript
- * Handles functionality for the advanced visualization component
+ * Handles functionality for the advanced visualization component.
+ *
+ * Interactive charts are exported by thesis_analysis.py as compact plotly
+ * figure specs (figures/specs/*.json). They are rendered into their containers
+ * by a single plotly.js runtime that the dashboard server serves (and browsers
+ * cache) at PLOTLY_RUNTIME_URLS[0], loaded once on first use. Servers without
+ * that route (start_dashboard_server.py, scripts/serve_dashboard.py) fall back
+ * to the CDN build of the version bundled with the plotly package.
  */
 
+const PLOTLY_RUNTIME_URLS = [
+    '/vendor/plotly.min.js',
+    'https://cdn.plot.ly/plotly-4.1.1.min.js'
+];
+let plotlyRuntime = null;
+
 document.addEventListener('DOMContentLoaded', function() {
     // Wait for components to be fully loaded
     setTimeout(initAdvancedVisualizations, 500);
@@ -22,27 +35,116 @@ function initAdvancedVisualizations() {
         });
     });
 
-    // Handle iframe loading states
-    document.querySelectorAll('.visualization-container iframe').forEach(iframe => {
-        // Add loading indicator
-        const container = iframe.parentElement;
-        const loadingIndicator = document.createElement('div');
-        loadingIndicator.className = 'loading-indicator absolute inset-0 flex items-center justify-center bg-gray-100 bg-opacity-70 dark:bg-gray-800 dark:bg-opacity-70';
-        loadingIndicator.innerHTML = '<div class="loader"></div><span class="ml-2">Loading visualization...</span>';
-        container.style.position = 'relative';
-        container.appendChild(loadingIndicator);
-
-        // Remove loading indicator when iframe loads
-        iframe.addEventListener('load', function() {
-            const indicator = this.parentElement.querySelector('.loading-indicator');
-            if (indicator) {
-                indicator.style.opacity = '0';
-                setTimeout(() => {
-                    indicator.remove();
-                }, 500);
+    const figures = document.querySelectorAll('.visualization-container .plotly-figure[data-spec]');
+    figures.forEach(addLoadingIndicator);
+
+    // Render each figure when it scrolls near the viewport
+    if ('IntersectionObserver' in window) {
+        const observer = new IntersectionObserver((entries) => {
+            entries.forEach(entry => {
+                if (entry.isIntersecting) {
+                    observer.unobserve(entry.target);
+                    renderFigureSpec(entry.target);
+                }
+            });
+        }, { rootMargin: '200px' });
+        figures.forEach(figure => observer.observe(figure));
+    } else {
+        figures.forEach(renderFigureSpec);
+    }
+
+    console.log('Advanced visualizations initialized');
+}
+
+/**
+ * Load a script into the page
+ * @param {string} src - Script URL
+ * @returns {Promise<void>}
+ */
+function loadScript(src) {
+    return new Promise((resolve, reject) => {
+        const script = document.createElement('script');
+        script.src = src;
+        script.async = true;
+        script.onload = () => resolve();
+        script.onerror = () => {
+            script.remove();
+            reject(new Error(`Could not load ${src}`));
+        };
+        document.head.appendChild(script);
+    });
+}
+
+/**
+ * Load the shared plotly.js runtime once, trying each runtime URL in turn
+ * @returns {Promise<Object>} The Plotly global
+ */
+function loadPlotlyRuntime() {
+    if (window.Plotly) {
+        return Promise.resolve(window.Plotly);
+    }
+    if (!plotlyRuntime) {
+        plotlyRuntime = PLOTLY_RUNTIME_URLS.reduce(
+            (loaded, url) => loaded.then(() => window.Plotly || loadScript(url).catch(error => console.warn(error.message))),
+            Promise.resolve()
+        ).then(() => {
+            if (!window.Plotly) {
+                throw new Error('plotly.js did not load');
             }
+            return window.Plotly;
+        }).catch(error => {
+            plotlyRuntime = null;  // allow a retry
+            throw error;
         });
-    });
+    }
+    return plotlyRuntime;
+}
 
-    console.log('Advanced visualizations initialized');
-}
\ No newline at end of file
+/**
+ * Fetch a figure spec and render it into its container
+ * @param {HTMLElement} container - Element with a data-spec URL
+ */
+async function renderFigureSpec(container) {
+    try {
+        const [Plotly, spec] = await Promise.all([
+            loadPlotlyRuntime(),
+            fetch(container.dataset.spec).then(response => {
+                if (!response.ok) {
+                    throw new Error(`${container.dataset.spec}: HTTP ${response.status}`);
+                }
+                return response.json();
+            })
+        ]);
+        // Fit the container instead of the fixed size used for the exported pages
+        const layout = Object.assign({}, spec.layout || {}, { autosize: true });
+        delete layout.width;
+        delete layout.height;
+        await Plotly.newPlot(container, spec.data || [], layout, { responsive: true, displaylogo: false });
+        removeLoadingIndicator(container);
+    } catch (error) {
+        console.error('Failed to render visualization:', error);
+        removeLoadingIndicator(container);
+        if (typeof showVisualizationFallback === 'function') {
+            showVisualizationFallback(container);
+        }
+    }
+}
+
+function addLoadingIndicator(figure) {
+    const container = figure.parentElement;
+    const loadingIndicator = document.createElement('div');
+    loadingIndicator.className = 'loading-indicator absolute inset-0 flex items-center justify-center bg-gray-100 bg-opacity-70 dark:bg-gray-800 dark:bg-opacity-70';
+    loadingIndicator.innerHTML = '<div class="loader"></div><span class="ml-2">Loading visualization...</span>';
+    container.style.position = 'relative';
+    container.appendChild(loadingIndicator);
+}
+
+function removeLoadingIndicator(figure) {
+    const indicator = figure.parentElement.querySelector('.loading-indicator');
+    if (indicator) {
+        indicator.style.opacity = '0';
+        setTimeout(() => {
+            indicator.remove();
+        }, 500);
+    }
+}
@@ -1,11 +1,11 @@
 /**
  * Ask the Thesis - Retrieval Augmented Local Answering
  * Replaces static sample responses with client-side lexical retrieval using a TF-IDF index.
- * Index file: ../thesis_index.json (generated by scripts/build_thesis_index.py)
+ * Index file: dashboard/thesis_index.json (generated by scripts/build_thesis_index.py)
  */
 
 const ASK_THESIS_CONFIG = {
-    indexPath: '../thesis_index.json', // relative to dashboard root when component loaded inside index.html
+    indexPath: 'thesis_index.json', // relative to dashboard/index.html, which loads the component
     maxPassages: 5,
     contributionTopK: 3,
     debug: false,
@@ -16,6 +16,9 @@ const ASK_THESIS_CONFIG = {
 let THESIS_INDEX = null; // loaded JSON
 let IDF = null;          // idf mapping
 let PASSAGES = [];        // documents array
+let NORMALIZATION = null; // token pipeline recorded by the builder (meta.normalization)
+let SPELLING = null;      // spelling table (meta.spelling), fetched with the first query that has an unknown word
+let SPELLING_REQUEST = null;
 
 // Stopword list (keep light to reduce payload) - mirrors Python builder (subset)
 const STOPWORDS = new Set(["the","a","an","and","or","of","to","in","for","on","with","is","are","was","were","be","by","as","that","this","it","at","from","we","our","their","there","which","these","those","has","had","have","but","not","can","may","also","than","such","its","into","using","used","between","more","most"]);
@@ -46,6 +49,9 @@ async function loadIndex() {
         THESIS_INDEX = await res.json();
         PASSAGES = THESIS_INDEX.documents || [];
         IDF = THESIS_INDEX.idf || {};
+        NORMALIZATION = (THESIS_INDEX.meta && THESIS_INDEX.meta.normalization) || null;
+        SPELLING = null;
+        SPELLING_REQUEST = null;
         if (ASK_THESIS_CONFIG.debug && debugEl) {
             debugEl.classList.remove('hidden');
             debugEl.textContent = '[Index Loaded] passages=' + PASSAGES.length;
@@ -60,10 +66,142 @@ async function loadIndex() {
 }
 
 function tokenize(text) {
+    // Replays the builder's normalization pipeline: synonyms -> stopwords -> stemming
+    return stemWords(surfaceWords(text));
+}
+
+function surfaceWords(text) {
     if (!text) return [];
-    return (text.match(TOKEN_RE) || [])
-        .map(t => t.toLowerCase())
-        .filter(t => !STOPWORDS.has(t) && t.length > 2);
+    const synonyms = (NORMALIZATION && NORMALIZATION.synonyms) || {};
+    const tokens = [];
+    (text.match(TOKEN_RE) || []).forEach(raw => {
+        const t = raw.toLowerCase();
+        if (synonyms[t]) tokens.push(...synonyms[t].split(' ')); else tokens.push(t);
+    });
+    return tokens.filter(t => !STOPWORDS.has(t) && t.length > 2);
+}
+
+function stemWords(words) {
+    return NORMALIZATION && NORMALIZATION.stem ? words.map(t => stemToken(t, NORMALIZATION.stem_rules)) : words;
+}
+
+/**
+ * Tokenize a question, correcting misspelled words before stemming (mirrors ThesisSearch.tokenize)
+ * @returns {{tokens: string[], corrections: Object}} tokens and a misspelled word -> correction map
+ */
+async function tokenizeQuery(text) {
+    const words = surfaceWords(text);
+    if (stemWords(words).some(t => !IDF[t])) await loadSpelling();
+    const corrections = {};
+    const corrected = words.map(w => {
+        const fix = correctWord(w);
+        if (fix) corrections[w] = fix;
+        return fix || w;
+    });
+    return {tokens: stemWords(corrected), corrections};
+}
+
+async function loadSpelling() {
+    const spelling = THESIS_INDEX.meta && THESIS_INDEX.meta.spelling;
+    if (SPELLING || !spelling) return;
+    if (!SPELLING_REQUEST) {
+        // The table sits next to the index it was built with
+        const index = THESIS_INDEX;
+        const url = ASK_THESIS_CONFIG.indexPath.replace(/[^/]*$/, spelling.file);
+        SPELLING_REQUEST = fetch(url + '?v=' + Date.now())
+            .then(res => { if (!res.ok) throw new Error('HTTP ' + res.status); return res.json(); })
+            .then(table => {
+                if (index !== THESIS_INDEX) return;
+                SPELLING = table;
+                SPELLING.vocabulary = new Set([...table.words, ...(table.known || [])]);
+                SPELLING.cache = new Map();
+            })
+            .catch(err => console.warn('[AskThesis] Spelling table unavailable', err));
+    }
+    await SPELLING_REQUEST;
+}
+
+/**
+ * Closest scored word to a misspelled one via the symmetric-delete table (mirrors SpellCorrector.correction)
+ * @returns {string|null} the correction, or null for known, short or uncorrectable words
+ */
+function correctWord(word) {
+    if (!SPELLING || SPELLING.vocabulary.has(word) || word.length < SPELLING.min_length) return null;
+    if (SPELLING.cache.has(word)) return SPELLING.cache.get(word);
+    const limit = Math.min(SPELLING.max_distance, word.length < SPELLING.two_edits_length ? 1 : 2);
+    const candidates = new Set();
+    wordDeletes(word, limit, SPELLING.prefix_length).forEach(key => (SPELLING.deletes[key] || []).forEach(i => candidates.add(i)));
+    let best = null, bestDistance = 0, bestDf = 0;
+    candidates.forEach(i => {
+        const candidate = SPELLING.words[i];
+        const distance = editDistance(word, candidate, limit);
+        if (distance > limit) return;
+        const df = SPELLING.df[i];
+        if (best === null || distance < bestDistance || (distance === bestDistance &&
+                (df > bestDf || (df === bestDf && candidate < best)))) {
+            best = candidate; bestDistance = distance; bestDf = df;
+        }
+    });
+    SPELLING.cache.set(word, best);
+    return best;
+}
+
+function wordDeletes(word, maxDistance, prefixLength) {
+    // The word's prefix and every string made by deleting up to maxDistance characters from it
+    const prefix = word.slice(0, prefixLength);
+    const found = new Set([prefix]);
+    let edge = [prefix];
+    for (let d = 0; d < maxDistance; d++) {
+        const next = [];
+        edge.forEach(w => {
+            if (w.length < 2) return;
+            for (let i = 0; i < w.length; i++) {
+                const shorter = w.slice(0, i) + w.slice(i + 1);
+                if (!found.has(shorter)) { found.add(shorter); next.push(shorter); }
+            }
+        });
+        edge = next;
+    }
+    return found;
+}
+
+function editDistance(a, b, limit) {
+    // Optimal string alignment distance, or limit + 1 once it is known to exceed limit
+    if (Math.abs(a.length - b.length) > limit) return limit + 1;
+    let previous2 = [];
+    let previous = Array.from({length: b.length + 1}, (_, j) => j);
+    for (let i = 1; i <= a.length; i++) {
+        const current = [i];
+        for (let j = 1; j <= b.length; j++) {
+            const cost = a[i - 1] === b[j - 1] ? 0 : 1;
+            current[j] = Math.min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost);
+            if (i > 1 && j > 1 && a[i - 1] === b[j - 2] && a[i - 2] === b[j - 1]) {
+                current[j] = Math.min(current[j], previous2[j - 2] + 1);
+            }
+        }
+        if (Math.min(...current) > limit) return limit + 1;
+        previous2 = previous;
+        previous = current;
+    }
+    return previous[b.length];
+}
+
+const STEM_CACHE = new Map();
+
+function stemToken(token, rules) {
+    // Mirrors stem() in scripts/build_thesis_index.py using the rules shipped in the index
+    if (STEM_CACHE.has(token)) return STEM_CACHE.get(token);
+    let t = token;
+    if (t.length > 3 && !rules.plural_exceptions.some(e => t.endsWith(e))) {
+        const rule = rules.plurals.find(([suffix]) => t.endsWith(suffix));
+        if (rule) t = t.slice(0, t.length - rule[0].length) + rule[1];
+    }
+    if (!rules.protected.some(p => t.endsWith(p))) {
+        const suffix = rules.suffixes.find(s => t.endsWith(s) && t.length - s.length >= rules.min_stem);
+        if (suffix) t = t.slice(0, t.length - suffix.length);
+    }
+    STEM_CACHE.set(token, t);
+    return t;
 }
 
 function buildQueryVector(tokens) {
@@ -120,9 +258,9 @@ function handleQuestion() {
     if (citationsEl) citationsEl.classList.add('hidden');
     if (debugEl && ASK_THESIS_CONFIG.debug) debugEl.textContent = '';
 
-    setTimeout(()=> { // allow spinner paint
+    setTimeout(async ()=> { // allow spinner paint
         try {
-            const qTokens = tokenize(query);
+            const {tokens: qTokens, corrections} = await tokenizeQuery(query);
             if (qTokens.length < ASK_THESIS_CONFIG.minQueryTokens) {
                 throw new Error('Please enter a more specific question (at least ' + ASK_THESIS_CONFIG.minQueryTokens + ' meaningful words).');
             }
@@ -133,8 +271,8 @@ function handleQuestion() {
                 .slice(0, ASK_THESIS_CONFIG.maxPassages);
             if (!scored.length) throw new Error('No relevant passages found. Try rephrasing.');
             // Compose answer by extracting key sentences from top passages
-            const composed = composeAnswer(query, scored.map(r=>r.p));
-            answerEl.innerHTML = composed.html;
+            const composed = composeAnswer(qTokens, scored.map(r=>r.p));
+            answerEl.innerHTML = correctionNote(corrections) + composed.html;
             outputWrap.classList.remove('hidden');
             // Citations
             citationsEl.innerHTML = composed.citationsHTML;
@@ -142,9 +280,20 @@ function handleQuestion() {
             // Sources list
             scored.forEach((r,i) => {
                 const li = document.createElement('li');
-                li.innerHTML = `<div class="font-semibold text-[11px] mb-1">[S${i+1}] ${escapeHtml(r.p.section||r.p.file)}</div>` +
+                // Byte range of the passage in its manuscript file (index builder "offset")
+                li.dataset.file = r.p.file;
+                if (r.p.offset) li.dataset.offset = r.p.offset.join('-');
+                li.innerHTML = `<div class="font-semibold text-[11px] mb-1">[S${i+1}] ${escapeHtml(sourceLabel(r.p))}</div>` +
                     `<div class="text-gray-700 dark:text-gray-300 leading-snug">${highlightQueryTokens(escapeHtml(r.p.text), qTokens)}</div>` +
-                    `<div class="mt-1 text-[10px] opacity-70">Score: ${r.score.toFixed(3)} • ID: ${r.p.id}</div>`;
+                    `<div class="mt-1 text-[10px] opacity-70">Score: ${r.score.toFixed(3)} • ID: ${r.p.id}${alsoIn(r.p)}</div>`;
+                if (r.p.offset && /\.md$/i.test(r.p.file) && typeof window.openThesisPassage === 'function') {
+                    const link = document.createElement('button');
+                    link.type = 'button';
+                    link.className = 'mt-1 text-[10px] text-teal-600 dark:text-teal-400 hover:underline';
+                    link.textContent = 'Show in thesis →';
+                    link.addEventListener('click', () => window.openThesisPassage(r.p.file, r.p.offset));
+                    li.appendChild(link);
+                }
                 sourceList.appendChild(li);
             });
             sourcesWrap.classList.remove('hidden');
@@ -158,21 +307,17 @@ function handleQuestion() {
     }, 50);
 }
 
-function composeAnswer(query, passages) {
-    // Simple heuristic: choose 1-3 sentences from top passages that contain query tokens
-    const qTokens = new Set(tokenize(query));
+function composeAnswer(queryTokens, passages) {
+    // Choose 1-3 sentences from top passages that contain query tokens
+    const qTokens = [...new Set(queryTokens)];
     const sentences = [];
     const seen = new Set();
     passages.forEach(p => {
-        const rawSentences = p.text.split(/(?<=[.!?])\s+/).filter(s=>s.trim().length>20);
-        for (const s of rawSentences) {
-            const sTokens = tokenize(s);
-            const overlap = sTokens.filter(t=> qTokens.has(t));
-            if (overlap.length && !seen.has(s) && sentences.length < ASK_THESIS_CONFIG.contributionTopK) {
-                seen.add(s);
-                sentences.push({sentence: s, source: p});
-                break; // one sentence per passage initially
-            }
+        if (sentences.length >= ASK_THESIS_CONFIG.contributionTopK) return;
+        const s = p.sentence_postings ? bestSentenceFromPostings(p, qTokens) : bestSentenceByScan(p, qTokens);
+        if (s && !seen.has(s)) {
+            seen.add(s);
+            sentences.push({sentence: s, source: p}); // one sentence per passage initially
         }
     });
     if (!sentences.length) {
@@ -181,13 +326,40 @@ function composeAnswer(query, passages) {
     }
     const htmlParts = sentences.map((obj,i) => `${escapeHtml(obj.sentence)} <sup class="text-[10px] bg-yellow-200 dark:bg-yellow-600/50 px-1 rounded">S${i+1}</sup>`);
     const html = `<p>${htmlParts.join(' ')}</p>`;
-    const citationsHTML = `<div class="mt-2 text-[11px]">Sources: ${sentences.map((s,i)=>`<span class="px-1">[S${i+1}] ${escapeHtml(s.source.section||s.source.file)}</span>`).join('')}</div>`;
+    const citationsHTML = `<div class="mt-2 text-[11px]">Sources: ${sentences.map((s,i)=>`<span class="px-1">[S${i+1}] ${escapeHtml(sourceLabel(s.source))}</span>`).join('')}</div>`;
     return {html, citationsHTML};
 }
 
+function bestSentenceFromPostings(passage, qTokens) {
+    // Sentence-level sub-index from the builder: sum query-term IDF per sentence via postings
+    const weights = new Map();
+    qTokens.forEach(t => {
+        (passage.sentence_postings[t] || []).forEach(si => weights.set(si, (weights.get(si) || 0) + (IDF[t] || 0)));
+    });
+    let best = -1, bestWeight = 0;
+    weights.forEach((w, si) => { if (w > bestWeight || (w === bestWeight && si < best)) { best = si; bestWeight = w; } });
+    if (best < 0) return null;
+    const [start, end] = passage.sentences[best];
+    return passage.text.slice(start, end);
+}
+
+function bestSentenceByScan(passage, qTokens) {
+    // Fallback for indexes built before sentence postings were added
+    const qSet = new Set(qTokens);
+    const rawSentences = passage.text.split(/(?<=[.!?])\s+/).filter(s=>s.trim().length>20);
+    return rawSentences.find(s => tokenize(s).some(t => qSet.has(t))) || null;
+}
+
 function highlightQueryTokens(text, qTokens) {
-    const set = new Set(qTokens.map(t=>t.toLowerCase()));
-    return text.replace(/\b([A-Za-z]{3,})\b/g, (m,w)=> set.has(w.toLowerCase()) ? `<mark class="bg-yellow-200 dark:bg-yellow-600/50 rounded px-0.5">${m}</mark>` : m);
+    const set = new Set(qTokens);
+    return text.replace(/\b([A-Za-z]{3,})\b/g, (m,w)=> tokenize(w).some(t => set.has(t)) ? `<mark class="bg-yellow-200 dark:bg-yellow-600/50 rounded px-0.5">${m}</mark>` : m);
+}
+
+function correctionNote(corrections) {
+    const fixes = Object.entries(corrections);
+    if (!fixes.length) return '';
+    const list = fixes.map(([word, fix]) => `<em>${escapeHtml(fix)}</em> (for "${escapeHtml(word)}")`).join(', ');
+    return `<p class="text-xs opacity-70 mb-2">Showing results for ${list}</p>`;
 }
 
 function renderError(message) {
@@ -198,6 +370,23 @@ function msgNoIndex() {
     return `<div class="text-center"><h3 class="font-semibold mb-2">Index Not Built</h3><p class="text-sm">Run <code>python scripts/build_thesis_index.py</code> and reload this page.</p></div>`;
 }
 
+/**
+ * Section path of a passage, without the document title when nested deeper
+ */
+function sourceLabel(passage) {
+    const path = passage.section_path || [];
+    if (!path.length) return passage.section || passage.file;
+    return (path.length > 2 ? path.slice(1) : path).join(' › ');
+}
+
+/**
+ * Other files holding a near-duplicate of a passage (collapsed by the index builder)
+ */
+function alsoIn(passage) {
+    const files = [...new Set((passage.sources || []).map(s => s.file))].filter(f => f !== passage.file);
+    return files.length ? ` • Also in: ${escapeHtml(files.join(', '))}` : '';
+}
+
 function escapeHtml(str) {
     return str.replace(/[&<>"] /g, c => ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',' ':' '})[c]);
 }
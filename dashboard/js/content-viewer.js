@@ -4,6 +4,9 @@
  */
 (function(){
   const MANUSCRIPT_BASE = '../manuscript/content';
+  // Ask the Thesis sources point into the indexed manuscript files by byte range
+  const MANUSCRIPT_ROOT = '../manuscript';
+  const PASSAGE_HIGHLIGHT_MS = 4000;
   const CHAPTERS = [
     'Introduction.md',
     'Aims_&_Objectives.md',
@@ -82,6 +85,51 @@
     }
   }
 
+  /**
+   * Show an indexed manuscript file and scroll to a passage of it
+   * @param {string} file - Markdown file under manuscript/ (index "file")
+   * @param {number[]} range - [start, end] byte range of the passage (index "offset")
+   */
+  async function openPassage(file, range){
+    const body = document.getElementById('content-body');
+    const loading = document.getElementById('content-loading');
+    const error = document.getElementById('content-error');
+    if(!body) return;
+    show(loading); hide(error); body.innerHTML='';
+    try {
+      const res = await fetch(`${MANUSCRIPT_ROOT}/${encodeURIComponent(file)}`);
+      if(!res.ok) throw new Error(`HTTP ${res.status}`);
+      const bytes = new Uint8Array(await res.arrayBuffer());
+      const decoder = new TextDecoder();
+      body.innerHTML = renderMarkdown(decoder.decode(bytes));
+      enhanceHeadings();
+      setActive(file);
+      const target = range ? findPassage(body, decoder.decode(bytes.subarray(range[0], range[1]))) : null;
+      (target || document.getElementById('content')).scrollIntoView({behavior:'smooth', block:'center'});
+      if(target){
+        target.classList.add('content-passage-highlight');
+        setTimeout(() => target.classList.remove('content-passage-highlight'), PASSAGE_HIGHLIGHT_MS);
+      }
+    } catch (e) {
+      error.textContent = 'Failed to load passage: ' + e.message;
+      show(error);
+    } finally {
+      hide(loading);
+    }
+  }
+
+  // First rendered block containing the passage's first line (markdown markers ignored)
+  function findPassage(body, passage){
+    const normalize = s => s.replace(/[#*_`>|§-]+/g,'').replace(/\s+/g,' ').trim().toLowerCase();
+    const firstLine = passage.trim().split('\n')[0]
+      .replace(/^(\d+\.|[-*+])\s+/, '')
+      .replace(/!?\[([^\]]*)\]\([^)]*\)/g, '$1');
+    const needle = normalize(firstLine).slice(0, 80);
+    if(!needle) return null;
+    return [...body.querySelectorAll('h1,h2,h3,h4,h5,h6,p,li,pre')]
+      .find(el => normalize(el.textContent).includes(needle)) || null;
+  }
+
   function setActive(file){
     document.querySelectorAll('#content-nav button').forEach(b=>{
       b.classList.toggle('active', b.dataset.file === file);
@@ -112,7 +160,7 @@
     html = html.replace(/^(\d+)\. (.*)$/gm,'<li>$2</li>');
     html = html.replace(/(<li>.*<\/li>\n?)+/g, m=> m.startsWith('<ul>')? m : `<ol>${m}</ol>`);
     html = html.replace(/\[(.+?)\]\((.+?)\)/g,'<a href="$2" target="_blank" rel="noopener" class="text-teal-600 dark:text-teal-400 hover:underline">$1<\/a>');
-    html = html.replace(/(^|\n)([^\n<][^\n]*)(?=\n|$)/g,(m,prefix,line)=> /<(h\d|ul|ol|li|pre|blockquote)/.test(line)? m : `${prefix}<p>${line.trim()}</p>`);
+    html = html.replace(/(^|\n)((?:[^\n<]|<(?:strong|em|a)[ >])[^\n]*)(?=\n|$)/g,(m,prefix,line)=> /<(h\d|ul|ol|li|pre|blockquote)/.test(line)? m : `${prefix}<p>${line.trim()}</p>`);
     return html;
   }
 
@@ -151,4 +199,5 @@
   function hide(el){ if(el) el.classList.add('hidden'); }
 
   window.initContentViewer = initContentViewer;
+  window.openThesisPassage = openPassage;
 })();
\ No newline at end of file
@@ -0,0 +1,83 @@
+/**
+ * Live updates for the AUB Thesis Dashboard
+ * Subscribes to the dashboard server's invalidation events (/api/events,
+ * Server-Sent Events, see enhanced_server.py) and refetches only what a newly
+ * published version changed: the Ask the Thesis index, or the images and
+ * figure specs it names. Pages opened without the server are left alone.
+ */
+
+const LIVE_UPDATES_URL = '/api/events';
+let liveUpdates = null;
+
+/**
+ * Open the event stream (the browser reconnects it automatically)
+ */
+function initLiveUpdates() {
+    if (liveUpdates || !('EventSource' in window) || window.location.protocol === 'file:') {
+        return;
+    }
+    liveUpdates = new EventSource(LIVE_UPDATES_URL);
+    liveUpdates.addEventListener('index', event => applyIndexUpdate(JSON.parse(event.data)));
+    liveUpdates.addEventListener('figures', event => applyFiguresUpdate(JSON.parse(event.data)));
+    // Sent when events were missed while disconnected: refetch everything
+    liveUpdates.addEventListener('resync', () => {
+        applyIndexUpdate({ changed: null });
+        applyFiguresUpdate({ changed: null, version: String(Date.now()) });
+    });
+}
+
+/**
+ * Reload the Ask the Thesis index after the manuscript changed
+ * @param {Object} update - Event payload: version and the changed manuscript files
+ */
+function applyIndexUpdate(update) {
+    if (typeof loadIndex !== 'function') return;
+    console.log('[LiveUpdates] Index updated', update.changed || '(all files)');
+    loadIndex();
+}
+
+/**
+ * Refetch the images and rendered figure specs a figures version changed
+ * @param {Object} update - Event payload: version and the changed paths below figures/
+ *     (null when unknown, which refetches every figure)
+ */
+function applyFiguresUpdate(update) {
+    const changed = update.changed ? new Set(update.changed) : null;
+    const affected = url => {
+        const path = figurePath(url);
+        return path !== null && (!changed || changed.has(path));
+    };
+
+    document.querySelectorAll('img[src]').forEach(img => {
+        const src = img.getAttribute('src');
+        if (affected(src)) img.setAttribute('src', withVersion(src, update.version));
+    });
+    document.querySelectorAll('.plotly-figure[data-spec]').forEach(figure => {
+        if (!affected(figure.dataset.spec)) return;
+        figure.dataset.spec = withVersion(figure.dataset.spec, update.version);
+        // Figures not rendered yet fetch the new spec when they scroll into view
+        if (figure.classList.contains('js-plotly-plot') && typeof renderFigureSpec === 'function') {
+            renderFigureSpec(figure);
+        }
+    });
+    console.log('[LiveUpdates] Figures updated', update.changed || '(all figures)');
+}
+
+/**
+ * Path of a figure URL below figures/ (e.g. 'specs/sankey.json'), or null
+ * @param {string} url - Image src or spec URL
+ */
+function figurePath(url) {
+    const path = url.split('?')[0];
+    const start = path.indexOf('figures/');
+    return start < 0 ? null : path.slice(start + 'figures/'.length);
+}
+
+/**
+ * URL with the version as its query string, so the browser cache is bypassed
+ * @param {string} url - Image src or spec URL
+ * @param {string} version - Published version name
+ */
+function withVersion(url, version) {
+    return url.split('?')[0] + '?v=' + encodeURIComponent(version);
+}
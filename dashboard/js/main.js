@@ -38,6 +38,7 @@ document.addEventListener('DOMContentLoaded', () => {
         if (typeof initAdvancedVisualizations === 'function') initAdvancedVisualizations();
     if (typeof initAskThesis === 'function') initAskThesis();
     if (typeof initContentViewer === 'function') initContentViewer();
+    if (typeof initLiveUpdates === 'function') initLiveUpdates();
         
         // Update navigation based on scroll position
         updateActiveNavLinks();
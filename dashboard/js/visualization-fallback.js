@@ -1,65 +1,27 @@
 /**
  * Visualization fallback script
- * This script checks if iframe content fails to load and provides a fallback
+ * Shows a static image or a retry message when an interactive figure spec
+ * (see advanced-visualizations.js) fails to render
  */
 
-document.addEventListener('DOMContentLoaded', function() {
-    // Wait for advanced visualizations to be loaded
-    setTimeout(setupVisualizationFallbacks, 1000);
-});
-
 /**
- * Set up fallbacks for visualizations that fail to load
+ * Replace a figure that failed to render with a fallback
+ * @param {HTMLElement} figure - The .plotly-figure element with a data-spec URL
  */
-function setupVisualizationFallbacks() {
-    // Get all iframes in visualization containers
-    const iframes = document.querySelectorAll('.visualization-container iframe');
-    
-    iframes.forEach(iframe => {
-        // Check if the iframe failed to load
-        iframe.addEventListener('error', handleIframeError);
-        
-        // Fix the src attribute if necessary (convert absolute to relative path)
-        const src = iframe.getAttribute('src');
-        if (src && src.startsWith('/figures/')) {
-            console.log(`Converting absolute path to relative: ${src}`);
-            iframe.setAttribute('src', `..${src}`);
-        }
-        
-        // Also set a timeout to check if iframe loaded
-        setTimeout(() => {
-            try {
-                // Try accessing iframe content - will throw error if cross-origin or not loaded
-                const iframeContent = iframe.contentWindow || iframe.contentDocument;
-                if (!iframeContent || !iframeContent.document) {
-                    handleIframeError({ target: iframe });
-                }
-            } catch (error) {
-                handleIframeError({ target: iframe });
-            }
-        }, 3000);
-    });
-}
+function showVisualizationFallback(figure) {
+    const container = figure.parentElement;
+
+    // Get the visualization type from its label or spec
+    const title = figure.getAttribute('aria-label') || '';
+    const src = figure.getAttribute('data-spec') || '';
 
-/**
- * Handle iframe loading errors by showing a fallback image or message
- * @param {Event} event - The error event
- */
-function handleIframeError(event) {
-    const iframe = event.target;
-    const container = iframe.parentElement;
-    
-    // Get the visualization type from iframe title or source
-    const title = iframe.getAttribute('title') || '';
-    const src = iframe.getAttribute('src') || '';
-    
     // Create fallback element
     const fallbackDiv = document.createElement('div');
     fallbackDiv.className = 'flex flex-col items-center justify-center w-full h-full bg-gray-100 dark:bg-gray-800 p-4 rounded';
-    
+
     // Determine if there's a static image fallback available
     let staticImagePath = '';
-    
+
     if (src.includes('diagnosis_hierarchy_sunburst')) {
         staticImagePath = '../figures/histopathological_diagnoses.png';
     } else if (src.includes('age_to_diagnosis_sankey')) {
@@ -69,7 +31,7 @@ function handleIframeError(event) {
     } else if (src.includes('common_complaints_log')) {
         staticImagePath = '../figures/common_complaints.png';
     }
-    
+
     // Create appropriate fallback content
     if (staticImagePath) {
         fallbackDiv.innerHTML = `
@@ -82,21 +44,21 @@ function handleIframeError(event) {
             <i class="fas fa-chart-bar text-4xl text-gray-400 dark:text-gray-600 mb-4"></i>
             <p class="text-center">The interactive visualization could not be loaded.</p>
             <p class="text-center text-sm mt-2">Please try using the server script to view this content.</p>
-            <button class="mt-4 px-3 py-1 bg-gray-200 dark:bg-gray-700 rounded refresh-iframe">Try Again</button>
+            <button class="mt-4 px-3 py-1 bg-gray-200 dark:bg-gray-700 rounded refresh-figure">Try Again</button>
         `;
     }
-    
-    // Replace the iframe with fallback
-    iframe.style.display = 'none';
+
+    // Replace the figure with the fallback
+    figure.style.display = 'none';
     container.appendChild(fallbackDiv);
-    
+
     // Add event listener to retry button if present
-    const retryButton = fallbackDiv.querySelector('.refresh-iframe');
+    const retryButton = fallbackDiv.querySelector('.refresh-figure');
     if (retryButton) {
         retryButton.addEventListener('click', () => {
-            iframe.style.display = '';
+            figure.style.display = '';
             fallbackDiv.remove();
-            iframe.src = iframe.src; // Reload the iframe
+            renderFigureSpec(figure);
         });
     }
-}
\ No newline at end of file
+}
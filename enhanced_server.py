@@ -6,61 +6,676 @@ Includes detailed error logging and debugging information
 
 import http.server
 import socketserver
+import atexit
+import filecmp
+import functools
+import gzip
+import hashlib
+import importlib.util
+import json
 import os
+import posixpath
 import sys
+import time
+import queue
+import random
 import logging
+import logging.handlers
+import threading
+from collections import deque
 from pathlib import Path
+from urllib.parse import urlsplit, parse_qs, unquote
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts')
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+from publish import FIGURES_ARTIFACT, INDEX_ARTIFACT, current_dir, read_pointer
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger('dashboard-server')
+_log_listener = None
+
+
+def configure_logging():
+    """Set up logging once per process, when a server is created (not at import).
+
+    Records are handed to a background QueueListener so request threads never
+    block on stdout; only the listener thread performs the actual write. The
+    listener is started together with the queue handler, so records never pile
+    up in a queue nobody drains, and stopped (flushing the queue) at exit.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return
+    log_queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.handlers.QueueHandler(log_queue)]
+    )
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
 
 # Configure the port
 PORT = 9090
 
+# Fraction of successful requests that are access-logged (errors are always logged)
+ACCESS_LOG_SAMPLE_RATE = 0.01
+
+# Requests slower than this are counted and kept in the slow-request sample
+SLOW_REQUEST_SECONDS = 0.25
+SLOW_REQUEST_SAMPLE_SIZE = 50
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+METRICS_PATH = '/metrics'
+SEARCH_PATH = '/api/search'
+
+# Interactive charts are JSON specs rendered by one shared plotly.js runtime,
+# served from the installed plotly package and cached by browsers
+PLOTLY_RUNTIME_PATH = '/vendor/plotly.min.js'
+
+# Builds are published as versions behind a CURRENT pointer (scripts/publish.py);
+# the pointers are polled at this interval and new versions are hot-swapped in
+PUBLICATION_POLL_SECONDS = 1.0
+# Files of an index version the dashboard fetches, by URL
+INDEX_URL_FILES = {
+    '/dashboard/thesis_index.json': 'thesis_index.json',
+    '/dashboard/thesis_spelling.json': 'thesis_spelling.json',
+}
+FIGURES_URL_PREFIX = '/figures/'
+PLOTLY_RUNTIME_MAX_AGE = 7 * 24 * 3600
+
+# Dashboards subscribe to /api/events (Server-Sent Events) and are told which
+# index shards or figures a newly published version changed
+EVENTS_PATH = '/api/events'
+EVENT_HISTORY = 100
+SSE_KEEPALIVE_SECONDS = 15
+SSE_RETRY_MS = 3000
+
+# Index rebuilds, figure renders and PDF image extraction run as background
+# jobs (scripts/jobs.py): POST to submit, GET for status, DELETE to cancel
+JOBS_PATH = '/api/jobs'
+MAX_REQUEST_BODY = 64 * 1024
+
+# The PDF report is built on the server from cached statistics and figure
+# derivatives (scripts/report_pdf.py), streamed as it is written and cached
+REPORT_PATH = '/api/report.pdf'
+REPORT_FILENAME = 'AUB_Dashboard_Report.pdf'
+
+
+def route_label(path):
+    """Collapse a request path into a low-cardinality route label.
+
+    Static files are grouped by their first two directory levels
+    (e.g. ``/dashboard/js``) so the number of label values stays bounded.
+    """
+    path = urlsplit(path).path
+    if path in (METRICS_PATH, SEARCH_PATH, PLOTLY_RUNTIME_PATH, EVENTS_PATH, REPORT_PATH):
+        return path
+    parts = [p for p in path.split('/') if p]
+    if not parts:
+        return '/'
+    if '.' in parts[-1]:
+        parts = parts[:-1]
+    return '/' + '/'.join(parts[:2])
+
+
+class RequestMetrics:
+    """Thread-safe request counters rendered in Prometheus text format."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}   # route -> [bucket counts..., +Inf count]
+        self._sums = {}         # route -> total seconds
+        self._requests = {}     # (route, status) -> count
+        self._bytes = {}        # route -> bytes sent
+        self._cache = {}        # (cache, result) -> count
+        self._slow_total = 0
+        self.slow_requests = deque(maxlen=SLOW_REQUEST_SAMPLE_SIZE)
+        self.started_at = time.time()
+
+    def observe(self, method, path, status, duration, nbytes):
+        """Record a finished request."""
+        route = route_label(path)
+        with self._lock:
+            counts = self._histograms.get(route)
+            if counts is None:
+                counts = self._histograms[route] = [0] * (len(self.buckets) + 1)
+                self._sums[route] = 0.0
+                self._bytes[route] = 0
+            for i, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._sums[route] += duration
+            self._bytes[route] += nbytes
+            key = (route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if duration >= SLOW_REQUEST_SECONDS:
+                self._slow_total += 1
+                self.slow_requests.append((time.time(), method, path, status, duration))
+
+    def record_cache(self, cache, hit):
+        """Count a hit or miss for the named cache."""
+        key = (cache, 'hit' if hit else 'miss')
+        with self._lock:
+            self._cache[key] = self._cache.get(key, 0) + 1
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines.append('# HELP dashboard_request_duration_seconds Request latency by route.')
+            lines.append('# TYPE dashboard_request_duration_seconds histogram')
+            for route in sorted(self._histograms):
+                cumulative = 0
+                counts = self._histograms[route]
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f'dashboard_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {cumulative}')
+                cumulative += counts[-1]
+                lines.append(f'dashboard_request_duration_seconds_bucket{{route="{route}",le="+Inf"}} {cumulative}')
+                lines.append(f'dashboard_request_duration_seconds_sum{{route="{route}"}} {self._sums[route]:.6f}')
+                lines.append(f'dashboard_request_duration_seconds_count{{route="{route}"}} {cumulative}')
+
+            lines.append('# HELP dashboard_requests_total Requests by route and status code.')
+            lines.append('# TYPE dashboard_requests_total counter')
+            for (route, status), count in sorted(self._requests.items()):
+                lines.append(f'dashboard_requests_total{{route="{route}",status="{status}"}} {count}')
+
+            lines.append('# HELP dashboard_response_bytes_total Bytes written to clients by route.')
+            lines.append('# TYPE dashboard_response_bytes_total counter')
+            for route, nbytes in sorted(self._bytes.items()):
+                lines.append(f'dashboard_response_bytes_total{{route="{route}"}} {nbytes}')
+
+            lines.append('# HELP dashboard_cache_requests_total Cache lookups by cache and result.')
+            lines.append('# TYPE dashboard_cache_requests_total counter')
+            for (cache, result), count in sorted(self._cache.items()):
+                lines.append(f'dashboard_cache_requests_total{{cache="{cache}",result="{result}"}} {count}')
+
+            lines.append(f'# HELP dashboard_slow_requests_total Requests slower than {SLOW_REQUEST_SECONDS}s.')
+            lines.append('# TYPE dashboard_slow_requests_total counter')
+            lines.append(f'dashboard_slow_requests_total {self._slow_total}')
+
+            lines.append('# HELP dashboard_uptime_seconds Seconds since the server started.')
+            lines.append('# TYPE dashboard_uptime_seconds gauge')
+            lines.append(f'dashboard_uptime_seconds {time.time() - self.started_at:.3f}')
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = RequestMetrics()
+
+
+_search_lock = threading.Lock()
+_search_service = None
+
+def get_search_service():
+    """Load the thesis search index once and reuse it for every query"""
+    global _search_service
+    with _search_lock:
+        METRICS.record_cache('search_index', _search_service is not None)
+        if _search_service is None:
+            from thesis_search import load_search
+            _search_service = load_search()
+            logger.info(f"Search index loaded ({len(_search_service.documents)} passages)")
+        return _search_service
+
+
+def reload_search_service(path):
+    """Load an index in the background and swap it in; queries keep using the old one meanwhile"""
+    global _search_service
+    from thesis_search import load_search
+    service = load_search(path)
+    with _search_lock:
+        _search_service = service
+    logger.info(f"Search index hot-swapped ({len(service.documents)} passages from {path})")
+
+
+class EventBroker:
+    """Keep recent invalidation events and wake the event streams waiting for them"""
+
+    def __init__(self, history=EVENT_HISTORY):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=history)
+        # Ids continue across restarts, so a reconnecting client's Last-Event-ID
+        # from an earlier server process is recognised as stale
+        self.last_id = int(time.time() * 1000)
+
+    def publish(self, name, payload):
+        """Record an event and wake every stream"""
+        with self._condition:
+            self.last_id += 1
+            self._events.append((self.last_id, name, payload))
+            self._condition.notify_all()
+        return self.last_id
+
+    def wait(self, after, timeout):
+        """
+        Events newer than the id after, waiting up to timeout seconds for one
+
+        A client that missed events no longer kept (or that was connected to an
+        earlier server process) gets a single 'resync' event instead.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.last_id > after, timeout)
+            if after >= self.last_id:
+                return []
+            if not self._events or self._events[0][0] > after + 1:
+                return [(self.last_id, 'resync', {})]
+            return [event for event in self._events if event[0] > after]
+
+
+EVENTS = EventBroker()
+
+
+def changed_files(old_dir, new_dir):
+    """Paths (relative, '/'-separated) that differ between two version directories"""
+    changed = set()
+    for path in new_dir.rglob('*'):
+        if path.is_file():
+            old = old_dir / path.relative_to(new_dir)
+            # Unchanged files are copied into each version with their metadata,
+            # so the stat comparison settles most of them without reading
+            if not old.is_file() or not filecmp.cmp(old, path, shallow=True):
+                changed.add(path.relative_to(new_dir).as_posix())
+    for path in old_dir.rglob('*'):
+        if path.is_file() and not (new_dir / path.relative_to(old_dir)).exists():
+            changed.add(path.relative_to(old_dir).as_posix())
+    return sorted(changed)
+
+
+def index_shards(path, service=None):
+    """The per-file shard digests recorded in an index version's meta"""
+    if service is not None:
+        return service.meta.get('shards')
+    with open(path / 'thesis_index.json', encoding='utf-8') as f:
+        return json.load(f).get('meta', {}).get('shards')
+
+
+# Version directories currently served for each published artifact
+_published = {'index': None, 'figures': None}
+
+class PublicationWatcher(threading.Thread):
+    """
+    Poll the CURRENT pointers of the published artifacts and hot-swap new versions
+
+    Each switch after the first is announced on EVENTS with the files it
+    changed: manuscript files whose index shard changed, or figure files.
+    """
+
+    ARTIFACTS = {'index': INDEX_ARTIFACT, 'figures': FIGURES_ARTIFACT}
+
+    def __init__(self, interval=PUBLICATION_POLL_SECONDS):
+        super().__init__(name='publication-watcher', daemon=True)
+        self.interval = interval
+        self.versions = {}
+        self.shards = None
+        self._stopped = threading.Event()
+
+    def check(self):
+        """Switch to any newly published version"""
+        for name, artifact in self.ARTIFACTS.items():
+            version = (read_pointer(artifact) or {}).get('version')
+            if version == self.versions.get(name):
+                continue
+            announce = name in self.versions
+            self.versions[name] = version
+            path = current_dir(artifact)
+            if name == 'index' and path is not None:
+                try:
+                    if _search_service is not None:
+                        reload_search_service(path / 'thesis_index.json')
+                    shards = index_shards(path, _search_service)
+                except Exception as e:
+                    logger.error(f"Could not load index version {version}: {e}")
+                    continue
+                changed = None
+                if shards is not None and self.shards is not None:
+                    changed = sorted(f for f in shards.keys() | self.shards.keys()
+                                     if shards.get(f) != self.shards.get(f))
+                self.shards = shards
+            elif path is not None:
+                previous = _published[name]
+                changed = changed_files(previous, path) if previous is not None and previous.is_dir() else None
+            _published[name] = path
+            logger.info(f"Serving {name} version {version}")
+            if name == 'figures':
+                threading.Thread(target=warm_report_cache, name='report-warmup', daemon=True).start()
+            if announce and path is not None:
+                # changed is None when it cannot be determined: clients refetch everything
+                EVENTS.publish(name, {'version': version, 'changed': changed})
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Publication watcher error: {e}")
+
+    def stop(self):
+        self._stopped.set()
+
+
+def warm_report_cache():
+    """Prepare the report statistics and figure derivatives before the first report is requested"""
+    try:
+        from report_pdf import warm
+        prepared = warm()
+        logger.info(f"Report cache warmed ({prepared} figure derivatives)")
+    except Exception as e:
+        logger.error(f"Could not warm the report cache: {e}")
+
+
+_jobs_lock = threading.Lock()
+_job_queue = None
+
+def get_job_queue():
+    """Create the job queue on first use (its worker processes start with the first job)"""
+    global _job_queue
+    with _jobs_lock:
+        if _job_queue is None:
+            from jobs import JobQueue
+            _job_queue = JobQueue()
+            logger.info(f"Job queue ready ({_job_queue.workers} workers, table {_job_queue.db_path})")
+        return _job_queue
+
+
+_runtime_lock = threading.Lock()
+_plotly_runtime = None
+
+def get_plotly_runtime():
+    """Read plotly.min.js from the plotly package once; keep raw and gzip bodies and an ETag"""
+    global _plotly_runtime
+    with _runtime_lock:
+        if _plotly_runtime is None:
+            spec = importlib.util.find_spec('plotly')
+            if spec is None:
+                raise FileNotFoundError("plotly is not installed")
+            path = os.path.join(os.path.dirname(spec.origin), 'package_data', 'plotly.min.js')
+            with open(path, 'rb') as f:
+                raw = f.read()
+            _plotly_runtime = {
+                'raw': raw,
+                'gzip': gzip.compress(raw, compresslevel=6),
+                'etag': '"%s"' % hashlib.sha1(raw).hexdigest()[:16],
+            }
+            logger.info(f"Plotly runtime loaded ({len(raw)} bytes, {len(_plotly_runtime['gzip'])} gzipped)")
+        return _plotly_runtime
+
+
+class _CountingWriter:
+    """Wrap the socket writer to count bytes sent for the current request."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.count = 0
+
+    def write(self, data):
+        self.count += len(data)
+        return self._raw.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
 class DebugHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     """Custom HTTP request handler with detailed logging and CORS support"""
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    def setup(self):
+        super().setup()
+        self.wfile = _CountingWriter(self.wfile)
+
+    def handle_one_request(self):
+        """Time each request and record it in the metrics registry."""
+        start = time.perf_counter()
+        self.wfile.count = 0
+        self._status = None
+        self._streaming = False
+        super().handle_one_request()
+        if self._status is None or self._streaming:
+            # Closed before a response, or a long-lived event stream whose
+            # duration would swamp the latency histogram
+            return
+        duration = time.perf_counter() - start
+        METRICS.observe(self.command, self.path, self._status, duration, self.wfile.count)
+        if duration >= SLOW_REQUEST_SECONDS:
+            logger.warning(f"Slow request: {self.command} {self.path} -> {self._status} in {duration * 1000:.1f} ms")
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
     def do_GET(self):
-        """Handle GET requests with detailed logging"""
-        # Log the request
-        logger.info(f"GET request for: {self.path}")
-        
-        # Check if the file exists
+        """Handle GET requests, serving metrics and rewriting the root URL"""
+        route = urlsplit(self.path).path
+        if route == METRICS_PATH:
+            return self.send_metrics()
+        if route == SEARCH_PATH:
+            return self.send_search()
+        if route == PLOTLY_RUNTIME_PATH:
+            return self.send_plotly_runtime()
+        if route == EVENTS_PATH:
+            return self.send_events()
+        if route == JOBS_PATH or route.startswith(JOBS_PATH + '/'):
+            return self.send_job_status(route)
+        if route == REPORT_PATH:
+            return self.send_report()
+
         if self.path == '/':
             self.path = '/dashboard/'
-        
-        # Handle trailing slash redirects properly
-        if self.path.endswith('/'):
-            for index in ['index.html', 'index.htm']:
-                index_path = self.translate_path(self.path + index)
-                if os.path.exists(index_path):
-                    self.path = self.path + index
-                    break
-        
-        file_path = self.translate_path(self.path)
-        file_exists = os.path.exists(file_path)
-        
-        if file_exists and os.path.isfile(file_path):
-            logger.info(f"File found: {file_path}")
-        else:
-            logger.warning(f"File not found: {file_path}")
-            
+
         try:
-            return super().do_GET()
+            super().do_GET()
         except Exception as e:
             logger.error(f"Error serving {self.path}: {str(e)}")
             self.send_error(500, f"Server error: {str(e)}")
 
+        # Conditional GETs answered with 304 are served from the browser cache
+        if self.headers.get('If-Modified-Since'):
+            METRICS.record_cache('http', self._status == 304)
+
+    def do_POST(self):
+        """Submit a background job: ``POST /api/jobs`` with {"kind": ..., "params": {...}}"""
+        if urlsplit(self.path).path != JOBS_PATH:
+            return self.send_json({"error": "Not found"}, 404)
+        from jobs import JobRejected, QueueFull
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return self.send_json({"error": "Invalid Content-Length"}, 400)
+        if length > MAX_REQUEST_BODY:
+            return self.send_json({"error": "Request body too large"}, 413)
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(request, dict) or not isinstance(request.get('params', {}), dict):
+                raise ValueError("expected an object with 'kind' and optional 'params' object")
+        except ValueError as e:
+            return self.send_json({"error": f"Invalid JSON body: {e}"}, 400)
+        try:
+            job, coalesced = get_job_queue().submit(request.get('kind'), request.get('params'))
+        except QueueFull as e:
+            return self.send_json({"error": str(e)}, 429)
+        except JobRejected as e:
+            return self.send_json({"error": str(e)}, 400)
+        # 200 for a duplicate of a job that is still pending, 202 for a new one
+        self.send_json({"job": job, "coalesced": coalesced}, 200 if coalesced else 202)
+
+    def do_DELETE(self):
+        """Cancel a background job: ``DELETE /api/jobs/<id>``"""
+        route = urlsplit(self.path).path
+        if not route.startswith(JOBS_PATH + '/'):
+            return self.send_json({"error": "Not found"}, 404)
+        job = get_job_queue().cancel(route[len(JOBS_PATH) + 1:])
+        if job is None:
+            return self.send_json({"error": "Unknown job"}, 404)
+        self.send_json({"job": job})
+
+    def send_job_status(self, route):
+        """List recent jobs (``/api/jobs``) or report one (``/api/jobs/<id>``)"""
+        jobs = get_job_queue()
+        if route == JOBS_PATH:
+            return self.send_json({"jobs": jobs.list()})
+        job = jobs.get(route[len(JOBS_PATH) + 1:])
+        if job is None:
+            return self.send_json({"error": "Unknown job"}, 404)
+        self.send_json({"job": job})
+
+    def send_report(self):
+        """Serve ``/api/report.pdf?sections=demographics,findings&figures=0`` from the cache or stream a new build"""
+        from report_pdf import cached_report, normalize_params, report_key, stream_report
+        query = parse_qs(urlsplit(self.path).query)
+        sections = [s for value in query.get('sections', []) for s in value.split(',') if s]
+        try:
+            params = normalize_params(sections, query.get('figures', ['1'])[0] not in ('0', 'false', 'no'))
+        except ValueError as e:
+            return self.send_json({"error": str(e)}, 400)
+        key = report_key(params)
+        etag = f'"{key}"'
+        if self.headers.get('If-None-Match') == etag:
+            METRICS.record_cache('report', True)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        cached = cached_report(key)
+        METRICS.record_cache('report', cached is not None)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Disposition", f'attachment; filename="{REPORT_FILENAME}"')
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        if cached is not None:
+            body = cached.read_bytes()
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        # Length unknown until the last page: the body ends when the connection closes
+        self.close_connection = True
+        self.end_headers()
+        try:
+            stream_report(params, self.wfile, key)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            # Headers are already sent; the truncated PDF is not cached
+            logger.error(f"Report generation failed: {e}")
+
+    def send_metrics(self):
+        """Write the Prometheus text exposition of the request metrics"""
+        body = METRICS.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_search(self):
+        """Answer ``/api/search?q=...&k=5`` with ranked passages and answer sentences"""
+        params = parse_qs(urlsplit(self.path).query)
+        query = params.get('q', [''])[0].strip()
+        if not query:
+            return self.send_json({"error": "Missing query parameter 'q'"}, 400)
+        try:
+            k = max(1, min(int(params.get('k', ['5'])[0]), 50))
+        except ValueError:
+            return self.send_json({"error": "Parameter 'k' must be an integer"}, 400)
+        try:
+            service = get_search_service()
+        except FileNotFoundError:
+            return self.send_json({"error": "Index not built. Run scripts/build_thesis_index.py"}, 503)
+        self.send_json(service.answer(query, k))
+
+    def send_plotly_runtime(self):
+        """Serve the shared plotly.js runtime (gzip when accepted, 304 on a matching ETag)"""
+        try:
+            runtime = get_plotly_runtime()
+        except (FileNotFoundError, OSError) as e:
+            return self.send_json({"error": f"Plotly runtime unavailable: {e}"}, 503)
+        cached = self.headers.get('If-None-Match') == runtime['etag']
+        METRICS.record_cache('plotly_runtime', cached)
+        if cached:
+            self.send_response(304)
+            self.send_header("ETag", runtime['etag'])
+            self.end_headers()
+            return
+        use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = runtime['gzip'] if use_gzip else runtime['raw']
+        self.send_response(200)
+        self.send_header("Content-Type", "application/javascript; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("ETag", runtime['etag'])
+        self.send_header("Cache-Control", f"public, max-age={PLOTLY_RUNTIME_MAX_AGE}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        """Stream invalidation events as Server-Sent Events until the client disconnects"""
+        try:
+            after = int(self.headers.get('Last-Event-ID', ''))
+        except ValueError:
+            after = EVENTS.last_id
+        self._streaming = True
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=UTF-8")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        try:
+            self.wfile.write(f"retry: {SSE_RETRY_MS}\n\n".encode('utf-8'))
+            while True:
+                events = EVENTS.wait(after, SSE_KEEPALIVE_SECONDS)
+                if not events:
+                    # Comment line: keeps proxies from timing out and detects closed clients
+                    self.wfile.write(b": keepalive\n\n")
+                for event_id, name, payload in events:
+                    message = f"id: {event_id}\nevent: {name}\ndata: {json.dumps(payload)}\n\n"
+                    self.wfile.write(message.encode('utf-8'))
+                    after = event_id
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def send_json(self, payload, status=200):
+        """Write a JSON response"""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def translate_path(self, path):
+        """Serve the index and figures from their published versions when there are any"""
+        route = posixpath.normpath(unquote(urlsplit(path).path))
+        index_dir, figures_dir = _published['index'], _published['figures']
+        if route in INDEX_URL_FILES and index_dir is not None:
+            candidate = index_dir / INDEX_URL_FILES[route]
+            if candidate.is_file():
+                return str(candidate)
+        if route.startswith(FIGURES_URL_PREFIX) and figures_dir is not None:
+            # Versions hold the generated charts; other figures come from figures/
+            candidate = figures_dir / route[len(FIGURES_URL_PREFIX):]
+            if candidate.is_file():
+                return str(candidate)
+        return super().translate_path(path)
+
     def guess_type(self, path):
         """Customize MIME types for different file extensions."""
         if path.endswith(".html"):
@@ -77,17 +692,22 @@ class DebugHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             return "image/jpeg"
         elif path.endswith(".svg"):
             return "image/svg+xml"
-        mime_type = super().guess_type(path)
-        logger.debug(f"MIME type for {path}: {mime_type}")
-        return mime_type
+        return super().guess_type(path)
 
     def end_headers(self):
         """Add CORS headers to allow loading interactive visualizations."""
         self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, DELETE, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "Content-Type")
         super().end_headers()
 
+    def log_request(self, code='-', size='-'):
+        """Access-log a sample of requests; errors and redirects are always logged"""
+        status = code.value if isinstance(code, http.HTTPStatus) else code
+        if isinstance(status, int) and status < 300 and random.random() >= ACCESS_LOG_SAMPLE_RATE:
+            return
+        super().log_request(code, size)
+
     def log_message(self, format, *args):
         """Override to use our logger instead of stderr"""
         logger.info(format % args)
@@ -120,8 +740,28 @@ def check_directory_structure():
     else:
         logger.error(f"Figures directory missing: {figures_dir}")
 
+class DashboardServer(socketserver.ThreadingTCPServer):
+    """One thread per connection, so open event streams do not block other requests"""
+
+    daemon_threads = True
+    allow_reuse_address = True  # as http.server.HTTPServer: restart without waiting for TIME_WAIT
+
+
+def create_server(port=PORT, directory=None):
+    """Create (but do not start) the dashboard HTTP server.
+
+    Args:
+        port: TCP port to bind; 0 picks a free port
+        directory: Directory to serve; defaults to the current working directory
+    """
+    configure_logging()
+    handler = functools.partial(DebugHTTPRequestHandler, directory=directory)
+    return DashboardServer(("", port), handler)
+
 def run_server():
     """Start the HTTP server with the custom handler"""
+    configure_logging()
+
     # Check directory structure
     check_directory_structure()
     
@@ -130,17 +770,24 @@ def run_server():
     os.chdir(root_dir)
     logger.info(f"Changed working directory to: {root_dir}")
     
-    handler = DebugHTTPRequestHandler
+    watcher = PublicationWatcher()
+    watcher.check()
+    watcher.start()
     
     try:
-        with socketserver.TCPServer(("", PORT), handler) as httpd:
+        with create_server(PORT) as httpd:
             logger.info(f"Server running at http://localhost:{PORT}/")
             logger.info(f"Dashboard URL: http://localhost:{PORT}/dashboard/")
+            logger.info(f"Metrics URL: http://localhost:{PORT}{METRICS_PATH}")
+            logger.info(f"Live update events: http://localhost:{PORT}{EVENTS_PATH}")
             logger.info("Press Ctrl+C to stop the server")
             try:
                 httpd.serve_forever()
             except KeyboardInterrupt:
                 logger.info("Server stopped by user.")
+            finally:
+                if _job_queue is not None:
+                    _job_queue.shutdown()
     except Exception as e:
         logger.error(f"Error starting server: {str(e)}")
         sys.exit(1)
@@ -1,6 +1,7 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from label_canonicalizer import canonicalize_labels
 
 # --- Data Loading and Cleaning ---
 
@@ -15,20 +16,13 @@ try:
     # Clean column names by stripping whitespace
     df.columns = df.columns.str.strip()
 
+    # Canonicalize headers and labels the same way as thesis_analysis.py so
+    # both scripts count the same categories
+    df = canonicalize_labels(df)
+
     # Drop rows where 'Histopathological diagnosis' is NaN, as they are likely empty rows
     df.dropna(subset=['Histopathological diagnosis'], inplace=True)
 
-    # Clean the 'Histopathological diagnosis' column
-    df['Histopathological diagnosis'] = df['Histopathological diagnosis'].str.strip().str.lower()
-
-    # Clean 'Drug history'
-    df['Drug history'] = df['Drug history'].str.strip().str.lower()
-    # Standardize values in 'Drug history'
-    df['Drug history'] = df['Drug history'].replace({
-        'no': 'No Hormonal Intake',
-        'hormonal intake': 'Hormonal Intake'
-    })
-
     # Convert 'Age' to numeric, coercing errors
     df['Age'] = pd.to_numeric(df['Age'], errors='coerce')
     df.dropna(subset=['Age'], inplace=True) # Drop rows where age could not be converted
@@ -66,7 +60,7 @@ try:
 
     # 3. Common Presenting Complaints
     plt.figure()
-    complaint_counts = df['Compalints'].value_counts()
+    complaint_counts = df['Complaints'].value_counts()
     sns.barplot(y=complaint_counts.index, x=complaint_counts.values, palette='plasma', orient='h')
     plt.title('Most Common Presenting Complaints')
     plt.xlabel('Number of Cases')
@@ -98,12 +92,12 @@ try:
     df_corr = df.copy()
 
     # Convert categorical columns to numerical using factorize
-    for col in ['Histopathological diagnosis', 'Age Group', 'Compalints', 'Drug history', 'correlation with LMP']:
+    for col in ['Histopathological diagnosis', 'Age Group', 'Complaints', 'Drug history', 'correlation with LMP']:
         if col in df_corr.columns:
             df_corr[col] = pd.factorize(df_corr[col])[0]
 
     plt.figure(figsize=(12, 10))
-    correlation_matrix = df_corr[['Age', 'Histopathological diagnosis', 'Compalints', 'Drug history', 'correlation with LMP']].corr()
+    correlation_matrix = df_corr[['Age', 'Histopathological diagnosis', 'Complaints', 'Drug history', 'correlation with LMP']].corr()
     sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', fmt=".2f")
     plt.title('Correlation Heatmap of Key Variables')
     plt.tight_layout()
@@ -0,0 +1,255 @@
+"""
+Association and Hypothesis Testing for Categorical Clinical Variables
+
+Computes, for every pair of categorical columns in the cleaned Masterchart:
+- Pearson chi-square test and likelihood-ratio G-test (with p-values)
+- Cramér's V effect size
+- Fisher exact test for sparse 2x2 tables
+- Monte Carlo permutation p-values for sparse tables, where the chi-square
+  approximation is unreliable (parallelized across a process pool)
+
+All contingency tables are built in one batched pass: each column is
+factorized to integer codes once, every pair gets its own offset range, and a
+single np.bincount over the concatenated pair keys yields all tables. The test
+statistics are then evaluated for all pairs at once on a padded table stack.
+
+Usage:
+  python association_stats.py
+  python association_stats.py --permutations 5000 --permute all --workers 4 --output associations.csv
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_PATH = os.path.join(ROOT, "data", "Masterchart.csv")
+
+# Nominal variables compared by default (Age enters through its age group)
+CATEGORICAL_COLUMNS = [
+    'Age Group',
+    'Histopathological diagnosis',
+    'Complaints',
+    'Drug history',
+    'correlation with LMP',
+]
+
+# Tables whose smallest expected count is below this are treated as sparse
+MIN_EXPECTED_COUNT = 5
+
+# Rows permuted per vectorized block in the permutation test
+PERMUTATION_BLOCK = 256
+
+
+def encode_categories(df, columns):
+    """
+    Factorize columns into integer codes (missing values become -1)
+
+    Returns:
+        codes: int64 array of shape (rows, columns)
+        levels: list with the category labels of each column
+    """
+    codes = np.empty((len(df), len(columns)), dtype=np.int64)
+    levels = []
+    for j, col in enumerate(columns):
+        col_codes, uniques = pd.factorize(df[col], sort=True)
+        codes[:, j] = col_codes
+        levels.append(list(uniques))
+    return codes, levels
+
+
+def pairwise_contingency_tables(codes, sizes, pairs):
+    """
+    Build the contingency table of every column pair with one bincount
+
+    Args:
+        codes: (rows, columns) integer codes, -1 for missing
+        sizes: number of categories per column
+        pairs: list of (i, j) column index pairs
+
+    Returns:
+        float array of shape (pairs, max_size, max_size), zero-padded
+    """
+    width = max(sizes) if sizes else 0
+    cells = width * width
+    keys = []
+    for p, (i, j) in enumerate(pairs):
+        a, b = codes[:, i], codes[:, j]
+        valid = (a >= 0) & (b >= 0)
+        keys.append(p * cells + a[valid] * width + b[valid])
+    flat = np.bincount(np.concatenate(keys) if keys else np.empty(0, dtype=np.int64),
+                       minlength=len(pairs) * cells)
+    return flat.reshape(len(pairs), width, width).astype(np.float64)
+
+
+def chi_square_statistics(tables):
+    """
+    Vectorized chi-square, G-test and Cramér's V for a stack of tables
+
+    Zero rows/columns (padding or unused categories) are ignored.
+    """
+    n = tables.sum(axis=(1, 2))
+    rows = tables.sum(axis=2)
+    cols = tables.sum(axis=1)
+    safe_n = np.where(n > 0, n, 1.0)
+    expected = rows[:, :, None] * cols[:, None, :] / safe_n[:, None, None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        chi_terms = np.where(expected > 0, (tables - expected) ** 2 / expected, 0.0)
+        g_terms = np.where(tables > 0, tables * np.log(tables / expected), 0.0)
+    chi2 = chi_terms.sum(axis=(1, 2))
+    g = 2.0 * g_terms.sum(axis=(1, 2))
+
+    r = (rows > 0).sum(axis=1)
+    c = (cols > 0).sum(axis=1)
+    dof = np.maximum((r - 1) * (c - 1), 0)
+    k = np.minimum(r, c) - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cramers_v = np.where((k > 0) & (n > 0), np.sqrt(chi2 / (safe_n * np.maximum(k, 1))), 0.0)
+    p_chi2 = np.where(dof > 0, stats.chi2.sf(chi2, np.maximum(dof, 1)), 1.0)
+    p_g = np.where(dof > 0, stats.chi2.sf(g, np.maximum(dof, 1)), 1.0)
+    min_expected = np.array([
+        e[np.ix_(rw > 0, cl > 0)].min() if (rw > 0).any() and (cl > 0).any() else 0.0
+        for e, rw, cl in zip(expected, rows, cols)
+    ])
+    return {
+        'n': n.astype(int), 'chi2': chi2, 'dof': dof, 'p_chi2': p_chi2,
+        'g': g, 'p_g': p_g, 'cramers_v': cramers_v,
+        'min_expected': min_expected, 'rows': r, 'cols': c,
+    }
+
+
+def permutation_pvalue(a, b, n_permutations, seed):
+    """
+    Monte Carlo p-value of the chi-square statistic for one column pair
+
+    Column b is shuffled relative to column a; blocks of permutations are
+    tabulated together with a single bincount.
+    """
+    valid = (a >= 0) & (b >= 0)
+    a, b = a[valid], b[valid]
+    if len(a) == 0:
+        return 1.0
+    _, a = np.unique(a, return_inverse=True)
+    _, b = np.unique(b, return_inverse=True)
+    na, nb = a.max() + 1, b.max() + 1
+    observed = chi_square_statistics(
+        np.bincount(a * nb + b, minlength=na * nb).reshape(1, na, nb).astype(np.float64)
+    )['chi2'][0]
+
+    rng = np.random.default_rng(seed)
+    exceed = 0
+    done = 0
+    while done < n_permutations:
+        block = min(PERMUTATION_BLOCK, n_permutations - done)
+        shuffled = rng.permuted(np.broadcast_to(b, (block, len(b))), axis=1)
+        keys = np.arange(block)[:, None] * (na * nb) + a[None, :] * nb + shuffled
+        tables = np.bincount(keys.ravel(), minlength=block * na * nb).reshape(block, na, nb)
+        exceed += int((chi_square_statistics(tables.astype(np.float64))['chi2'] >= observed - 1e-12).sum())
+        done += block
+    return (exceed + 1) / (n_permutations + 1)
+
+
+def _permutation_job(args):
+    return permutation_pvalue(*args)
+
+
+def compute_associations(df, columns=None, n_permutations=2000, permute='sparse', workers=None, seed=2024):
+    """
+    Test association between every pair of categorical columns
+
+    Args:
+        df: Cleaned DataFrame (see thesis_analysis.load_and_clean_data)
+        columns: Columns to compare; defaults to CATEGORICAL_COLUMNS present in df
+        n_permutations: Permutations per pair for Monte Carlo p-values
+        permute: 'sparse' (only tables with small expected counts), 'all' or 'none'
+        workers: Process pool size for permutation tests (None = CPU count, 1 = inline)
+        seed: Seed for reproducible permutation p-values
+
+    Returns:
+        DataFrame with one row per column pair
+    """
+    if columns is None:
+        columns = [c for c in CATEGORICAL_COLUMNS if c in df.columns]
+    codes, levels = encode_categories(df, columns)
+    sizes = [len(lv) for lv in levels]
+    pairs = list(combinations(range(len(columns)), 2))
+    tables = pairwise_contingency_tables(codes, sizes, pairs)
+    result = chi_square_statistics(tables)
+
+    sparse = result['min_expected'] < MIN_EXPECTED_COUNT
+    fisher_p = np.full(len(pairs), np.nan)
+    for p in np.flatnonzero(sparse & (result['rows'] == 2) & (result['cols'] == 2)):
+        t = tables[p]
+        t = t[np.ix_(t.sum(axis=1) > 0, t.sum(axis=0) > 0)]
+        fisher_p[p] = stats.fisher_exact(t)[1]
+
+    perm_p = np.full(len(pairs), np.nan)
+    if permute != 'none' and n_permutations > 0:
+        targets = [p for p in range(len(pairs)) if permute == 'all' or sparse[p]]
+        seeds = np.random.SeedSequence(seed).spawn(len(targets))
+        jobs = [(codes[:, pairs[p][0]], codes[:, pairs[p][1]], n_permutations, s) for p, s in zip(targets, seeds)]
+        if workers == 1 or len(jobs) <= 1:
+            values = [_permutation_job(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                values = list(pool.map(_permutation_job, jobs))
+        perm_p[targets] = values
+
+    return pd.DataFrame({
+        'variable_a': [columns[i] for i, _ in pairs],
+        'variable_b': [columns[j] for _, j in pairs],
+        'n': result['n'],
+        'table_shape': [f"{r}x{c}" for r, c in zip(result['rows'], result['cols'])],
+        'chi2': result['chi2'],
+        'dof': result['dof'],
+        'p_chi2': result['p_chi2'],
+        'g_stat': result['g'],
+        'p_g': result['p_g'],
+        'cramers_v': result['cramers_v'],
+        'min_expected': result['min_expected'],
+        'sparse': sparse,
+        'p_fisher': fisher_p,
+        'p_permutation': perm_p,
+    })
+
+
+def association_matrix(associations, value='cramers_v'):
+    """Pivot pairwise results into a symmetric variable x variable matrix"""
+    names = list(dict.fromkeys(list(associations['variable_a']) + list(associations['variable_b'])))
+    matrix = pd.DataFrame(np.eye(len(names)) if value == 'cramers_v' else np.nan, index=names, columns=names)
+    for _, row in associations.iterrows():
+        matrix.loc[row['variable_a'], row['variable_b']] = row[value]
+        matrix.loc[row['variable_b'], row['variable_a']] = row[value]
+    return matrix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pairwise association tests for categorical variables")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="Path to Masterchart.csv")
+    parser.add_argument("--columns", nargs="+", help="Columns to compare (default: key clinical variables)")
+    parser.add_argument("--permutations", type=int, default=2000, help="Permutations per pair for Monte Carlo p-values")
+    parser.add_argument("--permute", choices=["sparse", "all", "none"], default="sparse")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (1 = no pool)")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--output", help="Write the results table to this CSV file")
+    args = parser.parse_args()
+
+    from thesis_analysis import load_and_clean_data
+    df = load_and_clean_data(args.data)
+    associations = compute_associations(df, args.columns, args.permutations, args.permute, args.workers, args.seed)
+
+    with pd.option_context('display.width', 200, 'display.max_columns', 20):
+        print(associations.round(4).to_string(index=False))
+    if args.output:
+        associations.to_csv(args.output, index=False)
+        print(f"\n✓ Saved association table to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
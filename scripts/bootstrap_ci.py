@@ -0,0 +1,195 @@
+"""
+Bootstrap Confidence Intervals for Crosstab Proportions
+
+Resampling patients with replacement is equivalent to drawing the joint cell
+counts of a crosstab from a multinomial distribution with the observed cell
+proportions. All resamples are therefore drawn as one (resamples x cells)
+int32 NumPy multinomial matrix over the categorical codes, filled in chunks.
+Proportions and percentile intervals are then computed one block of table
+rows (or columns, for normalize='columns') at a time, so besides the counts
+only one block of at most MAX_CHUNK_VALUES floats is held in memory. Draws are
+seeded and reproducible; large runs can be sharded across a process pool (each
+shard gets its own spawned seed).
+
+Results are cached per (data, variables, settings), up to MAX_CACHED tables,
+so chart builders can reuse them without resampling again.
+
+Usage:
+  python bootstrap_ci.py --row "Age Group" --col "Histopathological diagnosis"
+  python bootstrap_ci.py --row "Histopathological diagnosis" --col "Drug history" --resamples 10000 --workers 4
+"""
+
+import argparse
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_PATH = os.path.join(ROOT, "data", "Masterchart.csv")
+
+DEFAULT_RESAMPLES = 10000
+DEFAULT_SEED = 2024
+
+# Upper bound on resample x cell values drawn, or normalized, at once
+MAX_CHUNK_VALUES = 5_000_000
+
+# Cached interval tables (least recently used evicted first); the render
+# daemon asks for one per filtered cohort
+MAX_CACHED = 64
+_CACHE = OrderedDict()
+
+
+def _draw_counts(cell_counts, resamples, seed, out=None):
+    """Draw bootstrap cell counts, shape (resamples, cells), into an int32 array chunk by chunk"""
+    n = int(cell_counts.sum())
+    probabilities = cell_counts / n
+    rng = np.random.default_rng(seed)
+    chunk = max(1, MAX_CHUNK_VALUES // max(1, len(cell_counts)))
+    if out is None:
+        out = np.empty((resamples, len(cell_counts)), dtype=np.int32)
+    for start in range(0, resamples, chunk):
+        stop = min(start + chunk, resamples)
+        out[start:stop] = rng.multinomial(n, probabilities, size=stop - start)
+    return out
+
+
+def _normalize(counts, normalize):
+    """Turn (..., rows, cols) counts into proportions; empty margins become NaN"""
+    counts = counts.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if normalize == 'index':
+            return counts / counts.sum(axis=-1, keepdims=True)
+        if normalize == 'columns':
+            return counts / counts.sum(axis=-2, keepdims=True)
+        return counts / counts.sum(axis=(-2, -1), keepdims=True)
+
+
+def _shard(args):
+    cell_counts, resamples, seed = args
+    return _draw_counts(cell_counts, resamples, seed)
+
+
+def _intervals(counts, shape, normalize, quantiles):
+    """
+    Percentile intervals of every cell's proportion, one block at a time
+
+    Blocks are table rows (columns for normalize='columns'), so each block
+    holds the complete margins it is normalized by.
+
+    Returns:
+        (low, high) arrays of the table's shape
+    """
+    draws = counts.reshape(len(counts), *shape)
+    axis = 2 if normalize == 'columns' else 1
+    lines = shape[axis - 1]
+    line_values = len(counts) * (shape[0] * shape[1] // max(1, lines))
+    step = max(1, MAX_CHUNK_VALUES // max(1, line_values))
+    # Every resample has the same total, but divide by it as _normalize does
+    totals = draws.sum(axis=(1, 2), keepdims=True) if normalize == 'all' else None
+    low, high = np.empty(shape), np.empty(shape)
+    for start in range(0, lines, step):
+        block = [slice(None)] * 3
+        block[axis] = slice(start, min(start + step, lines))
+        if totals is None:
+            proportions = _normalize(draws[tuple(block)], normalize)
+        else:
+            proportions = draws[tuple(block)] / totals
+        with np.errstate(invalid='ignore'):
+            low[tuple(block[1:])], high[tuple(block[1:])] = np.nanquantile(proportions, quantiles, axis=0)
+    return low, high
+
+
+def bootstrap_crosstab(df, row, col, normalize='index', resamples=DEFAULT_RESAMPLES,
+                       confidence=0.95, seed=DEFAULT_SEED, workers=1):
+    """
+    Percentile bootstrap confidence intervals for every crosstab cell
+
+    Args:
+        df: Cleaned DataFrame
+        row, col: Categorical columns of the crosstab
+        normalize: 'index' (within rows, as the charts use), 'columns' or 'all'
+        resamples: Number of bootstrap resamples
+        confidence: Two-sided interval level
+        seed: Seed for reproducible draws
+        workers: Process pool size for sharding the resamples (1 = inline)
+
+    Returns:
+        Long DataFrame with row, col, count, proportion, ci_low, ci_high
+    """
+    subset = df[[row, col]].dropna()
+    key = (row, col, normalize, resamples, confidence, seed,
+           int(pd.util.hash_pandas_object(subset, index=False).sum()))
+    if key in _CACHE:
+        _CACHE.move_to_end(key)
+        return _CACHE[key].copy()
+
+    row_codes, row_levels = pd.factorize(subset[row], sort=True)
+    col_codes, col_levels = pd.factorize(subset[col], sort=True)
+    shape = (len(row_levels), len(col_levels))
+    cell_counts = np.bincount(row_codes * shape[1] + col_codes, minlength=shape[0] * shape[1])
+
+    alpha = (1.0 - confidence) / 2.0
+    quantiles = (alpha, 1.0 - alpha)
+    if workers and workers > 1 and resamples >= 2 * workers:
+        seeds = np.random.SeedSequence(seed).spawn(workers)
+        sizes = [resamples // workers + (1 if i < resamples % workers else 0) for i in range(workers)]
+        jobs = [(cell_counts, size, s) for size, s in zip(sizes, seeds)]
+        counts = np.empty((resamples, len(cell_counts)), dtype=np.int32)
+        starts = np.cumsum([0] + sizes)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for start, shard in zip(starts, pool.map(_shard, jobs)):
+                counts[start:start + len(shard)] = shard
+    else:
+        counts = _draw_counts(cell_counts, resamples, seed)
+
+    low, high = _intervals(counts, shape, normalize, quantiles)
+    observed = _normalize(cell_counts.reshape(shape), normalize)
+
+    result = pd.DataFrame({
+        row: np.repeat(np.asarray(row_levels, dtype=object), shape[1]),
+        col: np.tile(np.asarray(col_levels, dtype=object), shape[0]),
+        'count': cell_counts,
+        'proportion': observed.ravel(),
+        'ci_low': low.ravel(),
+        'ci_high': high.ravel(),
+    })
+    _CACHE[key] = result
+    if len(_CACHE) > MAX_CACHED:
+        _CACHE.popitem(last=False)
+    return result.copy()
+
+
+def ci_frames(intervals, row, col):
+    """Pivot bootstrap results into (proportion, ci_low, ci_high) row x col frames"""
+    return tuple(intervals.pivot(index=row, columns=col, values=v)
+                 for v in ('proportion', 'ci_low', 'ci_high'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bootstrap CIs for crosstab proportions")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="Path to Masterchart.csv")
+    parser.add_argument("--row", default="Age Group")
+    parser.add_argument("--col", default="Histopathological diagnosis")
+    parser.add_argument("--normalize", choices=["index", "columns", "all"], default="index")
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--workers", type=int, default=1, help="Process pool size for sharding resamples")
+    parser.add_argument("--output", help="Write the intervals to this CSV file")
+    args = parser.parse_args()
+
+    from thesis_analysis import load_and_clean_data
+    df = load_and_clean_data(args.data)
+    intervals = bootstrap_crosstab(df, args.row, args.col, args.normalize, args.resamples,
+                                   args.confidence, args.seed, args.workers)
+    print(intervals[intervals['count'] > 0].round(4).to_string(index=False))
+    if args.output:
+        intervals.to_csv(args.output, index=False)
+        print(f"\n✓ Saved bootstrap intervals to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,20 +4,28 @@ This script scans text-bearing files in the ../manuscript directory, extracts
 paragraph-sized passages, and produces a JSON index used by the dashboard's
 "Ask the Thesis" feature for client-side lexical retrieval.
 
-Output: ../dashboard/thesis_index.json
+Output: ../published/index/versions/<version>/thesis_index.json, published
+atomically (see publish.py) and mirrored to ../dashboard/thesis_index.json
 
 Index JSON structure:
 {
-  "meta": {"total_passages": int, "built_at": iso8601, "source_files": [...]},
+  "meta": {"total_passages": int, "built_at": iso8601, "source_files": [...],
+           "shards": {"Thesis.md": content_digest, ...},  # one per manuscript file
+           "normalization": {...}},  # token pipeline the query side must replay
   "documents": [
      {
        "id": "file_basename::paragraph_index",
        "file": "Thesis.md",
-       "section": "(optional heading if detected)",
+       "section": "Innermost heading above the passage (or null)",
+       "section_path": ["Thesis title", "MATERIAL AND METHODS", "Exclusion criteria"],
+       "offset": [start, end],  # byte range of the passage in the source file
        "text": "Original paragraph text",
-       "tokens": ["normalized", "tokens", ...],
        "tf": {"token": frequency_float,...},
-       "norm": float  # L2 norm of TF vector for cosine scoring
+       "norm": float,  # L2 norm of TF vector for cosine scoring
+       "sentences": [[start, end], ...],  # character offsets of answer sentences in "text"
+       "sentence_postings": {"token": [sentence_index, ...], ...},
+       "sources": [{"id", "file", "section", "section_path", "offset"}, ...]
+                  # only on passages that near-duplicates were collapsed into
      }, ...
   ],
   "idf": {"token": idf_float, ...}
@@ -25,126 +33,557 @@ Index JSON structure:
 
 Scoring (in frontend): cosine(query_tf_idf, passage_tf_idf)
 
+Answer composition: the sentences of the top passages that contain query terms
+are found by looking up the query tokens in "sentence_postings" rather than
+re-splitting and re-tokenizing passage text at query time.
+
+Passages are produced by a single streaming pass over each file's lines
+(parse_markdown): blank lines and headings end a passage, ATX headings
+(# to ######, outside code fences) maintain the heading hierarchy, and each
+passage records its full section path and its byte range in the source file,
+so the file bytes [start:end] are exactly the passage text. Builder time grows
+linearly with manuscript size.
+
+Near-duplicate passages (the manuscript folder holds overlapping copies, e.g.
+Literature_review.md, REVIEW OF LITERATURE.docx and the review chapter of
+Thesis.md) are collapsed before IDF is computed: each passage gets a MinHash
+signature over its word shingles, LSH banding proposes candidate pairs in
+roughly linear time, and pairs whose shingle Jaccard similarity reaches
+--dedup-threshold are merged into one canonical passage (markdown sources first,
+since their offsets point into the file) listing every source. A passage
+contained in a longer one (a copy that splits a paragraph in two) is merged
+only into a group whose canonical passage contains it, and only passages whose
+text the canonical passage covers are dropped.
+Requires numpy; without it the stage is skipped with a warning.
+
+A spelling table is written next to the index (thesis_spelling.json, meta.spelling):
+a symmetric-delete lookup over the surface words of the scored terms, weighted by
+the number of passages they appear in, so the dashboard and thesis_search.py can
+correct misspelled query words before scoring (see spelling.py).
+
+With --lsa the builder also stores latent semantic (LSA) passage vectors, a
+truncated SVD of the TF-IDF matrix saved as memory-mappable float32 .npy files
+next to thesis_index.json (meta.lsa), which the server blends with the lexical
+score to match paraphrases (see lsa_search.py). Requires numpy and scipy.
+
+The passages of each manuscript file form a shard identified by the file's
+content digest (meta.shards). watch.py keeps the shards between builds, so a
+rebuild after an edit only parses and tokenizes the files that changed.
+
 Assumptions & Simplifications:
  - Only .md and .txt are processed natively.
  - .docx files are parsed if python-docx is installed; otherwise skipped with a warning.
+   Each paragraph is a passage block and "Heading N" styles become headings; offsets
+   of .docx passages refer to the extracted text rather than the file.
  - .pdf files are ignored by default (can be added with pdfminer.six if needed later).
  - Basic tokenization: lowercase, split on non-alphabetic, remove short tokens and stopwords.
+ - Normalization (configurable, recorded in meta.normalization so the dashboard and
+   thesis_search.py tokenize queries identically):
+     * domain synonyms expand medical abbreviations (AUB, PALM-COEIN, HMB, ...)
+     * a light suffix stemmer folds surface forms ("hyperplasia"/"hyperplastic",
+       "endometrium"/"endometrial") while leaving disease suffixes such as -itis,
+       -osis and -oma intact
+     * document-frequency pruning drops hapax terms (df < --min-df) and terms present
+       in more than --max-df of passages
 
 Usage (Windows PowerShell):
   cd "c:/Users/coad1/OneDrive/Desktop/Thesis Figures and descriptions/scripts"
   python build_thesis_index.py
+  python build_thesis_index.py --no-stem --min-df 1 --max-df 1.0   # keep every surface form
+  python build_thesis_index.py --lsa 128   # also store 128-dimensional LSA vectors
 """
 
 from __future__ import annotations
+import argparse
+import functools
+import hashlib
 import json
 import math
 import os
 import re
 import sys
+import zlib
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from publish import INDEX_ARTIFACT, atomic_write, current_dir, read_pointer, staged_version
+from spelling import SPELLING_NAME, build_spelling_table
 
 ROOT = Path(__file__).resolve().parent.parent
 MANUSCRIPT_DIR = ROOT / "manuscript"
 OUTPUT_PATH = ROOT / "dashboard" / "thesis_index.json"
 
+def published_index_path() -> Path:
+    """The index of the published version, falling back to OUTPUT_PATH."""
+    current = current_dir(INDEX_ARTIFACT)
+    if current is not None and (current / OUTPUT_PATH.name).exists():
+        return current / OUTPUT_PATH.name
+    return OUTPUT_PATH
+
 # Minimal English stopword list (can be extended)
 STOPWORDS = {
     "the","a","an","and","or","of","to","in","for","on","with","is","are","was","were","be","by","as","that","this","it","at","from","we","our","their","there","which","these","those","has","had","have","but","not","can","may","also","than","such","its","into","using","used","between","more","most"
 }
 
 TOKEN_RE = re.compile(r"[A-Za-z]{2,}")  # 2+ letters
+SENTENCE_BREAK_RE = re.compile(r"(?<=[.!?])\s+")  # same split as the dashboard
+MIN_SENTENCE_CHARS = 20
+HEADING_RE = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+FENCE_RE = re.compile(r"^ {0,3}(?:```|~~~)")
+MIN_PASSAGE_WORDS = 5
+
+# Medical abbreviations expanded to the words used in the manuscript, so a
+# query for "AUB" matches passages that spell the term out and vice versa.
+SYNONYMS = {
+    "aub": "abnormal uterine bleeding",
+    "hmb": "heavy menstrual bleeding",
+    "pmb": "postmenopausal bleeding",
+    "imb": "intermenstrual bleeding",
+    "eh": "endometrial hyperplasia",
+    "ein": "endometrial intraepithelial neoplasia",
+    "palm": "palm coein classification",
+    "coein": "palm coein classification",
+    "figo": "figo classification",
+    "lmp": "last menstrual period",
+    "hpe": "histopathological examination",
+    "hrt": "hormone replacement therapy",
+    "ocp": "oral contraceptive pill",
+    "ocps": "oral contraceptive pill",
+    "iud": "intrauterine device",
+    "lng": "levonorgestrel",
+    "tvs": "transvaginal ultrasound",
+    "usg": "ultrasound",
+    "pcos": "polycystic ovary syndrome",
+    "fibroid": "leiomyoma",
+    "fibroids": "leiomyoma",
+}
+
+# Suffix stemmer rules. They are written into the index so the dashboard can
+# replay exactly the same stemming on queries.
+STEM_RULES = {
+    "plurals": [["sses", "ss"], ["ies", "y"], ["s", ""]],
+    "plural_exceptions": ["ss", "us", "is"],
+    # Disease suffixes carry meaning (endometrium vs endometritis/endometriosis)
+    "protected": ["itis", "osis", "oma"],
+    # Longest suffix first; a single suffix is removed per token
+    "suffixes": [
+        "ational", "ations", "ically", "ation", "ative", "ating", "ities",
+        "ical", "ated", "ates", "ness", "ment", "ings", "ing", "ity", "ate",
+        "tic", "ium", "ial", "ory", "ion", "ive", "ia", "ic", "al", "ed", "y", "e",
+    ],
+    "min_stem": 4,
+}
+
+# Default normalization pipeline used by the builder (see --help to override)
+DEFAULT_MIN_DF = 2
+DEFAULT_MAX_DF = 0.5
+
+# Near-duplicate detection: SHINGLE_WORDS-word shingles, DEDUP_BANDS x DEDUP_ROWS
+# MinHash values per signature (LSH candidates from ~0.35 Jaccard upwards)
+SHINGLE_WORDS = 5
+DEDUP_BANDS = 40
+DEDUP_ROWS = 3
+DEFAULT_DEDUP_THRESHOLD = 0.8
+# A passage split in two in another copy is contained in the longer passage;
+# containment only counts for passages with at least this many shingles
+MIN_CONTAINED_SHINGLES = 20
+MINHASH_SEED = 42
+MINHASH_PRIME = 4294967311  # smallest prime above 2**32
+# Canonical passage preference when collapsing duplicates
+SOURCE_PRIORITY = {".md": 0, ".txt": 1, ".docx": 2}
+SOURCE_SUFFIXES = tuple(SOURCE_PRIORITY)
+# Latent dimensions kept by --lsa
+DEFAULT_LSA_DIMS = 128
 
 def debug(msg: str):
     print(f"[build_thesis_index] {msg}")
 
-def read_markdown(path: Path) -> str:
-    return path.read_text(encoding="utf-8", errors="ignore")
+def iter_markdown_lines(path: Path) -> Iterator[bytes]:
+    """Stream the raw lines of a text file, line endings included."""
+    with path.open("rb") as f:
+        yield from f
 
-def read_docx(path: Path) -> str:
+def iter_docx_lines(path: Path) -> Iterator[bytes]:
+    """Render a .docx file as markdown lines: one block per paragraph, headings from styles."""
     try:
         import docx  # python-docx
     except ImportError:
         debug(f"python-docx not installed; skipping DOCX file {path.name}")
-        return ""
+        return
     try:
         doc = docx.Document(str(path))
-        return "\n".join(p.text for p in doc.paragraphs if p.text.strip())
     except Exception as e:
         debug(f"Failed to parse DOCX {path.name}: {e}")
-        return ""
-
-def tokenize(text: str) -> List[str]:
-    tokens = [t.lower() for t in TOKEN_RE.findall(text)]
-    return [t for t in tokens if t not in STOPWORDS and len(t) > 2]
-
-def split_into_paragraphs(text: str) -> List[str]:
-    # Normalize line endings, split on blank lines
-    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
-    # Filter out very short lines
-    return [p for p in paragraphs if len(p.split()) >= 5]
-
-def detect_section(lines_before: List[str]) -> str | None:
-    # Heuristic: last markdown heading encountered
-    for line in reversed(lines_before):
-        if line.startswith('#'):
-            return line.lstrip('#').strip()
-    return None
-
-def build_documents() -> Tuple[List[Dict], Dict[str, int]]:
+        return
+    for p in doc.paragraphs:
+        text = p.text.strip()
+        if not text:
+            continue
+        style = p.style.name if p.style is not None else ""
+        level = style[len("Heading "):] if style.startswith("Heading ") else ""
+        if level.isdigit():
+            text = "#" * min(int(level), 6) + " " + text
+        elif style == "Title":
+            text = "# " + text
+        yield (text + "\n").encode("utf-8")
+        yield b"\n"
+
+def normalization_spec(stem: bool = True, synonyms: bool = True,
+                       min_df: int = DEFAULT_MIN_DF, max_df: float = DEFAULT_MAX_DF) -> Dict:
+    """Describe a token normalization pipeline; stored as meta.normalization."""
+    return {
+        "stem": stem,
+        "stem_rules": STEM_RULES if stem else None,
+        "synonyms": SYNONYMS if synonyms else {},
+        "min_df": min_df,
+        "max_df": max_df,
+    }
+
+# Pipeline applied when no explicit normalization is requested
+NORMALIZATION = normalization_spec()
+# Behaviour of indexes built before normalization was recorded in their meta
+PLAIN_NORMALIZATION = normalization_spec(stem=False, synonyms=False, min_df=1, max_df=1.0)
+
+@functools.lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """Fold a lowercase token to its stem using STEM_RULES."""
+    rules = STEM_RULES
+    if len(token) > 3 and not token.endswith(tuple(rules["plural_exceptions"])):
+        for suffix, replacement in rules["plurals"]:
+            if token.endswith(suffix):
+                token = token[:-len(suffix)] + replacement
+                break
+    if token.endswith(tuple(rules["protected"])):
+        return token
+    for suffix in rules["suffixes"]:
+        if token.endswith(suffix) and len(token) - len(suffix) >= rules["min_stem"]:
+            return token[:-len(suffix)]
+    return token
+
+def tokenize(text: str, normalization: Dict | None = None, correct=None) -> List[str]:
+    """Tokenize text through the given normalization pipeline (default: NORMALIZATION).
+
+    correct: optional word -> word spelling correction applied before stemming
+    (queries only, see spelling.py).
+    """
+    if normalization is None:
+        normalization = NORMALIZATION
+    synonyms = normalization["synonyms"]
+    tokens: List[str] = []
+    for t in TOKEN_RE.findall(text):
+        t = t.lower()
+        expansion = synonyms.get(t)
+        if expansion:
+            tokens.extend(expansion.split())
+        else:
+            tokens.append(t)
+    tokens = [t for t in tokens if t not in STOPWORDS and len(t) > 2]
+    if correct is not None:
+        tokens = [correct(t) for t in tokens]
+    if normalization["stem"]:
+        tokens = [stem(t) for t in tokens]
+    return tokens
+
+def parse_markdown(lines: Iterable[bytes]) -> Iterator[Dict]:
+    """Stream passages with their section path and byte range from markdown lines.
+
+    Walks the lines once, keeping a stack of the enclosing headings. Blocks of
+    fewer than MIN_PASSAGE_WORDS words (e.g. table separators) are dropped.
+    """
+    headings: List[Tuple[int, str]] = []
+    block: List[bytes] = []
+    block_start = block_end = offset = 0
+    in_fence = False
+
+    def passage() -> Dict | None:
+        text = b"".join(block).strip().decode("utf-8", errors="replace")
+        if len(text.split()) < MIN_PASSAGE_WORDS:
+            return None
+        return {
+            "text": text,
+            "section": headings[-1][1] if headings else None,
+            "section_path": [title for _, title in headings],
+            "offset": [block_start, block_end],
+        }
+
+    for raw in lines:
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        heading = None if in_fence else HEADING_RE.match(line)
+        if heading and heading.group(2) and heading.group(2)[0].islower():
+            # Wrapped sentence fragments that a document conversion turned into "# ..." lines
+            heading = None
+        if heading or not line.strip():
+            if block:
+                found = passage()
+                if found:
+                    yield found
+                block = []
+            title = heading.group(2) if heading else None
+            if title:
+                level = len(heading.group(1))
+                while headings and headings[-1][0] >= level:
+                    headings.pop()
+                headings.append((level, title.strip()))
+        else:
+            if not block:
+                block_start = offset + len(raw) - len(raw.lstrip())
+            block.append(raw)
+            block_end = offset + len(raw.rstrip())
+        offset += len(raw)
+    if block:
+        found = passage()
+        if found:
+            yield found
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """Return (start, end) offsets of answer-worthy sentences within text."""
+    spans = []
+    start = 0
+    for m in SENTENCE_BREAK_RE.finditer(text):
+        spans.append((start, m.start()))
+        start = m.end()
+    spans.append((start, len(text)))
+    return [(a, b) for a, b in spans if len(text[a:b].strip()) > MIN_SENTENCE_CHARS]
+
+def build_sentence_index(text: str, normalization: Dict | None = None) -> Tuple[List[List[int]], Dict[str, List[int]]]:
+    """Sentence offsets plus token -> sentence-number postings for one passage."""
+    sentences = split_sentences(text)
+    postings: Dict[str, List[int]] = {}
+    for i, (a, b) in enumerate(sentences):
+        for t in set(tokenize(text[a:b], normalization)):
+            postings.setdefault(t, []).append(i)
+    return [[a, b] for a, b in sentences], postings
+
+def file_digest(path: Path) -> str:
+    """Content hash identifying one version of a manuscript file."""
+    return hashlib.sha1(path.read_bytes()).hexdigest()[:16]
+
+def file_passages(path: Path, normalization: Dict | None = None) -> List[Dict]:
+    """Tokenized passages of one manuscript file (the file's index shard)."""
+    passages = []
+    lines = iter_docx_lines(path) if path.suffix.lower() == ".docx" else iter_markdown_lines(path)
+    for idx, passage in enumerate(parse_markdown(lines)):
+        para = passage["text"]
+        para_tokens = tokenize(para, normalization)
+        if not para_tokens:
+            continue
+        tf_counts: Dict[str, int] = {}
+        for t in para_tokens:
+            tf_counts[t] = tf_counts.get(t, 0) + 1
+        # Raw term frequency normalization (log-scaling could be added later)
+        total = sum(tf_counts.values())
+        tf = {t: c / total for t, c in tf_counts.items()}
+        norm = math.sqrt(sum(v*v for v in tf.values())) or 1.0
+        sentences, sentence_postings = build_sentence_index(para, normalization)
+        passages.append({
+            "id": f"{path.stem}::{idx}",
+            "file": path.name,
+            "section": passage["section"],
+            "section_path": passage["section_path"],
+            "offset": passage["offset"],
+            "text": para,
+            "tf": tf,
+            "norm": norm,
+            "sentences": sentences,
+            "sentence_postings": sentence_postings,
+        })
+    return passages
+
+def build_documents(normalization: Dict | None = None,
+                    shards: Dict[str, Tuple[str, List[Dict]]] | None = None) -> Tuple[List[Dict], Dict[str, int]]:
+    """Passages of every manuscript file and the document frequency of each term.
+
+    shards, if given, is a cache {file name: (digest, passages)} kept between
+    builds with the same normalization (see watch.py): files whose content
+    digest is unchanged reuse their passages instead of being parsed and
+    tokenized again. It is updated in place and afterwards describes exactly
+    the files of this build.
+    """
     documents = []
     doc_freq: Dict[str, int] = {}
-    source_files: List[str] = []
+    if shards is None:
+        shards = {}
 
     if not MANUSCRIPT_DIR.exists():
         debug(f"Manuscript directory not found: {MANUSCRIPT_DIR}")
+        shards.clear()
         return [], {}
 
-    for path in sorted(MANUSCRIPT_DIR.iterate_dir() if hasattr(MANUSCRIPT_DIR, 'iterate_dir') else MANUSCRIPT_DIR.iterdir()):
-        if not path.is_file():
-            continue
-        ext = path.suffix.lower()
-        if ext not in {".md",".txt",".docx"}:
-            continue
-        debug(f"Processing {path.name}")
-        source_files.append(path.name)
-        if ext == ".md" or ext == ".txt":
-            raw = read_markdown(path)
-        elif ext == ".docx":
-            raw = read_docx(path)
-        else:
-            raw = ""
-        if not raw.strip():
+    seen = set()
+    for path in sorted(MANUSCRIPT_DIR.iterdir()):
+        if not path.is_file() or path.suffix.lower() not in SOURCE_SUFFIXES:
             continue
-        lines = raw.splitlines()
-        paragraphs = split_into_paragraphs(raw)
-        for idx, para in enumerate(paragraphs):
-            para_tokens = tokenize(para)
-            if not para_tokens:
-                continue
-            tf_counts: Dict[str, int] = {}
-            for t in para_tokens:
-                tf_counts[t] = tf_counts.get(t, 0) + 1
-            # Raw term frequency normalization (log-scaling could be added later)
-            total = sum(tf_counts.values())
-            tf = {t: c / total for t, c in tf_counts.items()}
-            for t in tf:
-                doc_freq[t] = doc_freq.get(t, 0) + 1
-            section = detect_section(lines[:idx+1])
-            norm = math.sqrt(sum(v*v for v in tf.values())) or 1.0
-            documents.append({
-                "id": f"{path.stem}::{idx}",
-                "file": path.name,
-                "section": section,
-                "text": para,
-                "tokens": para_tokens,
-                "tf": tf,
-                "norm": norm,
-            })
+        seen.add(path.name)
+        digest = file_digest(path)
+        cached = shards.get(path.name)
+        if cached is None or cached[0] != digest:
+            debug(f"Processing {path.name}")
+            shards[path.name] = (digest, file_passages(path, normalization))
+        # Copies: deduplication and pruning replace fields of the passages they keep
+        documents.extend(dict(doc) for doc in shards[path.name][1])
+    for name in set(shards) - seen:
+        del shards[name]
+
+    for doc in documents:
+        for t in doc["tf"]:
+            doc_freq[t] = doc_freq.get(t, 0) + 1
     return documents, doc_freq
 
+def prune_vocabulary(documents: List[Dict], doc_freq: Dict[str, int],
+                     min_df: int, max_df: float) -> Tuple[List[Dict], Dict[str, int]]:
+    """Drop terms with df < min_df or df > max_df * passages from every structure.
+
+    TF values are renormalized over the surviving terms; passages left without
+    any term are removed.
+    """
+    limit = max_df * len(documents)
+    keep = {t for t, df in doc_freq.items() if df >= min_df and df <= limit}
+    if len(keep) == len(doc_freq):
+        return documents, doc_freq
+    kept_docs = []
+    for doc in documents:
+        tf = {t: v for t, v in doc["tf"].items() if t in keep}
+        if not tf:
+            continue
+        total = sum(tf.values())
+        doc["tf"] = {t: v / total for t, v in tf.items()}
+        doc["norm"] = math.sqrt(sum(v*v for v in doc["tf"].values())) or 1.0
+        doc["sentence_postings"] = {t: p for t, p in doc["sentence_postings"].items() if t in keep}
+        kept_docs.append(doc)
+    pruned_freq = {t: df for t, df in doc_freq.items() if t in keep}
+    debug(f"Pruned vocabulary {len(doc_freq)} -> {len(pruned_freq)} terms "
+          f"(min_df={min_df}, max_df={max_df}); passages {len(documents)} -> {len(kept_docs)}")
+    return kept_docs, pruned_freq
+
+def shingles(text: str) -> set:
+    """CRC32 hashes of the SHINGLE_WORDS-word shingles of a passage."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"))
+            for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+def minhash_signatures(shingle_sets: List[set], num_perm: int, seed: int = MINHASH_SEED):
+    """MinHash signatures (passages x num_perm) from universal hashes (a*x + b) mod p."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    # a, b < 2**31 and x < 2**32 keep a*x + b within uint64
+    a = rng.integers(1, 2**31, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 2**31, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(shingle_sets), num_perm), dtype=np.uint64)
+    for i, values in enumerate(shingle_sets):
+        x = np.fromiter(values, dtype=np.uint64, count=len(values))
+        signatures[i] = ((np.outer(x, a) + b) % MINHASH_PRIME).min(axis=0)
+    return signatures
+
+def near_duplicate_groups(texts: List[str], threshold: float = DEFAULT_DEDUP_THRESHOLD,
+                          rank=None) -> List[List[int]]:
+    """Groups (2+ passage indices) of near-duplicate texts via MinHash LSH, canonical first.
+
+    Passages whose shingle Jaccard similarity reaches threshold are grouped
+    (transitively), and rank (a sort key over passage indices; default: most
+    shingles first) picks each group's canonical passage. A group whose every
+    passage is contained (shared / own shingles) in another group's canonical
+    passage joins that group. Containment is one level deep: a group that
+    joined another cannot take in further groups. Every passage that is not
+    the canonical one must itself be covered by the canonical passage, so
+    collapsing a group never drops text the index would otherwise lose;
+    uncovered passages stay on their own.
+    """
+    shingle_sets = [shingles(t) for t in texts]
+    signatures = minhash_signatures(shingle_sets, DEDUP_BANDS * DEDUP_ROWS)
+    parent = list(range(len(texts)))
+    if rank is None:
+        rank = lambda i: (-len(shingle_sets[i]), i)
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def covered(i: int, by: int) -> bool:
+        return len(shingle_sets[i] & shingle_sets[by]) >= threshold * len(shingle_sets[i])
+
+    checked = set()
+    contained: List[Tuple[int, int]] = []  # (contained passage, containing passage)
+    for band in range(DEDUP_BANDS):
+        buckets: Dict[bytes, List[int]] = {}
+        rows = signatures[:, band * DEDUP_ROWS:(band + 1) * DEDUP_ROWS]
+        for i in range(len(texts)):
+            buckets.setdefault(rows[i].tobytes(), []).append(i)
+        for members in buckets.values():
+            for n, i in enumerate(members):
+                for j in members[n + 1:]:
+                    if (i, j) in checked:
+                        continue
+                    checked.add((i, j))
+                    a, b = shingle_sets[i], shingle_sets[j]
+                    shared = len(a & b)
+                    if shared / len(a | b) >= threshold:
+                        parent[find(j)] = find(i)
+                        continue
+                    small, large = (i, j) if len(a) <= len(b) else (j, i)
+                    if len(shingle_sets[small]) >= MIN_CONTAINED_SHINGLES and covered(small, large):
+                        contained.append((small, large))
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(texts)):
+        groups.setdefault(find(i), []).append(i)
+    for members in groups.values():
+        members.sort(key=rank)
+
+    # Containing group of each group whose passages all lie in its canonical passage
+    joins: Dict[int, int] = {}
+    for small, large in contained:
+        child, container = find(small), find(large)
+        if child != container and child not in joins and \
+                all(covered(i, groups[container][0]) for i in groups[child]):
+            joins[child] = container
+    for child, container in joins.items():
+        if container not in joins:
+            groups[container].extend(groups.pop(child))
+
+    result = []
+    for members in groups.values():
+        canonical = members[0]
+        members = [canonical] + [i for i in members[1:] if covered(i, canonical)]
+        if len(members) > 1:
+            result.append(members)
+    return result
+
+def collapse_duplicates(documents: List[Dict], doc_freq: Dict[str, int],
+                        threshold: float = DEFAULT_DEDUP_THRESHOLD) -> Tuple[List[Dict], Dict[str, int]]:
+    """Merge near-duplicate passages into one canonical passage listing every source."""
+    def rank(i: int):
+        # Markdown passages first (their offsets point into the file), then the fullest text
+        return (SOURCE_PRIORITY.get(Path(documents[i]["file"]).suffix.lower(), 9), -len(documents[i]["text"]), i)
+
+    try:
+        groups = near_duplicate_groups([d["text"] for d in documents], threshold, rank)
+    except ImportError:
+        debug("numpy not installed; skipping near-duplicate detection")
+        return documents, doc_freq
+    dropped = set()
+    for group in groups:
+        canonical = documents[group[0]]
+        canonical["sources"] = [{k: documents[i].get(k) for k in ("id", "file", "section", "section_path", "offset")}
+                                for i in group]
+        for i in group[1:]:
+            dropped.add(i)
+            for t in documents[i]["tf"]:
+                doc_freq[t] -= 1
+    if not dropped:
+        return documents, doc_freq
+    debug(f"Collapsed {len(dropped)} near-duplicate passages into {len(groups)} "
+          f"(threshold={threshold}); passages {len(documents)} -> {len(documents) - len(dropped)}")
+    return ([d for i, d in enumerate(documents) if i not in dropped],
+            {t: df for t, df in doc_freq.items() if df > 0})
+
 def compute_idf(doc_freq: Dict[str, int], total_docs: int) -> Dict[str, float]:
     idf = {}
     for token, df in doc_freq.items():
@@ -152,26 +591,105 @@ def compute_idf(doc_freq: Dict[str, int], total_docs: int) -> Dict[str, float]:
         idf[token] = math.log((total_docs + 1) / (df + 1)) + 1.0
     return idf
 
-def main():
-    documents, doc_freq = build_documents()
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the Ask the Thesis search index")
+    parser.add_argument("--no-stem", action="store_true", help="Keep every surface form (disable suffix stemming)")
+    parser.add_argument("--no-synonyms", action="store_true", help="Do not expand medical abbreviations")
+    parser.add_argument("--min-df", type=int, default=DEFAULT_MIN_DF, help="Drop terms found in fewer passages (default: %(default)s)")
+    parser.add_argument("--max-df", type=float, default=DEFAULT_MAX_DF, help="Drop terms found in more than this fraction of passages (default: %(default)s)")
+    parser.add_argument("--dedup-threshold", type=float, default=DEFAULT_DEDUP_THRESHOLD, help="Shingle Jaccard similarity at which passages are collapsed (default: %(default)s)")
+    parser.add_argument("--no-dedup", action="store_true", help="Keep near-duplicate passages")
+    parser.add_argument("--no-spelling", action="store_true", help="Do not write the query spelling correction table")
+    parser.add_argument("--lsa", type=int, nargs="?", const=DEFAULT_LSA_DIMS, metavar="DIMS",
+                        help=f"Also store LSA passage vectors (default dimensions: {DEFAULT_LSA_DIMS})")
+    return parser.parse_args()
+
+def build_index(normalization: Dict, dedup_threshold: float | None = DEFAULT_DEDUP_THRESHOLD,
+                min_df: int = DEFAULT_MIN_DF, max_df: float = DEFAULT_MAX_DF,
+                shards: Dict | None = None) -> Dict:
+    """Build the index JSON structure (dedup_threshold None keeps near-duplicates)."""
+    shards = {} if shards is None else shards
+    documents, doc_freq = build_documents(normalization, shards)
+    if dedup_threshold is not None:
+        documents, doc_freq = collapse_duplicates(documents, doc_freq, dedup_threshold)
+    documents, doc_freq = prune_vocabulary(documents, doc_freq, min_df, max_df)
     total_docs = len(documents)
     if not documents:
         debug("No documents extracted; writing empty index")
     idf = compute_idf(doc_freq, total_docs) if documents else {}
 
-    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    data = {
+    return {
         "meta": {
             "total_passages": total_docs,
             "built_at": datetime.now(timezone.utc).isoformat(),
             "source_files": sorted({d["file"] for d in documents}),
+            "shards": {name: digest for name, (digest, _) in sorted(shards.items())},
             "stopwords": len(STOPWORDS),
+            "normalization": normalization,
+            "dedup_threshold": dedup_threshold,
         },
         "documents": documents,
         "idf": idf,
     }
-    OUTPUT_PATH.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-    debug(f"Index written to {OUTPUT_PATH} (passages: {total_docs})")
+
+def build_spelling(data: Dict) -> Dict:
+    """Symmetric-delete spelling table of the words behind the index's scored terms."""
+    normalization = data["meta"]["normalization"]
+    surface = dict(normalization, stem=False)
+    word_df: Dict[str, int] = {}
+    for doc in data["documents"]:
+        for word in set(tokenize(doc["text"], surface)):
+            word_df[word] = word_df.get(word, 0) + 1
+    scored = {w: df for w, df in word_df.items()
+              if (stem(w) if normalization["stem"] else w) in data["idf"]}
+    return build_spelling_table(scored, word_df)
+
+def publish_index(data: Dict, lsa_dims: int | None = None, spelling: bool = True) -> str:
+    """Publish an index as a new version and mirror it to OUTPUT_PATH; returns the version.
+
+    lsa_dims also stores LSA passage vectors of that many dimensions in the version;
+    spelling writes the query spelling table (SPELLING_NAME) next to the index.
+    """
+    spelling_body = None
+    if spelling and data["documents"]:
+        table = build_spelling(data)
+        data["meta"]["spelling"] = {"file": SPELLING_NAME, "words": len(table["words"]),
+                                    "deletes": len(table["deletes"])}
+        spelling_body = json.dumps(table, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    lsa = None
+    if lsa_dims and data["documents"]:
+        try:
+            from lsa_search import build_lsa, write_lsa
+        except ImportError:
+            debug("numpy/scipy not installed; skipping LSA vectors")
+        else:
+            vectors, terms, data["meta"]["lsa"] = build_lsa(data, lsa_dims)
+            lsa = (vectors, terms)
+            debug(f"LSA: {data['meta']['lsa']['dims']} dimensions, "
+                  f"{data['meta']['lsa']['explained_variance']:.0%} of the TF-IDF variance")
+    body = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    # Readers (the dashboard server, the static dashboard) never see a half-written index
+    with staged_version(INDEX_ARTIFACT, seed=False) as staging:
+        (staging / OUTPUT_PATH.name).write_bytes(body)
+        if spelling_body is not None:
+            (staging / SPELLING_NAME).write_bytes(spelling_body)
+        if lsa is not None:
+            write_lsa(staging, *lsa)
+    # The dashboard only reads the JSON files; the LSA arrays stay in the version directory
+    if spelling_body is not None:
+        atomic_write(OUTPUT_PATH.parent / SPELLING_NAME, spelling_body)
+    atomic_write(OUTPUT_PATH, body)
+    version = read_pointer(INDEX_ARTIFACT)["version"]
+    debug(f"Index version {version} published and written to {OUTPUT_PATH} "
+          f"(passages: {data['meta']['total_passages']})")
+    return version
+
+def main():
+    args = parse_args()
+    normalization = normalization_spec(stem=not args.no_stem, synonyms=not args.no_synonyms,
+                                       min_df=args.min_df, max_df=args.max_df)
+    data = build_index(normalization, None if args.no_dedup else args.dedup_threshold, args.min_df, args.max_df)
+    publish_index(data, args.lsa, spelling=not args.no_spelling)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,196 @@
+"""
+Vectorized Parsers for Free-Text Clinical Columns
+
+The Masterchart records the last menstrual period (LMP) and obstetric history
+(Parity) as free text: dates such as "09-03-23", "6-5-23" or "18.05.23" mixed
+with "post menopausal", and parity codes such as "p2l2", "P3L1" or "nullipara".
+
+Both columns have far fewer distinct values than rows, so every parser works
+on the unique values only (pd.factorize) and broadcasts the parsed result back
+to the rows through the integer codes. Parsing itself is vectorized with
+str.extract; the day/month order of dates is inferred once per distinct
+pattern (e.g. "dd-d-dd") rather than per value.
+
+Columns added by parse_clinical_columns():
+- LMP Date (datetime64, NaT when unparseable or menopausal)
+- Menopausal (bool)
+- Days Since LMP (Int64, days from the LMP to --reference-date; NA when no
+  reference date is given, since the register records no visit dates)
+- Gravida, Parity Count, Living Children, Abortions (Int64)
+
+Usage:
+  python clinical_parsers.py
+  python clinical_parsers.py --reference-date 2023-12-31 --output parsed.csv
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_PATH = os.path.join(ROOT, "data", "Masterchart.csv")
+
+# Numeric dates with -, . or / separators and 2- or 4-digit years
+DATE_RE = r'^(\d{1,2})\s*[-./]\s*(\d{1,2})\s*[-./]\s*(\d{2}|\d{4})$'
+
+# Menopausal status is written in many (mis)spellings: menopause, post menpausal, ...
+MENOPAUSAL_RE = r'men\w*pau'
+
+# Obstetric formula, optionally with gravida and abortions: g3p2l2a1, p2l2, p1 l1
+PARITY_RE = r'^(?:g(?P<g>\d+))?\s*p(?P<p>\d*)\s*l(?P<l>\d+)\s*(?:a(?P<a>\d+))?$'
+NULLIPARA_RE = r'^(?:nulli\w*|p0)$'
+
+
+def _unique_strings(series):
+    """
+    Factorize a column into row codes and its normalized unique strings
+
+    Missing values get the code of a trailing empty string, which every parser
+    maps to a missing result, so the parsed uniques can be broadcast back with
+    a single take().
+    """
+    codes, uniques = pd.factorize(series)
+    values = pd.Series(uniques, dtype=object).astype(str).str.strip().str.lower()
+    codes = np.where(codes < 0, len(values), codes)
+    return codes, pd.concat([values, pd.Series([''])], ignore_index=True)
+
+
+def infer_day_first(parts):
+    """
+    Infer field order per distinct date pattern
+
+    A pattern is the digit shape of a value ("dd-d-dd"). The pattern is read
+    month-first only if some value can't be day-first (middle field > 12) and
+    none contradicts month-first; otherwise day-first, the register's convention.
+
+    Args:
+        parts: DataFrame with integer 'first', 'second' columns and a 'pattern' column
+
+    Returns:
+        Boolean Series aligned with parts
+    """
+    by_pattern = parts.groupby('pattern', sort=False)
+    month_first = (by_pattern['second'].transform('max') > 12) & (by_pattern['first'].transform('max') <= 12)
+    return ~month_first
+
+
+def parse_lmp_values(values):
+    """
+    Parse normalized unique LMP strings
+
+    Returns:
+        DataFrame with 'LMP Date' (datetime64) and 'Menopausal' (bool)
+    """
+    values = pd.Series(values, dtype=object).reset_index(drop=True)
+    parts = values.str.extract(DATE_RE)
+    parts.columns = ['first', 'second', 'year']
+    matched = parts['first'].notna()
+    dates = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    if matched.any():
+        fields = parts[matched].astype(int)
+        fields['pattern'] = values[matched].str.replace(r'\d', 'd', regex=True)
+        day_first = infer_day_first(fields)
+        year = fields['year'].where(fields['year'] >= 100, fields['year'] + 2000)
+        dates[matched] = pd.to_datetime(pd.DataFrame({
+            'year': year,
+            'month': fields['second'].where(day_first, fields['first']),
+            'day': fields['first'].where(day_first, fields['second']),
+        }), errors='coerce')
+    return pd.DataFrame({
+        'LMP Date': dates,
+        'Menopausal': values.str.contains(MENOPAUSAL_RE, regex=True, na=False),
+    })
+
+
+def parse_parity_values(values):
+    """
+    Parse normalized unique obstetric formulas
+
+    Gravida is taken from an explicit "g" term, otherwise estimated as
+    parity + abortions. A bare "p" (e.g. "pl0") counts as missing parity.
+
+    Returns:
+        DataFrame with Int64 'Gravida', 'Parity Count', 'Living Children', 'Abortions'
+    """
+    values = pd.Series(values, dtype=object).reset_index(drop=True)
+    compact = values.str.replace(r'[\s.,/-]+', '', regex=True).str.replace(r'^0p', 'p', regex=True)
+    parts = compact.str.extract(PARITY_RE)
+    matched = parts['l'].notna()
+    numbers = parts.apply(pd.to_numeric, errors='coerce').astype('Int64')
+    numbers['a'] = numbers['a'].where(~matched, numbers['a'].fillna(0))
+    nullipara = compact.str.match(NULLIPARA_RE, na=False)
+    numbers.loc[nullipara, ['g', 'p', 'l', 'a']] = 0
+    return pd.DataFrame({
+        'Gravida': numbers['g'].fillna(numbers['p'] + numbers['a']),
+        'Parity Count': numbers['p'],
+        'Living Children': numbers['l'],
+        'Abortions': numbers['a'],
+    })
+
+
+def parse_lmp(series, reference_date=None):
+    """
+    Parse an LMP column into typed columns
+
+    Args:
+        series: Raw LMP column
+        reference_date: Date 'Days Since LMP' is counted to (e.g. the date
+            of the biopsies); without one the column is left NA
+
+    Returns:
+        DataFrame indexed like series
+    """
+    codes, values = _unique_strings(series)
+    parsed = parse_lmp_values(values)
+    result = parsed.take(codes).set_index(series.index)
+    if reference_date is None:
+        result['Days Since LMP'] = pd.Series(pd.NA, index=result.index, dtype='Int64')
+    else:
+        result['Days Since LMP'] = (pd.Timestamp(reference_date) - result['LMP Date']).dt.days.astype('Int64')
+    return result
+
+
+def parse_parity(series):
+    """Parse a Parity column into Int64 obstetric counts indexed like series"""
+    codes, values = _unique_strings(series)
+    return parse_parity_values(values).take(codes).set_index(series.index)
+
+
+def parse_clinical_columns(df, reference_date=None):
+    """Add the parsed LMP and Parity columns to df (in place) and return it"""
+    if 'LMP' in df.columns:
+        lmp = parse_lmp(df['LMP'], reference_date)
+        for col in lmp.columns:
+            df[col] = lmp[col]
+    if 'Parity' in df.columns:
+        parity = parse_parity(df['Parity'])
+        for col in parity.columns:
+            df[col] = parity[col]
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse LMP dates and parity codes")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="Path to Masterchart.csv")
+    parser.add_argument("--reference-date", help="Date to count days since LMP to (without it the column is left empty)")
+    parser.add_argument("--output", help="Write the parsed columns to this CSV file")
+    args = parser.parse_args()
+
+    from thesis_analysis import load_and_clean_data
+    df = load_and_clean_data(args.data, reference_date=args.reference_date)
+    columns = ['LMP', 'LMP Date', 'Menopausal', 'Days Since LMP',
+               'Parity', 'Gravida', 'Parity Count', 'Living Children', 'Abortions']
+    parsed = df[[c for c in columns if c in df.columns]]
+    print(parsed.dtypes.to_string())
+    print(f"\nLMP parsed: {parsed['LMP Date'].notna().sum()} dates, {parsed['Menopausal'].sum()} menopausal, "
+          f"{(df['LMP'].notna() & parsed['LMP Date'].isna() & ~parsed['Menopausal']).sum()} unparsed")
+    print(f"Parity parsed: {parsed['Parity Count'].notna().sum()} of {df['Parity'].notna().sum()}")
+    if args.output:
+        parsed.to_csv(args.output, index=False)
+        print(f"\n✓ Saved parsed columns to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Bitmap-Indexed Cohort Filtering
+
+Drill-down questions such as "diagnoses for age 41-50 with hormonal intake and
+menorrhagia" used to scan the DataFrame with a pandas boolean mask and copy
+the matching rows for every request. CohortIndex is built once from the
+cleaned Masterchart instead: every value of each categorical column, and every
+AGE_BIN_WIDTH-year age bin, gets a bitmap of the rows that have it, packed into
+64-bit words (one bit per row, 1/8 of a boolean mask).
+
+Filters are resolved with bitwise operations only:
+
+- {column: [values]} ORs the value bitmaps, {column: value} picks one
+- {"Age": {"min": 41, "max": 50}} ORs the age bins in the inclusive range;
+  {"Age": 45} and {"Age": [45, 46]} pick single ages when the bins are exact
+- Several columns in one dict are ANDed
+- {"and": [...]}, {"or": [...]} and {"not": filter} combine filters
+
+Counts are popcounts of the result and a filtered crosstab is one AND and
+popcount per cell, so neither touches the DataFrame. The filter format
+extends the one render_daemon.py accepts.
+
+Usage:
+  python cohort_index.py --row "Age Group" --col "Histopathological diagnosis" --filter "Drug history=Hormonal Intake"
+  python cohort_index.py --col "Histopathological diagnosis" --filter "Age>=41" --filter "Age<=50" --filter "Complaints=Menorrhagia"
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_PATH = os.path.join(ROOT, "data", "Masterchart.csv")
+
+INDEXED_COLUMNS = [
+    'Age Group',
+    'Histopathological diagnosis',
+    'Complaints',
+    'Drug history',
+    'correlation with LMP',
+]
+AGE_COLUMN = 'Age'
+# Age ranges are resolved to whole bins; with 1-year bins and ages recorded in
+# whole years they are exact
+AGE_BIN_WIDTH = 1
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(words):
+        """Number of set bits in an array of uint64 words"""
+        return int(np.bitwise_count(words).sum())
+else:
+    _BYTE_BITS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        """Number of set bits in an array of uint64 words"""
+        return int(_BYTE_BITS[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+def pack(mask):
+    """Boolean row mask -> bitmap of uint64 words"""
+    bits = np.packbits(np.asarray(mask, dtype=bool), bitorder='little')
+    words = np.zeros((len(bits) + 7) // 8 * 8, dtype=np.uint8)
+    words[:len(bits)] = bits
+    return words.view(np.uint64)
+
+
+def unpack(bitmap, size):
+    """Bitmap -> boolean row mask of length size"""
+    return np.unpackbits(bitmap.view(np.uint8), count=size, bitorder='little').astype(bool)
+
+
+class CohortIndex:
+    """Bitmaps per categorical value and age bin of one DataFrame"""
+
+    def __init__(self, df, columns=None, age_column=AGE_COLUMN, age_bin_width=AGE_BIN_WIDTH):
+        """
+        Args:
+            df: Cleaned DataFrame (kept for frame(); not read by queries)
+            columns: Categorical columns to index (default: INDEXED_COLUMNS present in df)
+            age_column: Numeric column indexed by age bins (None to skip)
+            age_bin_width: Width of the age bins in years
+        """
+        self.df = df
+        self.size = len(df)
+        self.all = pack(np.ones(self.size, dtype=bool))
+        self.empty = np.zeros_like(self.all)
+        self.bitmaps = {}
+        for column in columns or [c for c in INDEXED_COLUMNS if c in df.columns]:
+            codes, levels = pd.factorize(df[column], sort=True)
+            self.bitmaps[column] = self._pack_codes(codes, levels)
+
+        self.age_column = age_column if age_column in df.columns else None
+        self.age_bin_width = age_bin_width
+        if self.age_column:
+            ages = pd.to_numeric(df[self.age_column], errors='coerce').to_numpy(dtype=np.float64)
+            bins = np.floor(ages / age_bin_width)
+            present = ~np.isnan(bins)
+            self.age_offset = int(bins[present].min()) if present.any() else 0
+            codes = np.where(present, bins - self.age_offset, -1).astype(np.int64)
+            self.age_bins = [bitmap for bitmap in self._pack_codes(codes, range(codes.max() + 1)).values()]
+            # One bin per age: exact ages can be looked up as one-bin ranges
+            self.age_exact = age_bin_width == 1 and bool(np.all(ages[present] == bins[present]))
+
+    def _pack_codes(self, codes, levels):
+        """One bitmap per level, from the rows sorted by code (missing = -1)"""
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(levels) + 1))
+        bitmaps = {}
+        for i, level in enumerate(levels):
+            mask = np.zeros(self.size, dtype=bool)
+            mask[order[bounds[i]:bounds[i + 1]]] = True
+            bitmaps[level] = pack(mask)
+        return bitmaps
+
+    @classmethod
+    def from_path(cls, data_path, **kwargs):
+        """Load and clean a data file, then index it"""
+        from thesis_analysis import load_and_clean_data
+        return cls(load_and_clean_data(data_path), **kwargs)
+
+    def _column(self, column, condition):
+        if column == self.age_column and isinstance(condition, dict):
+            return self._age_range(condition.get('min'), condition.get('max'))
+        if column == self.age_column and column not in self.bitmaps:
+            return self._ages(condition if isinstance(condition, (list, tuple)) else [condition])
+        if column not in self.bitmaps:
+            raise KeyError(column)
+        values = condition if isinstance(condition, (list, tuple)) else [condition]
+        result = self.empty.copy()
+        for value in values:
+            bitmap = self.bitmaps[column].get(value)
+            if bitmap is not None:
+                result |= bitmap
+        return result
+
+    def _age_range(self, low=None, high=None):
+        first = 0 if low is None else int(np.ceil(low / self.age_bin_width)) - self.age_offset
+        last = len(self.age_bins) - 1 if high is None else int(np.floor(high / self.age_bin_width)) - self.age_offset
+        result = self.empty.copy()
+        for bitmap in self.age_bins[max(first, 0):last + 1]:
+            result |= bitmap
+        return result
+
+    def _ages(self, ages):
+        """Rows with any of the given ages (exact bins and whole-year ages only)"""
+        result = self.empty.copy()
+        for age in ages:
+            if not self.age_exact or isinstance(age, bool) or not isinstance(age, (int, float)):
+                raise KeyError(self.age_column)
+            if age == int(age):
+                result |= self._age_range(age, age)
+        return result
+
+    def select(self, filters=None):
+        """
+        Resolve a filter expression to a row bitmap
+
+        Args:
+            filters: None (all rows), {column: condition, ...} (ANDed), or
+                {"and": [filters]}, {"or": [filters]}, {"not": filters}
+
+        Raises:
+            KeyError: for columns that are not indexed
+        """
+        if not filters:
+            return self.all.copy()
+        if len(filters) == 1:
+            (op, operand), = filters.items()
+            if op == 'and':
+                result = self.all.copy()
+                for f in operand:
+                    result &= self.select(f)
+                return result
+            if op == 'or':
+                result = self.empty.copy()
+                for f in operand:
+                    result |= self.select(f)
+                return result
+            if op == 'not':
+                return ~self.select(operand) & self.all
+        result = self.all.copy()
+        for column, condition in filters.items():
+            result &= self._column(column, condition)
+        return result
+
+    def count(self, filters=None):
+        """Number of rows matching the filters"""
+        return popcount(self.select(filters))
+
+    def value_counts(self, column, filters=None):
+        """Counts per value of an indexed column within the filtered rows"""
+        if column not in self.bitmaps:
+            raise KeyError(column)
+        selected = self.select(filters)
+        return pd.Series({value: popcount(bitmap & selected) for value, bitmap in self.bitmaps[column].items()},
+                         name='count', dtype=np.int64)
+
+    def crosstab(self, row, col, filters=None):
+        """
+        Counts of row x col values within the filtered rows
+
+        Returns:
+            DataFrame like pd.crosstab(df[row], df[col]) on the filtered rows,
+            including all-zero rows and columns
+        """
+        for column in (row, col):
+            if column not in self.bitmaps:
+                raise KeyError(column)
+        selected = self.select(filters)
+        col_levels = list(self.bitmaps[col])
+        col_bitmaps = np.stack([self.bitmaps[col][value] for value in col_levels])
+        counts = {value: [popcount(cells) for cells in (col_bitmaps & (bitmap & selected))]
+                  for value, bitmap in self.bitmaps[row].items()}
+        table = pd.DataFrame.from_dict(counts, orient='index', columns=col_levels)
+        table.index.name, table.columns.name = row, col
+        return table
+
+    def rows(self, filters=None):
+        """Positions of the matching rows"""
+        return np.flatnonzero(unpack(self.select(filters), self.size))
+
+    def frame(self, filters=None):
+        """Matching rows of the indexed DataFrame (the DataFrame itself for no filters)"""
+        if not filters:
+            return self.df
+        return self.df.take(self.rows(filters))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bitmap-indexed cohort counts and crosstabs")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="Path to Masterchart.csv or the .xlsx register")
+    parser.add_argument("--filter", action="append", default=[],
+                        help="Cohort filter, e.g. 'Drug history=Hormonal Intake' or 'Age>=40' (repeatable)")
+    parser.add_argument("--row", help="Crosstab row column (default: value counts of --col)")
+    parser.add_argument("--col", default="Histopathological diagnosis")
+    args = parser.parse_args()
+
+    from render_daemon import parse_filters
+    start = time.perf_counter()
+    index = CohortIndex.from_path(args.data)
+    print(f"Indexed {index.size} rows in {time.perf_counter() - start:.3f}s")
+
+    filters = parse_filters(args.filter)
+    start = time.perf_counter()
+    table = index.crosstab(args.row, args.col, filters) if args.row else index.value_counts(args.col, filters)
+    elapsed = time.perf_counter() - start
+    print(table.to_string())
+    print(f"\n✓ {index.count(filters)} matching rows; query took {elapsed * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+"""
+Background Jobs for Heavy Operations
+
+Index rebuilds, figure regeneration and PDF image extraction take seconds to
+minutes, so the dashboard server runs them as jobs instead of inside a
+request. JobQueue keeps every job in a SQLite table (JOBS_DB_PATH), so job
+history and status survive restarts and can be read by any process, and runs
+them in a ProcessPoolExecutor of at most JOB_WORKERS processes:
+
+- Submitting a job that is identical (same kind and parameters) to one still
+  queued or running returns that job instead of adding another
+- At most MAX_PENDING_JOBS jobs wait at once; further submissions are refused
+- Jobs that publish the same artifact run one at a time (two figure builds
+  would otherwise both start from the same version and the later one would
+  undo the earlier), others run side by side
+- A job reports progress (fraction done and a message) to its row, and a
+  cancel request is noticed at its next progress report; queued jobs are
+  cancelled immediately
+- Jobs still marked queued or running when the server stopped are marked
+  interrupted at the next start
+
+Each kind in JOB_KINDS publishes its output as a new version (publish.py),
+so a cancelled or failed job leaves the served files untouched.
+
+Usage:
+  python jobs.py
+  python jobs.py --run figures --param charts=age_distribution,complaints
+  python jobs.py --run index --param lsa=8 --param no_dedup
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JOBS_DB_PATH = os.path.join(ROOT, "published", "jobs.sqlite3")
+DEFAULT_DATA_PATH = os.path.join(ROOT, "data", "Masterchart.csv")
+DEFAULT_PDF_PATH = os.path.join(ROOT, "final_outputs", "THESIS.pdf")
+
+JOB_WORKERS = 2
+MAX_PENDING_JOBS = 16
+ACTIVE_STATUSES = ('queued', 'running')
+# 'status IN ...' placeholders; the statuses are bound as query parameters
+ACTIVE_IN = f"({', '.join('?' * len(ACTIVE_STATUSES))})"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    submitted_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, submitted_at);
+CREATE INDEX IF NOT EXISTS jobs_dedup_key ON jobs (dedup_key, status);
+"""
+
+
+class JobCancelled(Exception):
+    """Raised from a progress report once the job has been cancelled"""
+
+
+class JobRejected(Exception):
+    """Raised by JobQueue.submit for unknown kinds or bad parameters"""
+
+
+class QueueFull(JobRejected):
+    """Raised by JobQueue.submit when MAX_PENDING_JOBS jobs are already waiting"""
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+@contextlib.contextmanager
+def connect(db_path=JOBS_DB_PATH):
+    """A connection to the job table that commits on success (WAL, so readers never block)"""
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def create_table(conn):
+    for statement in SCHEMA.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+
+
+def list_jobs(db_path=JOBS_DB_PATH, limit=50):
+    """Most recently submitted jobs first"""
+    with connect(db_path) as conn:
+        create_table(conn)
+        rows = conn.execute("SELECT * FROM jobs ORDER BY submitted_at DESC LIMIT ?", (limit,)).fetchall()
+    return [job_payload(row) for row in rows]
+
+
+def job_payload(row):
+    """JSON-serializable view of a job row"""
+    job = dict(row)
+    job['params'] = json.loads(job['params'])
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    job['cancel_requested'] = bool(job['cancel_requested'])
+    del job['dedup_key']
+    return job
+
+
+# --- Job kinds (run in the worker processes) ---
+
+def run_index_job(params, progress):
+    from build_thesis_index import DEFAULT_DEDUP_THRESHOLD, NORMALIZATION, build_index, publish_index
+    progress(0.0, "Parsing the manuscript")
+    threshold = None if params.get('no_dedup') else DEFAULT_DEDUP_THRESHOLD
+    data = build_index(NORMALIZATION, threshold, NORMALIZATION['min_df'], NORMALIZATION['max_df'])
+    progress(0.8, "Publishing the index")
+    return {'version': publish_index(data, params.get('lsa')), 'passages': data['meta']['total_passages']}
+
+
+def run_figures_job(params, progress):
+    from thesis_analysis import (CHARTS, check_required_libraries, load_and_clean_data, publish_charts,
+                                 set_plot_style)
+    charts = params.get('charts') or list(CHARTS)
+    check_required_libraries(charts)
+    progress(0.0, "Loading the dataset")
+    df = load_and_clean_data(DEFAULT_DATA_PATH)
+    if any('matplotlib' in CHARTS[name]['backends'] for name in charts):
+        set_plot_style()
+    version = publish_charts(df, charts, lambda fraction, name: progress(fraction, f"Rendered {name}"))
+    return {'version': version, 'charts': charts}
+
+
+def run_pdf_images_job(params, progress):
+    from Image_extractor import extract_images
+    from publish import FIGURES_ARTIFACT, read_pointer, staged_version
+    if not os.path.isfile(DEFAULT_PDF_PATH):
+        raise FileNotFoundError(f"{DEFAULT_PDF_PATH} not found")
+    with staged_version(FIGURES_ARTIFACT, mirror=os.path.join(ROOT, "figures")) as staging:
+        extract_images(DEFAULT_PDF_PATH, str(staging), progress=progress)
+    return {'version': read_pointer(FIGURES_ARTIFACT)['version']}
+
+
+def validate_index_params(params):
+    no_dedup = params.get('no_dedup')
+    if no_dedup is not None and not isinstance(no_dedup, bool):
+        raise JobRejected("'no_dedup' must be true or false")
+    lsa = params.get('lsa')
+    if lsa is not None and (isinstance(lsa, bool) or not isinstance(lsa, int) or not 1 <= lsa <= 1024):
+        raise JobRejected("'lsa' must be a number of LSA dimensions between 1 and 1024")
+
+
+def validate_figures_params(params):
+    from thesis_analysis import CHARTS
+    charts = params.get('charts')
+    if charts is not None:
+        if not isinstance(charts, list) or not charts:
+            raise JobRejected("'charts' must be a non-empty list of chart names")
+        unknown = [name for name in charts if name not in CHARTS]
+        if unknown:
+            raise JobRejected(f"Unknown chart(s): {', '.join(map(str, unknown))}")
+        # Same charts in another order are the same job
+        params['charts'] = sorted(set(charts))
+
+
+def parse_flag(value):
+    """Boolean job parameter given on the command line ('no_dedup', 'no_dedup=0', ...)"""
+    flag = value.strip().lower()
+    if flag in ('', '1', 'true', 'yes', 'on'):
+        return True
+    if flag in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(f"expected a boolean, got {value!r}")
+
+
+def parse_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+# Parameters are whitelisted per kind: jobs never take paths from a request.
+# 'cli' converts the name=value strings of jobs.py --param to the JSON types
+# a request would send, so both go through the same validation
+JOB_KINDS = {
+    'index': {
+        'run': run_index_job,
+        'artifact': 'index',
+        'params': {'no_dedup', 'lsa'},
+        'cli': {'no_dedup': parse_flag, 'lsa': int},
+        'validate': validate_index_params,
+        'description': "Rebuild and publish the Ask the Thesis index",
+    },
+    'figures': {
+        'run': run_figures_job,
+        'artifact': 'figures',
+        'params': {'charts'},
+        'cli': {'charts': parse_list},
+        'validate': validate_figures_params,
+        'description': "Render and publish figures (all charts, or 'charts')",
+    },
+    'pdf_images': {
+        'run': run_pdf_images_job,
+        'artifact': 'figures',
+        'params': set(),
+        'description': "Extract the images of final_outputs/THESIS.pdf into a figures version",
+    },
+}
+
+
+def run_job(job_id, db_path=JOBS_DB_PATH):
+    """Worker process entry point: run one job and record its outcome"""
+    with connect(db_path) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row['cancel_requested']:
+            conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ?", (now(), job_id))
+            return 'cancelled'
+        conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (now(), job_id))
+
+    def progress(fraction, message=None):
+        with connect(db_path) as conn:
+            conn.execute("UPDATE jobs SET progress = ?, message = ? WHERE id = ?",
+                         (round(float(fraction), 4), message, job_id))
+            cancelled = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        if cancelled:
+            raise JobCancelled()
+
+    result = error = None
+    try:
+        result = json.dumps(JOB_KINDS[row['kind']]['run'](json.loads(row['params']), progress))
+        status = 'succeeded'
+    except JobCancelled:
+        status = 'cancelled'
+    except Exception as e:
+        status, error = 'failed', f"{type(e).__name__}: {e}"
+    with connect(db_path) as conn:
+        conn.execute("UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+                     "progress = CASE WHEN ? = 'succeeded' THEN 1.0 ELSE progress END WHERE id = ?",
+                     (status, result, error, now(), status, job_id))
+    return status
+
+
+class JobQueue:
+    """Submit, track and cancel jobs; dispatches them to a bounded process pool"""
+
+    def __init__(self, db_path=JOBS_DB_PATH, workers=JOB_WORKERS, max_pending=MAX_PENDING_JOBS):
+        self.db_path = db_path
+        self.workers = workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._running = {}  # job id -> artifact it publishes
+        self._executor = None
+        # Only one queue runs jobs, so active rows left over are from a stopped server
+        with connect(db_path) as conn:
+            create_table(conn)
+            conn.execute("UPDATE jobs SET status = 'interrupted', finished_at = ?, error = ? "
+                         f"WHERE status IN {ACTIVE_IN}",
+                         (now(), "Server stopped before the job finished", *ACTIVE_STATUSES))
+
+    def submit(self, kind, params=None):
+        """
+        Queue a job, or return the identical job already queued or running
+
+        Returns:
+            (job payload, coalesced) where coalesced tells whether an existing job was returned
+
+        Raises:
+            JobRejected: for unknown kinds or parameters
+            QueueFull: when MAX_PENDING_JOBS jobs are waiting
+        """
+        spec = JOB_KINDS.get(kind)
+        if spec is None:
+            raise JobRejected(f"Unknown job kind '{kind}' (expected one of: {', '.join(JOB_KINDS)})")
+        params = dict(params or {})
+        unknown = set(params) - spec['params']
+        if unknown:
+            raise JobRejected(f"Unknown parameter(s) for '{kind}': {', '.join(sorted(unknown))}")
+        if 'validate' in spec:
+            spec['validate'](params)
+        encoded = json.dumps(params, sort_keys=True)
+        dedup_key = hashlib.sha1(f"{kind}\0{encoded}".encode('utf-8')).hexdigest()
+
+        with connect(self.db_path) as conn:
+            existing = conn.execute(
+                f"SELECT * FROM jobs WHERE dedup_key = ? AND status IN {ACTIVE_IN} AND cancel_requested = 0",
+                (dedup_key, *ACTIVE_STATUSES)).fetchone()
+            if existing is not None:
+                return job_payload(existing), True
+            pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if pending >= self.max_pending:
+                raise QueueFull(f"Too many queued jobs ({pending}); try again later")
+            job_id = uuid.uuid4().hex[:12]
+            conn.execute("INSERT INTO jobs (id, kind, params, dedup_key, status, submitted_at) "
+                         "VALUES (?, ?, ?, ?, 'queued', ?)", (job_id, kind, encoded, dedup_key, now()))
+        self._dispatch()
+        return self.get(job_id), False
+
+    def get(self, job_id):
+        """Payload of one job, or None"""
+        with connect(self.db_path) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return job_payload(row) if row is not None else None
+
+    def list(self, limit=50):
+        """Most recently submitted jobs first"""
+        return list_jobs(self.db_path, limit)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job: queued jobs stop at once, running jobs at their next progress report
+
+        Returns:
+            The job payload, or None for unknown ids
+        """
+        with connect(self.db_path) as conn:
+            conn.execute("UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ? "
+                         "WHERE id = ? AND status = 'queued'", (now(), job_id))
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        return self.get(job_id)
+
+    def _dispatch(self):
+        """Start queued jobs in submission order while workers are free, one per artifact"""
+        with self._lock:
+            if len(self._running) >= self.workers:
+                return
+            with connect(self.db_path) as conn:
+                queued = conn.execute("SELECT id, kind FROM jobs WHERE status = 'queued' "
+                                      "ORDER BY submitted_at").fetchall()
+            for job_id, kind in queued:
+                if len(self._running) >= self.workers:
+                    break
+                artifact = JOB_KINDS[kind]['artifact']
+                if artifact in self._running.values():
+                    continue
+                if self._executor is None:
+                    # spawn: the server process has threads, which fork does not copy safely
+                    self._executor = concurrent.futures.ProcessPoolExecutor(
+                        self.workers, mp_context=multiprocessing.get_context('spawn'))
+                self._running[job_id] = artifact
+                future = self._executor.submit(run_job, job_id, self.db_path)
+                future.add_done_callback(lambda f, job_id=job_id: self._finished(job_id, f))
+
+    def _finished(self, job_id, future):
+        error = future.exception()
+        if error is not None:
+            # The worker died (or the job could not be sent): record it here
+            with connect(self.db_path) as conn:
+                conn.execute(f"UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                             f"WHERE id = ? AND status IN {ACTIVE_IN}",
+                             (f"{type(error).__name__}: {error}", now(), job_id, *ACTIVE_STATUSES))
+            if isinstance(error, concurrent.futures.process.BrokenProcessPool):
+                with self._lock:
+                    self._executor = None
+        with self._lock:
+            self._running.pop(job_id, None)
+        self._dispatch()
+
+    def shutdown(self):
+        """Stop the workers; running jobs are marked interrupted at the next start"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List background jobs or run one in this process")
+    parser.add_argument("--run", choices=list(JOB_KINDS), help="Run a job of this kind here, without the queue")
+    parser.add_argument("--param", action="append", default=[],
+                        help="Job parameter as name=value (a bare name sets a flag); charts takes a "
+                             "comma-separated list")
+    args = parser.parse_args()
+
+    if args.run:
+        spec = JOB_KINDS[args.run]
+        params = {}
+        for item in args.param:
+            name, _, value = item.partition("=")
+            if name not in spec['params']:
+                parser.error(f"Unknown parameter for '{args.run}': {name} "
+                             f"(expected: {', '.join(sorted(spec['params'])) or 'none'})")
+            try:
+                params[name] = spec['cli'][name](value)
+            except ValueError as e:
+                parser.error(f"Invalid value for '{name}': {e}")
+        try:
+            if 'validate' in spec:
+                spec['validate'](params)
+        except JobRejected as e:
+            parser.error(str(e))
+        result = spec['run'](params, lambda fraction, message=None: print(f"  {fraction:4.0%} {message or ''}"))
+        print(f"✓ {args.run} job finished: {json.dumps(result)}")
+        return
+    for job in list_jobs():
+        print(f"{job['id']}  {job['kind']:<10} {job['status']:<11} {job['progress']:>4.0%}  "
+              f"{job['submitted_at'][:19]}  {job['message'] or job['error'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Canonicalization of Free-Text Category Labels
+
+Masterchart labels vary in case, spacing and spelling ("Menorraghia",
+"Endometrial hyperplaisa without atypia", "pseudo decidual changes"), and one
+header is misspelled ("Compalints"). This module maps every raw value onto a
+curated vocabulary so all scripts count the same categories:
+
+1. Exact match of the compacted value (lower case, letters and digits only)
+   against the canonical labels and their curated aliases
+2. Otherwise candidates are blocked by shared character trigrams and the
+   closest one by edit distance is taken if it is within MAX_EDIT_RATIO
+3. Values with no close match are kept (whitespace-collapsed, sentence case)
+
+Matching runs once per distinct raw value, so the cost scales with distinct
+labels, not rows. Results are kept in memory and in two JSON files, both
+invalidated whenever the vocabulary changes:
+
+- data/label_mappings.json: the reviewed mapping, tracked in git and only
+  written by running this script, so every correction can be audited
+- data/label_mappings.cache.json: labels learned while loading data that the
+  reviewed mapping does not cover (untracked)
+
+Both are replaced atomically, so concurrent readers (the render daemon, job
+workers, watch.py) never see a partially written file.
+
+Usage:
+  python label_canonicalizer.py
+  python label_canonicalizer.py --rebuild
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from publish import atomic_write
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_PATH = os.path.join(ROOT, "data", "Masterchart.csv")
+DEFAULT_MAPPING_PATH = os.path.join(ROOT, "data", "label_mappings.json")
+DEFAULT_CACHE_PATH = os.path.join(ROOT, "data", "label_mappings.cache.json")
+
+# Curated vocabulary: canonical label -> aliases that edit distance can't reach
+VOCABULARY = {
+    'Histopathological diagnosis': {
+        'Proliferative phase': ['proliferative', 'late proliferative phase'],
+        'Secretory phase': ['secretory'],
+        'Endometrial hyperplasia without atypia': [],
+        'Endometrial hyperplasia with atypia': ['simple endometrial hyperplasia with atypia'],
+        'Endometrial polyp': [],
+        'Disordered proliferative endometrium': [],
+        'Pseudodecidual changes': [],
+        'Pill endometrium': [],
+        'Bleeding endometrium': [],
+        'Chronic endometritis': [],
+        'Endometrial carcinoma': ['endometrial carcinoma adenosquamous endometroid carcinoma'],
+        'No opinion': [],
+    },
+    'Complaints': {
+        'Menorrhagia': [],
+        'Metrorrhagia': [],
+        'Metromenorrhagia': ['menometrorrhagia'],
+        'Polymenorrhea': [],
+        'Polymenorrhagia': [],
+        'Oligomenorrhea': [],
+        'Dysmenorrhea': [],
+        'Postmenopausal bleed': ['postmenopausal bleeding'],
+        'Postcoital bleed': ['postcoital bleeding'],
+    },
+    'Drug history': {
+        'No Hormonal Intake': ['no', 'nil'],
+        'Hormonal Intake': ['hormonal hx', 'hormonal'],
+    },
+    'correlation with LMP': {
+        'Correlates': [],
+        'Does not correlate': ['doesnt correlate', 'doesnot correlate'],
+    },
+}
+
+# Canonical column headers, matched the same way as values
+HEADERS = {
+    'Histopathological diagnosis': [],
+    'Age': [],
+    'LMP': [],
+    'Complaints': [],
+    'Parity': [],
+    'Drug history': [],
+    'BIOPSY NO.': [],
+    'correlation with LMP': [],
+    'Radiology': [],
+}
+
+NGRAM = 3
+MAX_CANDIDATES = 5
+# Largest accepted edit distance as a fraction of the longer compacted label
+MAX_EDIT_RATIO = 0.2
+
+_MATCHERS = {}
+_MEMORY = {}
+
+
+def compact(label):
+    """Lower-case a label and drop everything but letters and digits"""
+    return re.sub(r'[^a-z0-9]', '', str(label).lower())
+
+
+def ngrams(text, n=NGRAM):
+    padded = f"^{text}$"
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+def edit_distance(a, b, limit=None):
+    """Levenshtein distance; stops early once every path exceeds limit"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class LabelMatcher:
+    """Exact, then trigram-blocked fuzzy matching against one vocabulary"""
+
+    def __init__(self, vocabulary):
+        self.exact = {}
+        self.keys = []
+        self.blocks = {}
+        for label, aliases in vocabulary.items():
+            for form in [label] + list(aliases):
+                key = compact(form)
+                if key not in self.exact:
+                    self.exact[key] = label
+                    self.keys.append((key, label))
+        for k, (key, _) in enumerate(self.keys):
+            for gram in ngrams(key):
+                self.blocks.setdefault(gram, []).append(k)
+
+    def candidates(self, key):
+        """Vocabulary entries sharing the most character n-grams with key"""
+        shared = {}
+        for gram in ngrams(key):
+            for k in self.blocks.get(gram, ()):
+                shared[k] = shared.get(k, 0) + 1
+        return sorted(shared, key=lambda k: (-shared[k], k))[:MAX_CANDIDATES]
+
+    def match(self, raw):
+        """Canonical label for raw, or None if nothing is close enough"""
+        key = compact(raw)
+        if not key:
+            return None
+        if key in self.exact:
+            return self.exact[key]
+        best, best_distance = None, None
+        for k in self.candidates(key):
+            candidate, label = self.keys[k]
+            limit = int(MAX_EDIT_RATIO * max(len(key), len(candidate)))
+            distance = edit_distance(key, candidate, limit)
+            if distance <= limit and (best_distance is None or distance < best_distance):
+                best, best_distance = label, distance
+        return best
+
+
+def fallback_label(raw):
+    """Tidy an unmatched value so case/spacing variants still collapse"""
+    text = ' '.join(str(raw).split())
+    return text[:1].upper() + text[1:].lower()
+
+
+def vocabulary_hash():
+    spec = json.dumps({'values': VOCABULARY, 'headers': HEADERS, 'ngram': NGRAM,
+                       'max_edit_ratio': MAX_EDIT_RATIO}, sort_keys=True)
+    return hashlib.sha1(spec.encode('utf-8')).hexdigest()[:12]
+
+
+def _matcher(column):
+    if column not in _MATCHERS:
+        _MATCHERS[column] = LabelMatcher(HEADERS if column is None else VOCABULARY[column])
+    return _MATCHERS[column]
+
+
+def _read_mapping_file(path):
+    """Columns of a mapping file, or {} if missing, unreadable or built for another vocabulary"""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return stored.get('columns', {}) if stored.get('vocabulary_hash') == vocabulary_hash() else {}
+
+
+def load_mappings(mapping_path=DEFAULT_MAPPING_PATH, cache_path=DEFAULT_CACHE_PATH):
+    """Raw -> canonical mappings: the reviewed mapping file overlaid on the learned cache"""
+    key = (mapping_path, cache_path)
+    if key in _MEMORY:
+        return _MEMORY[key]
+    mappings = _read_mapping_file(cache_path)
+    for column, cache in _read_mapping_file(mapping_path).items():
+        mappings.setdefault(column, {}).update(cache)
+    _MEMORY[key] = mappings
+    return mappings
+
+
+def save_mappings(mappings, mapping_path=DEFAULT_MAPPING_PATH):
+    body = json.dumps({'vocabulary_hash': vocabulary_hash(), 'columns': mappings},
+                      indent=2, sort_keys=True, ensure_ascii=False) + '\n'
+    atomic_write(mapping_path, body.encode('utf-8'))
+
+
+def canonical_headers(columns, mappings):
+    """Map raw column headers onto HEADERS; unknown headers are kept as-is"""
+    cache = mappings.setdefault('__headers__', {})
+    renamed = []
+    for raw in columns:
+        if raw not in cache:
+            cache[raw] = _matcher(None).match(raw) or raw
+        renamed.append(cache[raw])
+    return renamed
+
+
+def canonicalize_labels(df, columns=None, mapping_path=DEFAULT_MAPPING_PATH, cache_path=DEFAULT_CACHE_PATH):
+    """
+    Canonicalize headers and categorical labels of a Masterchart DataFrame
+
+    Args:
+        df: DataFrame with stripped column names
+        columns: Columns to canonicalize (default: every VOCABULARY column present)
+        mapping_path: Reviewed mapping file (read only here)
+        cache_path: Where newly matched labels are saved (None keeps them in memory only)
+
+    Returns:
+        DataFrame with canonical headers and labels (missing values stay missing)
+    """
+    mappings = load_mappings(mapping_path, cache_path)
+    before = json.dumps(mappings, sort_keys=True)
+    df = df.copy()
+    df.columns = canonical_headers(df.columns, mappings)
+    if columns is None:
+        columns = [c for c in VOCABULARY if c in df.columns]
+
+    for column in columns:
+        cache = mappings.setdefault(column, {})
+        codes, uniques = pd.factorize(df[column])
+        labels = []
+        for raw in uniques:
+            raw = str(raw)
+            if raw not in cache:
+                cache[raw] = _matcher(column).match(raw) or fallback_label(raw)
+            labels.append(cache[raw])
+        # Code -1 (missing) picks the trailing None
+        df[column] = np.array(labels + [None], dtype=object)[codes]
+
+    if cache_path and json.dumps(mappings, sort_keys=True) != before:
+        save_mappings(mappings, cache_path)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Canonicalize Masterchart category labels")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="Path to Masterchart.csv")
+    parser.add_argument("--mapping", default=DEFAULT_MAPPING_PATH, help="Persistent mapping file")
+    parser.add_argument("--rebuild", action="store_true", help="Discard the mapping file and match again")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        for path in (args.mapping, DEFAULT_CACHE_PATH):
+            if os.path.exists(path):
+                os.remove(path)
+    raw = pd.read_csv(args.data)
+    raw.columns = raw.columns.str.strip()
+    # Only an explicit run updates the reviewed mapping, with the labels of this dataset
+    df = canonicalize_labels(raw, mapping_path=args.mapping, cache_path=None)
+    mappings = load_mappings(args.mapping, None)
+    save_mappings(mappings, args.mapping)
+    for column, cache in mappings.items():
+        changed = {r: c for r, c in cache.items() if r != c}
+        if not changed:
+            continue
+        unmatched = [r for r, c in changed.items() if column in VOCABULARY and c not in VOCABULARY[column]]
+        print(f"\n{column}: {len(cache)} raw values -> {len(set(cache.values()))} labels")
+        for r, c in sorted(changed.items(), key=lambda rc: (rc[1], rc[0])):
+            print(f"  {r!r:<62} -> {c}{'  (unmatched)' if r in unmatched else ''}")
+    print(f"\n✓ Mapping saved to '{args.mapping}'")
+    return df
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Latent semantic (LSA) retrieval for thesis_search.py.
+
+Lexical TF-IDF only matches passages that share the query's terms, so
+"exclusion criteria" misses "patients were excluded if ...". With
+``build_thesis_index.py --lsa`` the index builder also computes a truncated
+SVD of the L2-normalized TF-IDF passage matrix A ~ U S V^T and stores, next
+to thesis_index.json:
+
+  thesis_lsa_vectors.npy  float32 (passages x dims): rows of U S, L2-normalized
+  thesis_lsa_terms.npy    float32 (terms x dims): V, terms in sorted order
+
+Both are plain .npy files opened with ``mmap_mode="r"``, so loading an index
+version maps them instead of reading them into memory. A query is folded into
+the latent space with the same projection as the passages (q V), normalized,
+and scored against every passage with one dense matrix-vector product; the
+result is blended with the lexical cosine score:
+
+  score = (1 - weight) * lexical + weight * latent
+
+Everything runs offline on the CPU with numpy and scipy.
+
+Usage:
+  python lsa_search.py "Which patients were left out of the study?"
+  python lsa_search.py --weight 0.5 --compare "Which patients were left out of the study?"
+"""
+
+from __future__ import annotations
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+from scipy.sparse.linalg import svds
+
+from build_thesis_index import DEFAULT_LSA_DIMS, published_index_path
+from sparse_search import BATCH_CHUNK, SparseThesisSearch
+from thesis_search import MAX_PASSAGES
+
+DEFAULT_LSA_WEIGHT = 0.35
+VECTORS_NAME = "thesis_lsa_vectors.npy"
+TERMS_NAME = "thesis_lsa_terms.npy"
+
+# Matrices up to this many cells are decomposed exactly with a dense SVD;
+# larger ones with ARPACK, which only computes the requested components
+DENSE_SVD_LIMIT = 20_000_000
+SVD_SEED = 42
+
+
+def truncated_svd(matrix, dims: int):
+    """Top-dims singular triplets (U, S, Vt) of a sparse matrix, largest first."""
+    dims = max(1, min(dims, min(matrix.shape) - 1))
+    if matrix.shape[0] * matrix.shape[1] <= DENSE_SVD_LIMIT:
+        u, s, vt = np.linalg.svd(matrix.toarray(), full_matrices=False)
+        return u[:, :dims], s[:dims], vt[:dims]
+    u, s, vt = svds(matrix, k=dims, random_state=SVD_SEED)
+    order = np.argsort(-s)
+    return u[:, order], s[order], vt[order]
+
+
+def build_lsa(data: Dict, dims: int = DEFAULT_LSA_DIMS, weight: float = DEFAULT_LSA_WEIGHT):
+    """Compute the LSA passage and term vectors of a built index.
+
+    Returns:
+        (vectors, terms, meta): the float32 arrays to store next to the index
+        and the entry recorded as meta["lsa"]
+    """
+    lexical = SparseThesisSearch(data)
+    matrix = lexical.matrix
+    u, s, vt = truncated_svd(matrix, dims)
+    vectors = (u * s).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    terms = np.ascontiguousarray(vt.T, dtype=np.float32)
+    total = float(matrix.multiply(matrix).sum()) or 1.0
+    meta = {
+        "dims": int(len(s)),
+        "weight": weight,
+        "vectors": VECTORS_NAME,
+        "terms": TERMS_NAME,
+        "explained_variance": round(float((s ** 2).sum()) / total, 4),
+    }
+    return vectors, terms, meta
+
+
+def write_lsa(directory: Path, vectors: np.ndarray, terms: np.ndarray):
+    """Store the LSA arrays in an index version directory."""
+    np.save(Path(directory) / VECTORS_NAME, vectors)
+    np.save(Path(directory) / TERMS_NAME, terms)
+
+
+class LsaThesisSearch(SparseThesisSearch):
+    """SparseThesisSearch that blends the lexical score with LSA similarity."""
+
+    def __init__(self, index: Dict, directory: Path, weight: float | None = None):
+        super().__init__(index, directory)
+        lsa = self.meta.get("lsa")
+        if not lsa:
+            raise ValueError("The index was built without LSA vectors (build_thesis_index.py --lsa)")
+        self.vectors = np.load(Path(directory) / lsa["vectors"], mmap_mode="r")
+        self.terms = np.load(Path(directory) / lsa["terms"], mmap_mode="r")
+        if self.vectors.shape[0] != len(self.documents) or self.terms.shape[0] != len(self.vocabulary):
+            raise ValueError("LSA vectors do not match the index they were loaded with")
+        self.weight = lsa.get("weight", DEFAULT_LSA_WEIGHT) if weight is None else weight
+
+    @classmethod
+    def load(cls, path: Path, weight: float | None = None) -> "LsaThesisSearch":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")), Path(path).parent, weight)
+
+    def latent_scores(self, q: np.ndarray) -> np.ndarray:
+        """Cosine similarity in the latent space of a normalized TF-IDF query vector."""
+        z = q.astype(np.float32) @ self.terms
+        norm = np.sqrt(z.dot(z))
+        if norm == 0:
+            return np.zeros(len(self.documents), dtype=np.float32)
+        return self.vectors @ (z / norm)
+
+    def rank(self, tokens: List[str], k: int = MAX_PASSAGES) -> List[tuple]:
+        if not self.documents:
+            return []
+        q = self.dense_query(tokens)
+        if not q.any():
+            return []
+        scores = (1.0 - self.weight) * self.matrix.dot(q) + self.weight * self.latent_scores(q)
+        return self.top_k(scores, k)
+
+    def rank_batch(self, token_lists: Sequence[List[str]], k: int = MAX_PASSAGES) -> List[List[tuple]]:
+        """Rank many tokenized queries with two matrix-matrix products per chunk."""
+        results: List[List[tuple]] = []
+        for start in range(0, len(token_lists), BATCH_CHUNK):
+            chunk = token_lists[start:start + BATCH_CHUNK]
+            if not self.documents:
+                results.extend([] for _ in chunk)
+                continue
+            q = self.query_matrix(chunk)
+            z = np.asarray(q.dot(self.terms), dtype=np.float32)
+            norms = np.linalg.norm(z, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            scores = ((1.0 - self.weight) * self.matrix.dot(q.T).toarray()
+                      + self.weight * (self.vectors @ (z / norms).T))
+            results.extend(self.top_k(scores[:, c], k) for c in range(scores.shape[1]))
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hybrid lexical + LSA thesis search")
+    parser.add_argument("query", nargs="+", help="Question to answer")
+    parser.add_argument("--weight", type=float, help="Weight of the LSA score (default: as built)")
+    parser.add_argument("--compare", action="store_true", help="Also show the lexical ranking")
+    parser.add_argument("-k", type=int, default=MAX_PASSAGES)
+    args = parser.parse_args()
+
+    service = LsaThesisSearch.load(published_index_path(), args.weight)
+    query = " ".join(args.query)
+    print(f"Hybrid (LSA weight {service.weight}, {service.vectors.shape[1]} dims):")
+    for p in service.search(query, args.k):
+        print(f"  {p['score']:.3f}  {p['id']}  {p['section'] or p['file']}")
+    if args.compare:
+        print("Lexical:")
+        for score, i in SparseThesisSearch.rank(service, service.tokenize(query), args.k):
+            p = service._result(i, score)
+            print(f"  {p['score']:.3f}  {p['id']}  {p['section'] or p['file']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Atomic, Versioned Publishing of Build Outputs
+
+The index builder and the chart pipeline used to overwrite
+dashboard/thesis_index.json and the files in figures/ in place, so a request
+arriving mid-build could read a half-written file. Builds are now published
+as versions:
+
+  published/<artifact>/versions/<version>/   complete output of one build
+  published/<artifact>/CURRENT               {"version": ..., "published_at": ...}
+
+A build writes into a staging directory, which is renamed to its version
+directory when the build succeeds; CURRENT is then replaced atomically
+(temp file + os.replace), so readers see either the old or the new version
+and never a mix. Failed builds leave CURRENT untouched. The dashboard server
+watches CURRENT and hot-swaps to the new version (enhanced_server.py). The
+last KEEP_VERSIONS versions are kept for requests still reading an older one
+and for rollback. A mirror directory (e.g. figures/) can be refreshed from
+each published version, one atomic file replacement per changed file.
+
+Usage:
+  python publish.py --list
+  python publish.py --artifact index --rollback 20261019T181204512345
+"""
+
+import argparse
+import contextlib
+import filecmp
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PUBLISHED_DIR = ROOT / "published"
+INDEX_ARTIFACT = PUBLISHED_DIR / "index"
+FIGURES_ARTIFACT = PUBLISHED_DIR / "figures"
+
+POINTER_NAME = "CURRENT"
+KEEP_VERSIONS = 3
+STAGING_SUFFIX = ".partial"
+
+
+def atomic_write(path, data):
+    """Write bytes to path via a temp file in the same directory and os.replace"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def read_pointer(artifact):
+    """Contents of an artifact's CURRENT pointer, or None before the first publish"""
+    try:
+        return json.loads((Path(artifact) / POINTER_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def current_dir(artifact):
+    """Directory of the published version, or None"""
+    pointer = read_pointer(artifact)
+    if pointer is None:
+        return None
+    path = Path(artifact) / "versions" / pointer["version"]
+    return path if path.is_dir() else None
+
+
+def versions(artifact):
+    """Published version names, oldest first"""
+    root = Path(artifact) / "versions"
+    if not root.is_dir():
+        return []
+    return sorted(p.name for p in root.iterdir() if p.is_dir() and not p.name.endswith(STAGING_SUFFIX))
+
+
+def stage(artifact, seed=True):
+    """
+    Create a staging directory for a new version
+
+    Args:
+        artifact: Artifact directory (e.g. INDEX_ARTIFACT)
+        seed: Copy the current version's files in first, so builds that only
+            regenerate some outputs still publish a complete version
+    """
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    staging = Path(artifact) / "versions" / (version + STAGING_SUFFIX)
+    current = current_dir(artifact) if seed else None
+    if current is not None:
+        # Copies, not hard links: builders truncate and rewrite files in place
+        shutil.copytree(current, staging)
+    else:
+        staging.mkdir(parents=True)
+    return staging
+
+
+def mirror_files(source, mirror):
+    """Atomically replace the files of mirror that differ from source"""
+    changed = 0
+    for path in Path(source).rglob("*"):
+        if not path.is_file():
+            continue
+        target = Path(mirror) / path.relative_to(source)
+        if target.exists() and filecmp.cmp(path, target, shallow=False):
+            continue
+        atomic_write(target, path.read_bytes())
+        changed += 1
+    return changed
+
+
+def publish(staging, mirror=None, keep=KEEP_VERSIONS):
+    """
+    Publish a finished staging directory and swap CURRENT to it
+
+    Args:
+        staging: Directory returned by stage()
+        mirror: Optional directory refreshed with the published files
+        keep: Number of versions kept (the current one always is)
+
+    Returns:
+        Path of the published version
+    """
+    staging = Path(staging)
+    artifact = staging.parent.parent
+    final = staging.with_name(staging.name[:-len(STAGING_SUFFIX)])
+    os.replace(staging, final)
+    set_current(artifact, final.name)
+    if mirror is not None:
+        mirror_files(final, mirror)
+    for old in versions(artifact)[:-keep]:
+        if old != final.name:
+            shutil.rmtree(Path(artifact) / "versions" / old, ignore_errors=True)
+    return final
+
+
+def set_current(artifact, version):
+    """Point CURRENT at a published version (also used for rollback)"""
+    if not (Path(artifact) / "versions" / version).is_dir():
+        raise FileNotFoundError(f"No published version '{version}' in {artifact}")
+    pointer = {"version": version, "published_at": datetime.now(timezone.utc).isoformat()}
+    atomic_write(Path(artifact) / POINTER_NAME, json.dumps(pointer).encode("utf-8"))
+
+
+@contextlib.contextmanager
+def staged_version(artifact, seed=True, mirror=None):
+    """Stage a version, publish it if the block succeeds and discard it otherwise"""
+    staging = stage(artifact, seed)
+    try:
+        yield staging
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    publish(staging, mirror)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or roll back published build versions")
+    parser.add_argument("--artifact", choices=["index", "figures"], default="index")
+    parser.add_argument("--list", action="store_true", help="List the kept versions")
+    parser.add_argument("--rollback", metavar="VERSION", help="Point CURRENT at an earlier version")
+    args = parser.parse_args()
+
+    artifact = PUBLISHED_DIR / args.artifact
+    if args.rollback:
+        set_current(artifact, args.rollback)
+        print(f"✓ {args.artifact} now serves version {args.rollback}")
+        return
+    pointer = read_pointer(artifact) or {}
+    for version in versions(artifact):
+        marker = "*" if version == pointer.get("version") else " "
+        print(f"{marker} {version}")
+    if not pointer:
+        print(f"No {args.artifact} version published yet")
+
+
+if __name__ == "__main__":
+    main()
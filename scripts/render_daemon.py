@@ -0,0 +1,384 @@
+"""
+Warm Render Worker for Thesis Charts
+
+Every run of thesis_analysis.py cold-starts Python, imports the plotting
+stack, re-applies the plot style and (for static plotly images) starts a new
+kaleido export process. This worker does all of that once and then serves
+render jobs over a local HTTP interface:
+
+  GET  /charts   -> chart registry (name, backends, description)
+  GET  /health   -> status, loaded rows, jobs served
+  POST /density  -> {"filters": {...}} -> binned age histogram, KDE and
+                    summary statistics of the cohort as JSON (age_density.py)
+  POST /cohort   -> {"filters": {...}, "row": "Age Group", "col": "Drug history"}
+                    -> matching row count and crosstab (or value counts of col)
+  POST /render   -> {"chart": "age_distribution",
+                     "filters": {"Drug history": ["Hormonal Intake"], "Age": {"min": 40}},
+                     "format": "png", "dpi": 120}
+                    responds with the rendered file
+
+Filters select rows before the chart builder runs: a list keeps rows whose
+value is in the list, a scalar keeps equal values and {"min", "max"} keeps an
+inclusive numeric range; filters on indexed columns may also be combined with
+{"and": [...]}, {"or": [...]} and {"not": ...}. They are resolved on a
+bitmap CohortIndex built when the dataset is loaded (cohort_index.py), and on
+the DataFrame for columns outside the index; /render, /density and /cohort
+accept the same filters.
+Matplotlib charts are rendered at the job's dpi
+(PREVIEW_DPI by default; the thesis figures use 300). The cleaned dataset is
+cached and reloaded only when the data file changes; rendered files are cached
+per (chart, filters, format, dpi). Age densities are cached per filters and
+shared by /density and the age_distribution chart. Renders are serialized
+because pyplot keeps global state.
+
+Usage:
+  python render_daemon.py --port 8765 --warm
+  python render_daemon.py --client age_distribution --filter "Drug history=Hormonal Intake" --output age.png
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import matplotlib
+import pandas as pd
+matplotlib.use('Agg')
+
+import thesis_analysis as ta
+from age_density import age_density, clear_cache, to_payload
+from cohort_index import CohortIndex
+
+DEFAULT_PORT = 8765
+MAX_CACHED_RENDERS = 64
+# Encoding PNGs at the publication 300 dpi dominates render time; previews use less
+PREVIEW_DPI = 120
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'html': 'text/html; charset=utf-8',
+}
+
+
+def apply_filters(df, filters):
+    """
+    Select the rows matching every filter
+
+    Args:
+        df: Cleaned DataFrame
+        filters: {column: list of values | scalar | {"min": x, "max": y}}
+
+    Raises:
+        KeyError: for unknown columns
+    """
+    mask = None
+    for column, condition in (filters or {}).items():
+        if column not in df.columns:
+            raise KeyError(column)
+        values = df[column]
+        if isinstance(condition, dict):
+            keep = values.notna()
+            if condition.get('min') is not None:
+                keep &= values >= condition['min']
+            if condition.get('max') is not None:
+                keep &= values <= condition['max']
+        elif isinstance(condition, (list, tuple)):
+            keep = values.isin(condition)
+        else:
+            keep = values == condition
+        mask = keep if mask is None else mask & keep
+    return df if mask is None else df[mask]
+
+
+def levels(df, column):
+    """Sorted distinct values of a column, as CohortIndex orders them"""
+    return pd.factorize(df[column], sort=True)[1]
+
+
+class RenderWorker:
+    """Holds the warm dataset, style state and render cache"""
+
+    def __init__(self, data_path):
+        self.data_path = data_path
+        self.lock = threading.Lock()
+        self.df = None
+        self.index = None
+        self.data_mtime = None
+        self.cache = OrderedDict()
+        self.jobs = 0
+        self.started = time.time()
+        ta.set_plot_style()
+
+    def data(self):
+        """Cleaned dataset, reloaded when the data file changes"""
+        mtime = os.path.getmtime(self.data_path)
+        if self.df is None or mtime != self.data_mtime:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.df = ta.load_and_clean_data(self.data_path)
+            self.index = CohortIndex(self.df)
+            self.data_mtime = mtime
+            self.cache.clear()
+            clear_cache()
+        return self.df
+
+    def select(self, filters=None):
+        """Rows matching the filters, resolved on the bitmap index when possible"""
+        df = self.data()
+        try:
+            return self.index.frame(filters)
+        except KeyError:
+            # Columns outside the index (e.g. parsed numeric columns)
+            return apply_filters(df, filters)
+
+    def cohort(self, filters=None, row=None, col=None):
+        """Matching row count plus a crosstab of row x col (or value counts of col)"""
+        with self.lock:
+            df = self.data()
+            try:
+                count = self.index.count(filters)
+                if row and col:
+                    table = self.index.crosstab(row, col, filters)
+                elif col:
+                    table = self.index.value_counts(col, filters)
+            except KeyError:
+                # Columns or conditions outside the index, as in select()
+                selected = apply_filters(df, filters)
+                count = len(selected)
+                if row and col:
+                    table = pd.crosstab(selected[row], selected[col]).reindex(
+                        index=levels(df, row), columns=levels(df, col), fill_value=0)
+                elif col:
+                    table = selected[col].value_counts().reindex(levels(df, col), fill_value=0)
+            payload = {'count': int(count)}
+            if row and col:
+                payload['crosstab'] = table.to_dict(orient='index')
+            elif col:
+                payload['counts'] = table.to_dict()
+            return payload
+
+    def density(self, filters=None):
+        """Age histogram and KDE of the filtered cohort (cached per filters)"""
+        with self.lock:
+            return self._density(filters)
+
+    def _density(self, filters):
+        key = json.dumps(filters or {}, sort_keys=True, default=str)
+        # The rows are only selected on a cache miss
+        return age_density(lambda: self.select(filters)['Age'], edges=ta.AGE_BINS, key=key)
+
+    def warm(self):
+        """Import every chart backend and start the plotly image export process"""
+        for module in (ta.plt, ta.sns, ta.px, ta.go, ta.pio, ta.nx, ta.stats):
+            getattr(module, '__name__')
+        self.data()
+        try:
+            ta.pio.to_image(ta.go.Figure(), format='png')
+        except Exception as e:
+            print(f"[render_daemon] Static plotly export unavailable: {e}")
+
+    def render(self, chart, filters=None, fmt='png', dpi=PREVIEW_DPI):
+        """
+        Render one chart and return (file bytes, content type)
+
+        Raises:
+            KeyError: unknown chart or filter column
+            ValueError: unsupported format, empty selection or no output in that format
+        """
+        if chart not in ta.CHARTS:
+            raise KeyError(chart)
+        if fmt not in CONTENT_TYPES:
+            raise ValueError(f"Unsupported format '{fmt}' (choose from {', '.join(CONTENT_TYPES)})")
+        with self.lock:
+            self.data()
+            key = hashlib.sha1(json.dumps([chart, filters, fmt, dpi], sort_keys=True, default=str).encode()).hexdigest()
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key], CONTENT_TYPES[fmt]
+
+            subset = self.select(filters)
+            if subset.empty:
+                raise ValueError("No rows match the filters")
+            spec = ta.CHARTS[chart]
+            kwargs = dict(spec['kwargs'])
+            if spec.get('density'):
+                kwargs['density'] = self._density(filters)
+            out_dir = tempfile.mkdtemp(prefix='render-')
+            log = io.StringIO()
+            try:
+                with contextlib.redirect_stdout(log), matplotlib.rc_context({'figure.dpi': dpi}):
+                    spec['builder'](subset, out_dir, **kwargs)
+                ta.plt.close('all')
+                outputs = sorted(f for f in os.listdir(out_dir) if f.endswith('.' + fmt))
+                if not outputs:
+                    raise ValueError(f"Chart '{chart}' produced no {fmt} output: {log.getvalue().strip()}")
+                # Builders that write several variants list the main one first (no suffix)
+                with open(os.path.join(out_dir, min(outputs, key=len)), 'rb') as f:
+                    body = f.read()
+            finally:
+                shutil.rmtree(out_dir, ignore_errors=True)
+
+            self.jobs += 1
+            self.cache[key] = body
+            if len(self.cache) > MAX_CACHED_RENDERS:
+                self.cache.popitem(last=False)
+            return body, CONTENT_TYPES[fmt]
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    worker = None
+
+    def end_headers(self):
+        # The dashboard is served from another port
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        super().end_headers()
+
+    def send_body(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, payload, status=200):
+        self.send_body(json.dumps(payload).encode('utf-8'), 'application/json; charset=utf-8', status)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path == '/charts':
+            self.send_json({name: {'backends': list(c['backends']), 'description': c['description']}
+                            for name, c in ta.CHARTS.items()})
+        elif self.path == '/health':
+            worker = self.worker
+            self.send_json({'status': 'ok', 'rows': 0 if worker.df is None else len(worker.df),
+                            'jobs': worker.jobs, 'cached': len(worker.cache),
+                            'uptime_seconds': round(time.time() - worker.started, 1)})
+        else:
+            self.send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        if self.path not in ('/render', '/density', '/cohort'):
+            self.send_json({'error': 'not found'}, 404)
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_json({'error': 'invalid Content-Length'}, 400)
+            return
+        try:
+            job = json.loads(self.rfile.read(length) or b'{}')
+            if self.path == '/density':
+                self.send_json(to_payload(self.worker.density(job.get('filters'))))
+                return
+            if self.path == '/cohort':
+                self.send_json(self.worker.cohort(job.get('filters'), job.get('row'), job.get('col')))
+                return
+            body, content_type = self.worker.render(job.get('chart'), job.get('filters'),
+                                                    job.get('format', 'png'), int(job.get('dpi', PREVIEW_DPI)))
+        except (json.JSONDecodeError, TypeError):
+            self.send_json({'error': 'request body must be a JSON render job'}, 400)
+        except KeyError as e:
+            self.send_json({'error': f"unknown chart or column: {e.args[0]}"}, 400)
+        except ValueError as e:
+            self.send_json({'error': str(e)}, 422)
+        else:
+            self.send_body(body, content_type)
+
+    def log_message(self, format, *args):
+        print(f"[render_daemon] {self.address_string()} {format % args}")
+
+
+def serve(data_path, port=DEFAULT_PORT, warm=False):
+    worker = RenderWorker(data_path)
+    if warm:
+        worker.warm()
+    handler = type('Handler', (RenderRequestHandler,), {'worker': worker})
+    httpd = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    print(f"[render_daemon] Listening on http://127.0.0.1:{httpd.server_address[1]} ({len(ta.CHARTS)} charts)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[render_daemon] Stopped.")
+    finally:
+        httpd.server_close()
+
+
+def request_render(chart, filters=None, fmt='png', dpi=PREVIEW_DPI, port=DEFAULT_PORT, timeout=120):
+    """Submit a render job to a running worker and return the file bytes"""
+    payload = json.dumps({'chart': chart, 'filters': filters or {}, 'format': fmt, 'dpi': dpi}).encode('utf-8')
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/render", data=payload,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def parse_filter(text):
+    """'Column=a|b' -> ('Column', ['a', 'b']); 'Age>=40' / 'Age<=60' -> range"""
+    for op, bound in (('>=', 'min'), ('<=', 'max')):
+        if op in text:
+            column, value = text.split(op, 1)
+            return column.strip(), {bound: float(value)}
+    column, value = text.split('=', 1)
+    return column.strip(), [v.strip() for v in value.split('|')]
+
+
+def parse_filters(texts):
+    """Combine parse_filter results; 'Age>=40' and 'Age<=60' merge into one range"""
+    filters = {}
+    for text in texts:
+        column, condition = parse_filter(text)
+        if isinstance(condition, dict) and isinstance(filters.get(column), dict):
+            filters[column].update(condition)
+        else:
+            filters[column] = condition
+    return filters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm render worker for thesis charts")
+    parser.add_argument("--data", default=os.path.join(ta.ROOT, "data", "Masterchart.csv"),
+                        help="Path to Masterchart.csv or the .xlsx register")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--warm", action="store_true", help="Preload every backend and the plotly exporter")
+    parser.add_argument("--client", metavar="CHART", help="Send a render job to a running worker instead")
+    parser.add_argument("--filter", action="append", default=[],
+                        help="Client filter, e.g. 'Drug history=Hormonal Intake' or 'Age>=40' (repeatable)")
+    parser.add_argument("--format", choices=sorted(CONTENT_TYPES), default="png")
+    parser.add_argument("--dpi", type=int, default=PREVIEW_DPI, help="Client render resolution")
+    parser.add_argument("--output", help="Where the client writes the rendered file")
+    args = parser.parse_args()
+
+    if args.client:
+        filters = parse_filters(args.filter)
+        start = time.perf_counter()
+        try:
+            body = request_render(args.client, filters, args.format, args.dpi, args.port)
+        except urllib.error.HTTPError as e:
+            print(f"Render failed ({e.code}): {json.loads(e.read()).get('error')}")
+            return
+        output = args.output or f"{args.client}.{args.format}"
+        with open(output, 'wb') as f:
+            f.write(body)
+        print(f"✓ Rendered '{output}' ({len(body)} bytes) in {time.perf_counter() - start:.3f}s")
+    else:
+        serve(args.data, args.port, args.warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,730 @@
+"""
+Server-side PDF Report
+
+Builds the dashboard's PDF report on the server (served at /api/report.pdf by
+enhanced_server.py), replacing the pdfmake export that shipped the pdfmake
+library and its font payload to every browser. The report is assembled from:
+
+- Templates: REPORT_SECTIONS lists each section's blocks; text blocks are
+  format strings filled from the summary statistics, and the lead text and
+  cards of a section are taken from its dashboard component, so the report
+  says what the dashboard says
+- Cached statistics: computed once per dataset digest and kept as JSON under
+  published/reports/
+- Figure derivatives: each figure is downscaled to a JPEG once per source
+  file and reused by every report that embeds it
+
+The PDF is written by a small PDF 1.4 writer using the standard Helvetica
+fonts, one object at a time, so a page reaches the client as soon as it is
+laid out. Finished reports are cached by a hash of their parameters, the
+dataset, the dashboard components and the figure files they are built from,
+and served from the cache when requested again.
+
+Usage:
+  python report_pdf.py --output report.pdf
+  python report_pdf.py --sections demographics findings --no-figures --output summary.pdf
+  python report_pdf.py --warm
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+import zlib
+from datetime import date
+from html.parser import HTMLParser
+from pathlib import Path
+
+from publish import FIGURES_ARTIFACT, PUBLISHED_DIR, atomic_write, current_dir, read_pointer
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DATA_PATH = os.path.join(ROOT, "data", "Masterchart.csv")
+COMPONENTS_DIR = ROOT / "dashboard" / "components"
+FIGURES_DIR = ROOT / "figures"
+
+REPORTS_DIR = PUBLISHED_DIR / "reports"
+REPORT_CACHE_DIR = REPORTS_DIR / "cache"
+DERIVATIVES_DIR = REPORTS_DIR / "derivatives"
+MAX_CACHED_REPORTS = 32
+MAX_CACHED_DERIVATIVES = 256
+
+# Figures are embedded as JPEGs at most this many pixels wide: about 170 dpi
+# across the text width, against several thousand pixels for the source PNGs
+DERIVATIVE_MAX_PIXELS = 1200
+DERIVATIVE_QUALITY = 80
+
+REPORT_TITLE = "Histopathological Patterns in Abnormal Uterine Bleeding (AUB)"
+RUNNING_HEADER = "AUB Histopathological Dashboard Report"
+
+# A4 in points, and the dashboard's accent colour (#0d9488)
+PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89
+MARGIN = 50
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+MAX_FIGURE_HEIGHT = 300
+ACCENT = (0.051, 0.580, 0.533)
+TEXT = (0.1, 0.1, 0.1)
+MUTED = (0.4, 0.4, 0.4)
+RULE = (0.8, 0.8, 0.8)
+
+# Helvetica and Helvetica-Bold advance widths (1/1000 em) for characters 32-126
+# in WinAnsiEncoding, from the Adobe core font metrics
+REGULAR_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+BOLD_WIDTHS = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+# WinAnsi punctuation above 127 (dashes, curly quotes, bullet); other accented
+# letters are close enough to the default width
+HIGH_WIDTHS = {0x91: 222, 0x92: 222, 0x93: 333, 0x94: 333, 0x95: 350, 0x96: 556, 0x97: 1000}
+DEFAULT_WIDTH = 556
+FONTS = {'F1': ('Helvetica', REGULAR_WIDTHS), 'F2': ('Helvetica-Bold', BOLD_WIDTHS)}
+# Characters outside WinAnsiEncoding that appear in the dashboard text
+TEXT_REPLACEMENTS = str.maketrans({'≥': '>=', '≤': '<=', '›': '>', '\u00a0': ' '})
+
+REPORT_SECTIONS = {
+    'overview': {
+        'title': "Introduction",
+        'blocks': [
+            ('component', 'lead'),
+            ('text', "The study analysed {patients} patients presenting with abnormal uterine bleeding. "
+                     "The most affected age group was {top_age_group} years ({top_age_group_pct:.1f}%), and the "
+                     "most common histopathological finding was {top_diagnosis} ({top_diagnosis_pct:.1f}%)."),
+        ],
+    },
+    'demographics': {
+        'title': "Patient Demographics",
+        'blocks': [
+            ('component', 'lead'),
+            ('text', "Patients were aged {age_min} to {age_max} years (mean {age_mean:.1f}, median {age_median:g})."),
+            ('table', 'age_groups', ("Age group (years)", "Patients", "%")),
+            ('figure', 'age_distribution.png', "Age distribution of patients"),
+            ('text', "{top_complaint} was the most common presenting complaint ({top_complaint_pct:.1f}%). "
+                     "{hormonal_pct:.1f}% of patients had a history of hormonal drug intake."),
+            ('table', 'complaints', ("Presenting complaint", "Patients", "%")),
+            ('figure', 'common_complaints_log.png', "Common presenting complaints (log scale)"),
+            ('table', 'drug_history', ("Drug history", "Patients", "%")),
+        ],
+    },
+    'findings': {
+        'title': "Histopathological Findings",
+        'blocks': [
+            ('component', 'lead'),
+            ('text', "{diagnosis_count} distinct diagnoses were recorded. {top_diagnosis} was the most common "
+                     "({top_diagnosis_pct:.1f}%), and the histopathology correlated with the last menstrual "
+                     "period in {lmp_correlates_pct:.1f}% of patients."),
+            ('table', 'diagnoses', ("Histopathological diagnosis", "Patients", "%")),
+            ('figure', 'histopathological_diagnoses_log.png', "Distribution of histopathological diagnoses (log scale)"),
+            ('figure', 'diagnosis_by_age_group.png', "Histopathological diagnoses by age group"),
+        ],
+    },
+    'correlations': {
+        'title': "Statistical Correlations",
+        'blocks': [
+            ('component', 'lead'),
+            ('text', "The association of the histopathological diagnosis with each clinical variable was tested "
+                     "with Pearson's chi-square test; Cramér's V measures its strength (0 none, 1 complete)."),
+            ('table', 'associations', ("Variable", "Chi-square", "df", "p", "Cramér's V")),
+            ('figure', 'correlation_heatmap.png', "Association heatmap of key variables (Cramér's V)"),
+            ('figure', 'drug_history_impact.png', "Drug history impact on diagnoses"),
+        ],
+    },
+    'discussion': {
+        'title': "Discussion",
+        'blocks': [('component', 'lead'), ('component', 'cards')],
+    },
+    'conclusion': {
+        'title': "Conclusion & Recommendations",
+        'blocks': [('component', 'lead'), ('component', 'cards')],
+    },
+}
+
+_statistics = {}
+_components = {}
+_digests = {}
+
+
+def file_digest(path):
+    """Short content digest of a file"""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:16]
+
+
+def source_digest(path):
+    """Content digest of a report source, recomputed only when its size or mtime changes"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    signature = (stat.st_size, stat.st_mtime_ns)
+    cached = _digests.get(path)
+    if cached is None or cached[0] != signature:
+        cached = _digests[path] = (signature, file_digest(path))
+    return cached[1]
+
+
+def share_rows(series, limit=None):
+    """[label, count, percent] table rows of a column's value counts"""
+    counts = series.value_counts()
+    total = counts.sum()
+    if limit is not None:
+        counts = counts.head(limit)
+    return [[str(label), str(int(n)), f"{100 * n / total:.1f}"] for label, n in counts.items()]
+
+
+def format_p(p):
+    return "<0.001" if p < 0.001 else f"{p:.3f}"
+
+
+def summary_statistics(df):
+    """Values and tables the report templates are filled from"""
+    from association_stats import compute_associations
+
+    diagnoses = df['Histopathological diagnosis'].value_counts()
+    complaints = df['Complaints'].value_counts()
+    age_groups = df['Age Group'].value_counts()
+    drugs = df['Drug history'].value_counts(normalize=True)
+    lmp = df['correlation with LMP'].value_counts(normalize=True)
+    n = len(df)
+
+    outcome = 'Histopathological diagnosis'
+    variables = ['Age Group', 'correlation with LMP', 'Drug history', 'Complaints']
+    associations = compute_associations(df, columns=[outcome] + variables, permute='none')
+    associations = associations[associations['variable_a'] == outcome]
+    return {
+        'patients': n,
+        'age_min': int(df['Age'].min()),
+        'age_max': int(df['Age'].max()),
+        'age_mean': float(df['Age'].mean()),
+        'age_median': float(df['Age'].median()),
+        'top_age_group': str(age_groups.index[0]),
+        'top_age_group_pct': 100 * age_groups.iloc[0] / n,
+        'top_diagnosis': str(diagnoses.index[0]),
+        'top_diagnosis_pct': 100 * diagnoses.iloc[0] / n,
+        'diagnosis_count': len(diagnoses),
+        'top_complaint': str(complaints.index[0]),
+        'top_complaint_pct': 100 * complaints.iloc[0] / complaints.sum(),
+        'hormonal_pct': 100 * float(drugs.get('Hormonal Intake', 0.0)),
+        'lmp_correlates_pct': 100 * float(lmp.get('Correlates', 0.0)),
+        'tables': {
+            'age_groups': share_rows(df['Age Group'].astype(str)),
+            'complaints': share_rows(df['Complaints'], limit=8),
+            'drug_history': share_rows(df['Drug history']),
+            'diagnoses': share_rows(df['Histopathological diagnosis'], limit=12),
+            'associations': [
+                [row.variable_b, f"{row.chi2:.1f}", str(int(row.dof)), format_p(row.p_chi2), f"{row.cramers_v:.2f}"]
+                for row in associations.itertuples()
+            ],
+        },
+    }
+
+
+def get_statistics(data_path=DEFAULT_DATA_PATH):
+    """Summary statistics of a dataset, cached in memory and on disk by its digest"""
+    digest = file_digest(data_path)
+    if digest in _statistics:
+        return _statistics[digest]
+    path = REPORTS_DIR / f"stats-{digest}.json"
+    try:
+        statistics = json.loads(path.read_text(encoding='utf-8'))
+    except (FileNotFoundError, json.JSONDecodeError):
+        from thesis_analysis import load_and_clean_data
+        statistics = summary_statistics(load_and_clean_data(data_path))
+        atomic_write(path, json.dumps(statistics).encode('utf-8'))
+    _statistics[digest] = statistics
+    return statistics
+
+
+class ComponentText(HTMLParser):
+    """
+    Collect the report text of a dashboard component
+
+    The lead is the section's first paragraph; cards yield their headings,
+    paragraphs and list items (headings only when text follows them).
+    """
+
+    BLOCKS = {'h3': 'heading', 'p': 'paragraph', 'li': 'bullet'}
+
+    def __init__(self):
+        super().__init__()
+        self.lead = None
+        self.cards = []
+        self._open = []
+        self._card_depth = None
+        self._text = None
+        self._heading = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('br', 'img', 'input', 'hr', 'meta', 'link'):
+            return
+        self._open.append(tag)
+        classes = (dict(attrs).get('class') or '').split()
+        if self._card_depth is None and 'card' in classes:
+            self._card_depth = len(self._open)
+        if tag in self.BLOCKS and self._text is None:
+            self._text = (tag, len(self._open), [])
+
+    def handle_endtag(self, tag):
+        if tag not in self._open:
+            return
+        while self._open:
+            depth = len(self._open)
+            opened = self._open.pop()
+            if self._text is not None and self._text[1] == depth:
+                self._finish_block()
+            if self._card_depth == depth:
+                self._card_depth = None
+            if opened == tag:
+                break
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text[2].append(data)
+
+    def _finish_block(self):
+        tag, _, parts = self._text
+        self._text = None
+        text = ' '.join(''.join(parts).split())
+        if not text:
+            return
+        if self._card_depth is None:
+            if tag == 'p' and self.lead is None:
+                self.lead = text
+            return
+        if tag == 'h3':
+            self._heading = text
+            return
+        if self._heading is not None:
+            self.cards.append(('heading', self._heading))
+            self._heading = None
+        self.cards.append((self.BLOCKS[tag], text))
+
+
+def component_text(section):
+    """Lead paragraph and card blocks of a dashboard component, reread when it changes"""
+    path = COMPONENTS_DIR / f"{section}.html"
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _components.get(section)
+    if cached is None or cached[0] != mtime:
+        parser = ComponentText()
+        parser.feed(path.read_text(encoding='utf-8'))
+        parser.close()
+        cached = _components[section] = (mtime, parser)
+    return cached[1]
+
+
+def figure_source(name):
+    """A figure from the published figures version, falling back to figures/"""
+    published = current_dir(FIGURES_ARTIFACT)
+    for directory in (published, FIGURES_DIR):
+        if directory is not None and (directory / name).is_file():
+            return directory / name
+    return None
+
+
+def figure_derivative(path, max_pixels=DERIVATIVE_MAX_PIXELS, quality=DERIVATIVE_QUALITY):
+    """
+    Downscaled JPEG copy of a figure, created once per source file
+
+    Returns:
+        (path, (width, height)) of the derivative, or None when the source is
+        not a readable image (e.g. a Git LFS pointer that was never fetched)
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    stat = path.stat()
+    key = hashlib.sha1(f"{path}|{stat.st_size}|{stat.st_mtime_ns}|{max_pixels}|{quality}".encode('utf-8'))
+    target = DERIVATIVES_DIR / f"{key.hexdigest()[:20]}.jpg"
+    try:
+        if target.exists():
+            with Image.open(target) as image:
+                return target, image.size
+        with Image.open(path) as image:
+            image.thumbnail((max_pixels, max_pixels * 4), Image.LANCZOS)
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, 'white')
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            image = image.convert('RGB')
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=quality, optimize=True)
+            size = image.size
+    except (UnidentifiedImageError, OSError):
+        return None
+    atomic_write(target, buffer.getvalue())
+    return target, size
+
+
+def pdf_text(text):
+    """Text as WinAnsi bytes for a PDF string"""
+    return text.translate(TEXT_REPLACEMENTS).encode('cp1252', errors='replace')
+
+
+def text_width(data, font, size):
+    widths = FONTS[font][1]
+    total = 0
+    for byte in data:
+        total += widths[byte - 32] if 32 <= byte <= 126 else HIGH_WIDTHS.get(byte, DEFAULT_WIDTH)
+    return total * size / 1000
+
+
+def wrap(text, font, size, width):
+    """Split text into lines (WinAnsi bytes) no wider than width"""
+    lines, line = [], b''
+    for word in pdf_text(text).split():
+        candidate = line + b' ' + word if line else word
+        if line and text_width(candidate, font, size) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+def escape(data):
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+class ReportLayout:
+    """Lay blocks out top to bottom into pages of drawing operators and images"""
+
+    def __init__(self):
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.page = {'ops': [], 'images': []}
+        self.pages.append(self.page)
+        self.y = PAGE_HEIGHT - MARGIN - 10
+
+    def ensure(self, height):
+        if self.y - height < MARGIN + 10:
+            self.new_page()
+
+    def text_line(self, data, x, y, font, size, color):
+        self.page['ops'].append(
+            b"BT %.3f %.3f %.3f rg /%s %.1f Tf %.2f %.2f Td (%s) Tj ET"
+            % (*color, font.encode(), size, x, y, escape(data))
+        )
+
+    def rule(self, y, color=RULE, width=0.5):
+        self.page['ops'].append(b"%.3f %.3f %.3f RG %.2f w %.2f %.2f m %.2f %.2f l S"
+                                % (*color, width, MARGIN, y, PAGE_WIDTH - MARGIN, y))
+
+    def centered(self, text, font, size, color, space_after=0):
+        for line in wrap(text, font, size, CONTENT_WIDTH):
+            self.ensure(size * 1.3)
+            self.y -= size * 1.3
+            x = (PAGE_WIDTH - text_width(line, font, size)) / 2
+            self.text_line(line, x, self.y, font, size, color)
+        self.y -= space_after
+
+    def paragraph(self, text, font='F1', size=10.5, color=TEXT, indent=0, bullet=False, space_after=8):
+        leading = size * 1.45
+        for i, line in enumerate(wrap(text, font, size, CONTENT_WIDTH - indent)):
+            self.ensure(leading)
+            self.y -= leading
+            if bullet and i == 0:
+                self.text_line(b'\x95', MARGIN + indent - 10, self.y, font, size, ACCENT)
+            self.text_line(line, MARGIN + indent, self.y, font, size, color)
+        self.y -= space_after
+
+    def heading(self, text, size=13):
+        self.ensure(size * 1.4 + 40)
+        self.y -= 6
+        self.paragraph(text, font='F2', size=size, color=ACCENT, space_after=4)
+
+    def section_title(self, text):
+        self.paragraph(text, font='F2', size=16, color=ACCENT, space_after=2)
+        self.rule(self.y, ACCENT, 1)
+        self.y -= 12
+
+    def table(self, header, rows, size=9.5):
+        """Rows of strings: the first column is wrapped, the others right-aligned"""
+        number_width = 62
+        columns = [CONTENT_WIDTH - number_width * (len(header) - 1)] + [number_width] * (len(header) - 1)
+        leading = size * 1.5
+        self.ensure(leading * 3)
+
+        def draw(cells, font):
+            first = wrap(cells[0], font, size, columns[0] - 8) or [b'']
+            self.ensure(leading * len(first))
+            top = self.y
+            for i, line in enumerate(first):
+                self.text_line(line, MARGIN, top - leading * (i + 1) + 3, font, size, TEXT)
+            x = MARGIN + columns[0]
+            for cell, width in zip(cells[1:], columns[1:]):
+                data = pdf_text(cell)
+                self.text_line(data, x + width - text_width(data, font, size), top - leading + 3, font, size, TEXT)
+                x += width
+            self.y = top - leading * len(first) - 2
+
+        draw(header, 'F2')
+        self.rule(self.y + 1, ACCENT, 0.8)
+        for row in rows:
+            draw(row, 'F1')
+            self.rule(self.y + 1)
+        self.y -= 10
+
+    def figure(self, derivative, caption):
+        path, (width, height) = derivative
+        scale = min(CONTENT_WIDTH / width, MAX_FIGURE_HEIGHT / height)
+        w, h = width * scale, height * scale
+        self.ensure(h + 30)
+        name = b'Im%d' % len(self.page['images'])
+        self.page['images'].append((name, path, width, height))
+        self.y -= h
+        self.page['ops'].append(b"q %.2f 0 0 %.2f %.2f %.2f cm /%s Do Q" % (w, h, (PAGE_WIDTH - w) / 2, self.y, name))
+        self.y -= 4
+        self.centered(caption, 'F1', 8.5, MUTED, space_after=12)
+
+
+class PdfWriter:
+    """
+    Minimal PDF 1.4 writer that emits each object as soon as it is added
+
+    Object numbers can be reserved before the object is written (the page
+    tree, which is only complete after the last page); the cross-reference
+    table is written by close().
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self.position = 0
+        self.offsets = {}
+        self.next_id = 1
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.out.write(data)
+        self.position += len(data)
+
+    def reserve(self):
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def add(self, entries, stream=None, obj_id=None):
+        """Write a dictionary object (entries without the << >>), optionally with a stream"""
+        obj_id = obj_id or self.reserve()
+        self.offsets[obj_id] = self.position
+        if stream is None:
+            self._write(b"%d 0 obj\n<< %s >>\nendobj\n" % (obj_id, entries))
+        else:
+            self._write(b"%d 0 obj\n<< %s /Length %d >>\nstream\n" % (obj_id, entries, len(stream)))
+            self._write(stream)
+            self._write(b"\nendstream\nendobj\n")
+        return obj_id
+
+    def close(self, root, info):
+        start = self.position
+        rows = [b"xref\n0 %d\n0000000000 65535 f \n" % self.next_id]
+        rows += [b"%010d 00000 n \n" % self.offsets[i] for i in range(1, self.next_id)]
+        rows.append(b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (self.next_id, root, info, start))
+        self._write(b''.join(rows))
+
+
+def normalize_params(sections=None, figures=True):
+    """Validated report parameters; raises ValueError for unknown sections"""
+    sections = list(REPORT_SECTIONS) if not sections else list(dict.fromkeys(sections))
+    unknown = [s for s in sections if s not in REPORT_SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown report sections: {', '.join(unknown)} (choose from {', '.join(REPORT_SECTIONS)})")
+    # Template order, whatever order they were requested in
+    return {'sections': [s for s in REPORT_SECTIONS if s in sections], 'figures': bool(figures)}
+
+
+def report_key(params, data_path=DEFAULT_DATA_PATH):
+    """Cache key of a report: its parameters, the inputs it is built from and the date it shows"""
+    components, figures = {}, {}
+    for section in params['sections']:
+        components[section] = source_digest(COMPONENTS_DIR / f"{section}.html")
+        for kind, *args in REPORT_SECTIONS[section]['blocks']:
+            if kind == 'figure' and params['figures']:
+                # The published version, or figures/ when none is published
+                source = figure_source(args[0])
+                figures[args[0]] = [str(source), source_digest(source)] if source is not None else None
+    inputs = {
+        'params': params,
+        'data': file_digest(data_path),
+        'figures_version': (read_pointer(FIGURES_ARTIFACT) or {}).get('version'),
+        'components': components,
+        'figures': figures,
+        'date': date.today().isoformat(),
+    }
+    return hashlib.sha1(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()[:20]
+
+
+def layout_report(params, data_path=DEFAULT_DATA_PATH):
+    """Fill the templates of the requested sections and lay them out"""
+    statistics = get_statistics(data_path)
+    layout = ReportLayout()
+    layout.centered(REPORT_TITLE, 'F2', 20, ACCENT, space_after=6)
+    layout.centered(date.today().strftime("%d %B %Y"), 'F1', 10, MUTED, space_after=24)
+    for i, section in enumerate(params['sections']):
+        template = REPORT_SECTIONS[section]
+        if i > 0:
+            layout.new_page()
+        layout.section_title(template['title'])
+        component = component_text(section)
+        for kind, *args in template['blocks']:
+            if kind == 'text':
+                layout.paragraph(args[0].format(**statistics))
+            elif kind == 'table':
+                layout.table(args[1], statistics['tables'][args[0]])
+            elif kind == 'figure' and params['figures']:
+                source = figure_source(args[0])
+                derivative = figure_derivative(source) if source is not None else None
+                if derivative is not None:
+                    layout.figure(derivative, args[1])
+            elif kind == 'component' and component is not None:
+                if args[0] == 'lead' and component.lead:
+                    layout.paragraph(component.lead, color=MUTED, space_after=10)
+                elif args[0] == 'cards':
+                    for block, text in component.cards:
+                        if block == 'heading':
+                            layout.heading(text, size=12)
+                        else:
+                            layout.paragraph(text, indent=14 if block == 'bullet' else 0,
+                                             bullet=block == 'bullet', space_after=4 if block == 'bullet' else 8)
+    return layout
+
+
+def write_report(params, out, data_path=DEFAULT_DATA_PATH):
+    """Build a report and write it to a binary file object page by page"""
+    layout = layout_report(params, data_path)
+    pdf = PdfWriter(out)
+    catalog, pages_id = pdf.reserve(), pdf.reserve()
+    fonts = {name: pdf.add(b"/Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding" % base.encode())
+             for name, (base, _) in FONTS.items()}
+    font_resources = b' '.join(b"/%s %d 0 R" % (name.encode(), obj) for name, obj in fonts.items())
+    header = pdf_text(RUNNING_HEADER)
+    kids = []
+    for number, page in enumerate(layout.pages, 1):
+        images = []
+        for name, path, width, height in page['images']:
+            obj = pdf.add(b"/Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB "
+                          b"/BitsPerComponent 8 /Filter /DCTDecode" % (width, height), path.read_bytes())
+            images.append(b"/%s %d 0 R" % (name, obj))
+        footer = pdf_text(f"Page {number} of {len(layout.pages)}")
+        ops = page['ops'] + [
+            b"BT %.3f %.3f %.3f rg /F1 9 Tf %.2f %.2f Td (%s) Tj ET"
+            % (*MUTED, (PAGE_WIDTH - text_width(header, 'F1', 9)) / 2, PAGE_HEIGHT - 30, escape(header)),
+            b"BT %.3f %.3f %.3f rg /F1 8 Tf %.2f %.2f Td (%s) Tj ET"
+            % (*MUTED, (PAGE_WIDTH - text_width(footer, 'F1', 8)) / 2, 25, escape(footer)),
+        ]
+        content = pdf.add(b"/Filter /FlateDecode", zlib.compress(b'\n'.join(ops), 6))
+        kids.append(pdf.add(
+            b"/Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] /Resources << /Font << %s >> "
+            b"/XObject << %s >> >> /Contents %d 0 R"
+            % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, font_resources, b' '.join(images), content)
+        ))
+        out.flush()
+    pdf.add(b"/Type /Pages /Kids [%s] /Count %d" % (b' '.join(b"%d 0 R" % k for k in kids), len(kids)),
+            obj_id=pages_id)
+    pdf.add(b"/Type /Catalog /Pages %d 0 R" % pages_id, obj_id=catalog)
+    info = pdf.add(b"/Title (%s) /Author (AUB Thesis Dashboard) /Subject (%s) /Producer (report_pdf.py)"
+                   % (escape(pdf_text("AUB Thesis Dashboard Report")), escape(pdf_text(REPORT_TITLE))))
+    pdf.close(catalog, info)
+    out.flush()
+
+
+class _Tee:
+    """Write to several binary file objects at once"""
+
+    def __init__(self, *outputs):
+        self.outputs = outputs
+
+    def write(self, data):
+        for output in self.outputs:
+            output.write(data)
+        return len(data)
+
+    def flush(self):
+        for output in self.outputs:
+            output.flush()
+
+
+def cached_report(key):
+    """Path of a cached report, or None"""
+    path = REPORT_CACHE_DIR / f"{key}.pdf"
+    if not path.is_file():
+        return None
+    os.utime(path)  # Most recently used reports are evicted last
+    return path
+
+
+def prune(directory, keep, pattern):
+    """Delete all but the keep most recently used files of a cache directory"""
+    files = sorted(directory.glob(pattern), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in files[keep:]:
+        path.unlink(missing_ok=True)
+
+
+def stream_report(params, out, key, data_path=DEFAULT_DATA_PATH):
+    """Write a report to out while keeping a copy in the report cache under key"""
+    REPORT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = REPORT_CACHE_DIR / f".{key}.{os.getpid()}.{time.monotonic_ns()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            write_report(params, _Tee(out, f), data_path)
+        os.replace(tmp, REPORT_CACHE_DIR / f"{key}.pdf")
+    finally:
+        tmp.unlink(missing_ok=True)
+    prune(REPORT_CACHE_DIR, MAX_CACHED_REPORTS, '*.pdf')
+
+
+def warm(data_path=DEFAULT_DATA_PATH):
+    """Compute the statistics and figure derivatives ahead of the first report"""
+    get_statistics(data_path)
+    names = [args[0] for template in REPORT_SECTIONS.values() for kind, *args in template['blocks'] if kind == 'figure']
+    prepared = 0
+    for name in names:
+        source = figure_source(name)
+        if source is not None and figure_derivative(source) is not None:
+            prepared += 1
+    prune(DERIVATIVES_DIR, MAX_CACHED_DERIVATIVES, '*.jpg')
+    return prepared
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the dashboard PDF report")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="Path to Masterchart.csv")
+    parser.add_argument("--sections", nargs="+", choices=list(REPORT_SECTIONS), help="Sections to include")
+    parser.add_argument("--no-figures", action="store_true", help="Leave the figures out")
+    parser.add_argument("--output", default="AUB_Dashboard_Report.pdf", help="Output PDF path")
+    parser.add_argument("--warm", action="store_true", help="Only prepare the cached statistics and figure derivatives")
+    args = parser.parse_args()
+
+    if args.warm:
+        prepared = warm(args.data)
+        print(f"✓ Statistics cached, {prepared} figure derivatives ready in {DERIVATIVES_DIR}")
+        return
+    params = normalize_params(args.sections, not args.no_figures)
+    start = time.perf_counter()
+    with open(args.output, 'wb') as f:
+        write_report(params, f, args.data)
+    print(f"✓ Report written to {args.output} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
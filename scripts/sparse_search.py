@@ -0,0 +1,166 @@
+"""Vectorized scoring backend for thesis_search.py using SciPy sparse matrices.
+
+The index is compiled once into a CSR term-document matrix whose rows are
+L2-normalized TF-IDF passage vectors. A query (or a whole batch of queries)
+is then scored with one sparse matrix product, and the top-k passages are
+selected with ``np.argpartition`` instead of sorting every score. Rankings
+match ThesisSearch up to floating-point ties between duplicate passages; use
+this backend for batch evaluation of question sets.
+
+Requires numpy and scipy (pip install numpy scipy).
+
+Usage:
+  python sparse_search.py "What were the exclusion criteria?"
+  python sparse_search.py --queries-file questions.txt --repeat 100
+"""
+
+from __future__ import annotations
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from thesis_search import MAX_PASSAGES, SCORE_THRESHOLD, ThesisSearch
+
+# Queries are scored in chunks so the dense (passages x queries) score block stays small
+BATCH_CHUNK = 1024
+
+
+class SparseThesisSearch(ThesisSearch):
+    """ThesisSearch with CSR matrix scoring and batched queries."""
+
+    def _compile(self):
+        """Build the CSR matrix instead of the pure-Python weights, which this backend never reads."""
+        self.vocabulary: Dict[str, int] = {t: j for j, t in enumerate(sorted(self.idf))}
+        self._idf_vec = np.zeros(len(self.vocabulary), dtype=np.float64)
+        for t, j in self.vocabulary.items():
+            self._idf_vec[j] = self.idf[t]
+        self.matrix = self._compile_matrix()
+
+    def _compile_matrix(self) -> sparse.csr_matrix:
+        """Build the L2-normalized passage x term TF-IDF matrix."""
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for doc in self.documents:
+            for t, tf in doc["tf"].items():
+                j = self.vocabulary.get(t)
+                if j is not None:
+                    indices.append(j)
+                    data.append(tf)
+            indptr.append(len(indices))
+        matrix = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(self.documents), len(self.vocabulary)),
+        )
+        matrix = matrix.multiply(self._idf_vec).tocsr()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms).dot(matrix).tocsr()
+
+    def query_matrix(self, token_lists: Sequence[List[str]]) -> sparse.csr_matrix:
+        """Stack L2-normalized TF-IDF query vectors into a (queries x terms) CSR matrix."""
+        rows: List[int] = []
+        cols: List[int] = []
+        vals: List[float] = []
+        for r, tokens in enumerate(token_lists):
+            total = len(tokens) or 1
+            for t, w in self._counts(tokens).items():
+                j = self.vocabulary.get(t)
+                if j is not None:
+                    rows.append(r)
+                    cols.append(j)
+                    vals.append(w / total)
+        q = sparse.csr_matrix((vals, (rows, cols)), shape=(len(token_lists), len(self.vocabulary)))
+        q = q.multiply(self._idf_vec).tocsr()
+        norms = np.sqrt(np.asarray(q.multiply(q).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms).dot(q).tocsr()
+
+    @staticmethod
+    def _counts(tokens: List[str]) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for t in tokens:
+            counts[t] = counts.get(t, 0) + 1
+        return counts
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int) -> List[Tuple[float, int]]:
+        """Select the k best (score, passage) pairs above the threshold."""
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[scores[candidates] > SCORE_THRESHOLD]
+        # Stable ordering by descending score, then passage number, like ThesisSearch
+        order = np.lexsort((candidates, -scores[candidates]))
+        return [(float(scores[i]), int(i)) for i in candidates[order]]
+
+    def dense_query(self, tokens: List[str]) -> np.ndarray:
+        """L2-normalized TF-IDF vector of one tokenized query."""
+        q = np.zeros(len(self.vocabulary), dtype=np.float64)
+        total = len(tokens) or 1
+        for t, c in self._counts(tokens).items():
+            j = self.vocabulary.get(t)
+            if j is not None:
+                q[j] = (c / total) * self._idf_vec[j]
+        norm = np.sqrt(q.dot(q)) or 1.0
+        return q / norm
+
+    def rank(self, tokens: List[str], k: int = MAX_PASSAGES) -> List[tuple]:
+        if not self.documents:
+            return []
+        # A single query is cheaper as a dense vector than as a 1-row sparse matrix
+        return self.top_k(self.matrix.dot(self.dense_query(tokens)), k)
+
+    def rank_batch(self, token_lists: Sequence[List[str]], k: int = MAX_PASSAGES) -> List[List[tuple]]:
+        """Rank many tokenized queries with one matrix-matrix product per chunk."""
+        results: List[List[tuple]] = []
+        for start in range(0, len(token_lists), BATCH_CHUNK):
+            chunk = token_lists[start:start + BATCH_CHUNK]
+            if not self.documents:
+                results.extend([] for _ in chunk)
+                continue
+            scores = self.matrix.dot(self.query_matrix(chunk).T).toarray()
+            results.extend(self.top_k(scores[:, c], k) for c in range(scores.shape[1]))
+        return results
+
+    def search_batch(self, queries: Sequence[str], k: int = MAX_PASSAGES) -> List[List[Dict]]:
+        """Return the top-k passages for every query in ``queries``."""
+        ranked = self.rank_batch([self.tokenize(q) for q in queries], k)
+        return [[self._result(i, score) for score, i in r] for r in ranked]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sparse-matrix thesis search")
+    parser.add_argument("query", nargs="*", help="Question to answer")
+    parser.add_argument("--queries-file", type=Path, help="Text file with one query per line (batch mode)")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeat the batch to measure throughput")
+    parser.add_argument("-k", type=int, default=MAX_PASSAGES)
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    service = SparseThesisSearch.load()
+    if args.queries_file:
+        queries = [q.strip() for q in args.queries_file.read_text(encoding="utf-8").splitlines() if q.strip()]
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            results = service.search_batch(queries, args.k)
+        elapsed = time.perf_counter() - start
+        total = len(queries) * args.repeat
+        print(f"{total} queries in {elapsed:.3f}s ({total / elapsed:.0f} queries/s)")
+        for q, r in zip(queries, results):
+            print(f"{q}\n  " + "\n  ".join(f"{p['score']:.3f}  {p['id']}" for p in r))
+    elif args.query:
+        for p in service.search(" ".join(args.query), args.k):
+            print(f"  {p['score']:.3f}  {p['id']}  {p['section'] or p['file']}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Query-time spelling correction over the thesis vocabulary.
+
+A misspelled query word ("menorrhagea", "leiomyomma", "endometriod") is not
+in the index vocabulary, so it gets no IDF weight and the query can come back
+empty. The index builder therefore writes a symmetric-delete (SymSpell) table
+of the vocabulary next to the index (thesis_spelling.json):
+
+- words: the surface forms (lowercased, before stemming) whose term is
+  scored by the index, with the number of passages each appears in (df)
+- known: other words of the manuscript (stopword-like or pruned as rare),
+  which are correct and must not be "corrected" into a scored word
+- deletes: every string obtained by deleting up to max_distance characters
+  from the first prefix_length characters of a word, mapped to the words it
+  came from
+
+To correct a word, the same deletes are generated from the query word and
+looked up; two words within edit distance d share a delete, so the table
+yields every candidate without scanning the vocabulary, in time that depends
+only on the word's length. Candidates are verified with the true
+(Damerau-Levenshtein) distance and the closest one wins, ties going to the
+word found in more passages. Words shorter than min_length are left alone.
+
+ask-thesis.js performs the same lookup in the browser with the same table.
+"""
+
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+SPELLING_NAME = "thesis_spelling.json"
+MAX_EDIT_DISTANCE = 2
+PREFIX_LENGTH = 7
+# Shorter words allow one edit; shorter still, none
+MIN_WORD_LENGTH = 5
+TWO_EDITS_LENGTH = 8
+
+
+def word_deletes(word: str, max_distance: int = MAX_EDIT_DISTANCE, prefix_length: int = PREFIX_LENGTH) -> Set[str]:
+    """The word's prefix and every string made by deleting up to max_distance characters from it."""
+    prefix = word[:prefix_length]
+    found = {prefix}
+    edge = {prefix}
+    for _ in range(max_distance):
+        edge = {w[:i] + w[i + 1:] for w in edge if len(w) > 1 for i in range(len(w))} - found
+        found |= edge
+    return found
+
+
+def build_spelling_table(word_df: Dict[str, int], known: Iterable[str],
+                         max_distance: int = MAX_EDIT_DISTANCE, prefix_length: int = PREFIX_LENGTH) -> Dict:
+    """Precompute the symmetric-delete table of the correctable words (word -> passage count)."""
+    words = sorted(word_df)
+    deletes: Dict[str, List[int]] = {}
+    for i, word in enumerate(words):
+        for key in word_deletes(word, max_distance, prefix_length):
+            deletes.setdefault(key, []).append(i)
+    return {
+        "max_distance": max_distance,
+        "prefix_length": prefix_length,
+        "min_length": MIN_WORD_LENGTH,
+        "two_edits_length": TWO_EDITS_LENGTH,
+        "words": words,
+        "df": [word_df[w] for w in words],
+        "known": sorted(set(known) - set(words)),
+        "deletes": deletes,
+    }
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or limit + 1 once it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SpellCorrector:
+    """Look up corrections in a table written by build_spelling_table."""
+
+    def __init__(self, table: Dict):
+        self.words: List[str] = table["words"]
+        self.df: List[int] = table["df"]
+        self.deletes: Dict[str, List[int]] = table["deletes"]
+        self.max_distance: int = table["max_distance"]
+        self.prefix_length: int = table["prefix_length"]
+        self.min_length: int = table.get("min_length", MIN_WORD_LENGTH)
+        self.two_edits_length: int = table.get("two_edits_length", TWO_EDITS_LENGTH)
+        self.vocabulary = set(self.words) | set(table.get("known", ()))
+        self._cache: Dict[str, Optional[str]] = {}
+
+    @classmethod
+    def load(cls, path: Path) -> "SpellCorrector":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def correction(self, word: str) -> Optional[str]:
+        """The closest correctable word, or None when word is known or nothing is close enough."""
+        if word in self.vocabulary or len(word) < self.min_length:
+            return None
+        if word in self._cache:
+            return self._cache[word]
+        limit = min(self.max_distance, 1 if len(word) < self.two_edits_length else 2)
+        candidates: Set[int] = set()
+        for key in word_deletes(word, limit, self.prefix_length):
+            candidates.update(self.deletes.get(key, ()))
+        best, best_key = None, None
+        for i in candidates:
+            candidate = self.words[i]
+            distance = edit_distance(word, candidate, limit)
+            if distance > limit:
+                continue
+            rank = (distance, -self.df[i], candidate)
+            if best_key is None or rank < best_key:
+                best, best_key = candidate, rank
+        if len(self._cache) < 10000:
+            self._cache[word] = best
+        return best
+
+    def correct(self, word: str) -> str:
+        return self.correction(word) or word
@@ -0,0 +1,490 @@
+"""
+Synthetic Masterchart Registers for Scale Testing
+
+The real register has a few hundred filled rows, which hides how the cleaning,
+crosstab and chart code scale. This script learns the joint distribution of
+the register's categorical columns and writes synthetic registers of any size
+(10^4 to 10^8 rows) with the same layout, for benchmarking the pipelines:
+
+1. Every modelled column is reduced to canonical categories: the labels of
+   label_canonicalizer.py, the age groups of load_and_clean_data(), the kind
+   of LMP entry (date, menopausal or other text), lowercased parity codes and
+   whether radiology was reported. Missing values are a category of their own.
+2. The categories are joined in a Chow-Liu tree: the spanning tree with the
+   largest total (bias-corrected) mutual information between neighbouring
+   columns, the best tree-shaped approximation of the joint distribution. Each column
+   is sampled from its empirical distribution given its parent in the tree.
+3. Each category is written with one of the raw spellings it has in the
+   register ("Menorrhagia"/"menorraghia", "p2l2"/"P2L2", 35 for the 31-40
+   group), drawn with the observed frequencies, so the label noise the
+   canonicalizer and parsers deal with is kept. LMP dates are drawn from the
+   observed date range and written in the observed formats.
+
+Rows are generated in chunks of CHUNK_ROWS, each from its own random stream
+seeded by (seed, chunk number), so a seed always produces the same register
+in every output format, and memory stays bounded by one chunk. Columns are
+kept as category codes plus a dictionary of raw values until written:
+Parquet stores them dictionary-encoded, CSV and XLSX expand them per chunk.
+XLSX registers are split into sheets of XLSX_SHEET_ROWS rows (the format's
+limit), which xlsx_ingest.py reads back as one register; CSV and Parquet are
+the practical formats beyond a few million rows.
+
+Requires pyarrow for Parquet and openpyxl for XLSX output.
+
+Usage:
+  python synthetic_masterchart.py --describe
+  python synthetic_masterchart.py --rows 1e6 --format parquet --seed 7
+  python synthetic_masterchart.py --rows 1e8 --format csv --output /tmp/masterchart-1e8.csv
+"""
+
+import argparse
+import csv
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from clinical_parsers import DATE_RE, MENOPAUSAL_RE, parse_lmp_values
+from label_canonicalizer import canonical_headers, canonicalize_labels, load_mappings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_PATH = os.path.join(ROOT, "data", "Masterchart.csv")
+DEFAULT_OUTPUT_DIR = os.path.join(ROOT, "data", "synthetic")
+
+FORMATS = ('csv', 'xlsx', 'parquet')
+CHUNK_ROWS = 100_000
+XLSX_SHEET_ROWS = 1_048_575
+PROGRESS_SECONDS = 5.0
+
+# Same groups as load_and_clean_data()
+AGE_BINS = [0, 30, 40, 50, 60, 100]
+AGE_LABELS = ['20-30', '31-40', '41-50', '51-60', '60+']
+
+MISSING = '(missing)'
+BIOPSY_COLUMN = 'BIOPSY NO.'
+BIOPSY_PREFIX = 'G '
+
+
+def _age_group(raw):
+    age = pd.to_numeric(raw, errors='coerce')
+    groups = pd.cut(age, bins=AGE_BINS, labels=AGE_LABELS).astype(object)
+    return groups.where(age.notna(), 'Unparseable')
+
+
+def _lmp_kind(raw):
+    text = raw.astype(str).str.strip().str.lower()
+    kind = pd.Series('Other text', index=raw.index, dtype=object)
+    kind[text.str.contains(MENOPAUSAL_RE, regex=True)] = 'Menopausal'
+    kind[text.str.match(DATE_RE)] = 'Date'
+    return kind
+
+
+# Canonical category of each modelled column (canonical header -> function of
+# the raw and label-canonicalized column); other columns keep their labels
+CATEGORIZERS = {
+    'Age': lambda raw, canonical: _age_group(raw),
+    'LMP': lambda raw, canonical: _lmp_kind(raw),
+    'Parity': lambda raw, canonical: raw.astype(str).str.strip().str.lower(),
+    'Radiology': lambda raw, canonical: pd.Series('Reported', index=raw.index, dtype=object),
+}
+MODEL_COLUMNS = ['Histopathological diagnosis', 'Age', 'Complaints', 'Parity', 'Drug history',
+                 'correlation with LMP', 'LMP', 'Radiology']
+
+
+def mutual_information(a, b):
+    """
+    Mutual information (nats) of two integer code arrays, bias-corrected
+
+    The plug-in estimate grows with the number of categories on a few hundred
+    rows (a 22-category column looks informative about anything), so the
+    Miller-Madow bias (r - 1)(c - 1) / 2n of the observed categories is
+    subtracted before the tree is chosen.
+    """
+    joint = np.zeros((a.max() + 1, b.max() + 1))
+    np.add.at(joint, (a, b), 1)
+    rows, cols = (joint.sum(axis=1) > 0).sum(), (joint.sum(axis=0) > 0).sum()
+    bias = (rows - 1) * (cols - 1) / (2.0 * len(a))
+    joint /= joint.sum()
+    independent = joint.sum(axis=1, keepdims=True) * joint.sum(axis=0, keepdims=True)
+    nonzero = joint > 0
+    return float((joint[nonzero] * np.log(joint[nonzero] / independent[nonzero])).sum()) - bias
+
+
+def chow_liu_tree(codes, root=0):
+    """
+    Maximum mutual-information spanning tree of columns (Prim's algorithm)
+
+    Args:
+        codes: List of integer code arrays, one per column
+        root: Column the tree is rooted at
+
+    Returns:
+        (order, parents, weights): columns in sampling order, the parent of
+        each column (None for the root) and the mutual information of each edge
+    """
+    n = len(codes)
+    weights = np.zeros((n, n))
+    for i in range(n):
+        for j in range(i + 1, n):
+            weights[i, j] = weights[j, i] = mutual_information(codes[i], codes[j])
+    order, parents = [root], {root: None}
+    while len(order) < n:
+        _, child, parent = max((weights[p, c], c, p) for p in order for c in range(n) if c not in parents)
+        order.append(child)
+        parents[child] = parent
+    return order, parents, weights
+
+
+def cumulative_table(counts, smoothing=0.0):
+    """Row-normalized cumulative probabilities of a count table (rows without counts stay uniform)"""
+    counts = np.asarray(counts, dtype=float) + smoothing
+    totals = counts.sum(axis=1, keepdims=True)
+    probabilities = np.where(totals > 0, counts / np.where(totals > 0, totals, 1), 1.0 / counts.shape[1])
+    cdf = np.cumsum(probabilities, axis=1)
+    cdf[:, -1] = 1.0
+    return cdf
+
+
+def sample_rows(rng, cdf, parent_codes):
+    """
+    Draw one category per row from the table row selected by its parent code
+
+    Table row p is shifted by p and the rows are searched as one sorted array,
+    so a chunk takes one binary search per row instead of a rows x categories
+    comparison.
+    """
+    u = rng.random(len(parent_codes))
+    offsets = np.arange(cdf.shape[0])
+    flat = (cdf + offsets[:, None]).ravel()
+    found = np.searchsorted(flat, u + parent_codes, side='right') - parent_codes * cdf.shape[1]
+    return np.minimum(found, cdf.shape[1] - 1)
+
+
+def _date_formats(values):
+    """(separator, zero padded, year digits) of every observed date string"""
+    formats = []
+    for value in values:
+        parts = re.split(r'\s*([-./])\s*', value)
+        fields = parts[0::2]
+        padded = all(len(f) >= 2 for f in fields)
+        formats.append((parts[1], padded, len(fields[2])))
+    return formats
+
+
+def _format_date(date, separator, padded, year_digits):
+    day, month = (f'{date.day:02d}', f'{date.month:02d}') if padded else (str(date.day), str(date.month))
+    year = f'{date.year:04d}' if year_digits == 4 else f'{date.year % 100:02d}'
+    return separator.join((day, month, year))
+
+
+class MasterchartModel:
+    """Chow-Liu tree over canonical categories plus the raw spellings of every category"""
+
+    def __init__(self, header, columns, categories, order, parents, weights, tables, spellings,
+                 date_codes, date_strings, biopsy):
+        self.header = header
+        self.columns = columns
+        self.categories = categories
+        self.order = order
+        self.parents = parents
+        self.weights = weights
+        self.tables = tables
+        self.spellings = spellings
+        self.date_codes = date_codes
+        self.date_strings = date_strings
+        # Biopsy numbers are sequential: (column position, first number)
+        self.biopsy = biopsy
+
+    @classmethod
+    def fit(cls, data_path=DEFAULT_DATA_PATH, smoothing=0.0):
+        """
+        Learn the model from a register CSV
+
+        Args:
+            data_path: Masterchart.csv
+            smoothing: Pseudo-count added to every cell of the conditional
+                tables (0 keeps only combinations seen in the register)
+        """
+        raw = pd.read_csv(data_path, dtype=str, encoding='utf-8-sig')
+        header = ['' if str(c).startswith('Unnamed:') else str(c).strip() for c in raw.columns]
+        raw.columns = header
+        canonical_names = canonical_headers(header, load_mappings())
+        labelled = canonicalize_labels(raw)
+        labelled.columns = canonical_names
+        rows = labelled['Histopathological diagnosis'].notna().to_numpy()
+        raw, labelled = raw[rows].reset_index(drop=True), labelled[rows].reset_index(drop=True)
+
+        columns, categories, codes, spellings = [], [], [], []
+        for name in MODEL_COLUMNS:
+            position = canonical_names.index(name)
+            raw_values = raw.iloc[:, position]
+            category = labelled.iloc[:, position]
+            if name in CATEGORIZERS:
+                category = CATEGORIZERS[name](raw_values, category)
+            category = category.where(raw_values.notna(), MISSING).astype(str)
+            category_codes, uniques = pd.factorize(category, sort=True)
+            spelling = raw_values.where(raw_values.notna(), None)
+            spelling_codes, values = pd.factorize(spelling, sort=True)
+            # Missing raw values (code -1) get the last column of the spelling table
+            counts = np.zeros((len(uniques), len(values) + 1))
+            np.add.at(counts, (category_codes, np.where(spelling_codes < 0, len(values), spelling_codes)), 1)
+            columns.append(position)
+            categories.append(list(uniques))
+            codes.append(category_codes)
+            spellings.append((cumulative_table(counts), list(values)))
+
+        order, parents, weights = chow_liu_tree(codes, root=0)
+        tables = {}
+        for child in order:
+            parent = parents[child]
+            if parent is None:
+                counts = np.bincount(codes[child], minlength=len(categories[child]))[None, :]
+            else:
+                counts = np.zeros((len(categories[parent]), len(categories[child])))
+                np.add.at(counts, (codes[parent], codes[child]), 1)
+            tables[child] = cumulative_table(counts, smoothing)
+
+        # LMP dates: every day of the observed range in every observed format
+        lmp = MODEL_COLUMNS.index('LMP')
+        observed = [v for v in spellings[lmp][1] if re.match(DATE_RE, v.strip().lower())]
+        dates = parse_lmp_values([v.strip().lower() for v in observed])['LMP Date'].dropna()
+        formats = sorted(set(_date_formats([v.strip() for v in observed])))
+        format_weights = pd.Series(_date_formats([v.strip() for v in observed])).value_counts()
+        days = pd.date_range(dates.min(), dates.max(), freq='D') if len(dates) else pd.DatetimeIndex([])
+        # Generated strings that were also typed in the register reuse its entry
+        index = {value: i for i, value in enumerate(spellings[lmp][1])}
+        lookup = np.zeros((len(days), len(formats)), dtype=np.int64)
+        for d, day in enumerate(days):
+            for f, spec in enumerate(formats):
+                text = _format_date(day, *spec)
+                lookup[d, f] = index.setdefault(text, len(index))
+        date_strings = list(index)[len(spellings[lmp][1]):]
+        format_cdf = cumulative_table([[format_weights[spec] for spec in formats]]) if formats else None
+
+        biopsy_position = canonical_names.index(BIOPSY_COLUMN)
+        biopsy = raw.iloc[:, biopsy_position].str.extract(r'(\d+)')[0]
+        first_biopsy = int(pd.to_numeric(biopsy, errors='coerce').min()) if biopsy.notna().any() else 1
+        return cls(header, columns, categories, order, parents, weights, tables, spellings,
+                   (lookup, format_cdf), date_strings, (biopsy_position, first_biopsy))
+
+    def describe(self):
+        """Printable summary of the learned tree"""
+        lines = []
+        for child in self.order:
+            name = MODEL_COLUMNS[child]
+            parent = self.parents[child]
+            if parent is None:
+                lines.append(f"{name} ({len(self.categories[child])} categories): root")
+            else:
+                lines.append(f"{name} ({len(self.categories[child])} categories) <- {MODEL_COLUMNS[parent]}"
+                             f" (MI {self.weights[child, parent]:.3f} nats)")
+            lines.append(f"    {len(self.spellings[child][1])} raw spellings")
+        return '\n'.join(lines)
+
+    def vocabularies(self):
+        """Raw values of every modelled column (category codes index into these)"""
+        vocabularies = [values for _, values in self.spellings]
+        lmp = MODEL_COLUMNS.index('LMP')
+        vocabularies[lmp] = vocabularies[lmp] + self.date_strings
+        return vocabularies
+
+    def sample(self, rng, rows):
+        """
+        Sample one chunk
+
+        Returns:
+            List of raw-value code arrays in MODEL_COLUMNS order; -1 is missing
+        """
+        categories = [None] * len(MODEL_COLUMNS)
+        for child in self.order:
+            parent = self.parents[child]
+            parent_codes = np.zeros(rows, dtype=np.int64) if parent is None else categories[parent]
+            categories[child] = sample_rows(rng, self.tables[child], parent_codes)
+        result = []
+        for column, codes in enumerate(categories):
+            cdf, values = self.spellings[column]
+            spelled = sample_rows(rng, cdf, codes)
+            spelled[spelled == len(values)] = -1
+            result.append(spelled)
+        lmp = MODEL_COLUMNS.index('LMP')
+        if 'Date' in self.categories[lmp] and self.date_strings:
+            lookup, format_cdf = self.date_codes
+            dated = np.flatnonzero(categories[lmp] == self.categories[lmp].index('Date'))
+            days = rng.integers(0, lookup.shape[0], len(dated))
+            formats = sample_rows(rng, format_cdf, np.zeros(len(dated), dtype=np.int64))
+            result[lmp][dated] = lookup[days, formats]
+        return result
+
+
+def iter_chunks(model, rows, seed):
+    """Yield (first row number, code arrays) chunks of a synthetic register"""
+    for number, start in enumerate(range(0, rows, CHUNK_ROWS)):
+        rng = np.random.default_rng([seed, number])
+        yield start, model.sample(rng, min(CHUNK_ROWS, rows - start))
+
+
+def _biopsy_numbers(model, start, length):
+    first = model.biopsy[1] + start
+    numbers = np.arange(first, first + length)
+    return pd.Series(numbers).astype(str).radd(BIOPSY_PREFIX)
+
+
+def _numeric(values):
+    return all(isinstance(v, str) and v.strip().isdigit() for v in values)
+
+
+def chunk_frame(model, vocabularies, start, codes):
+    """A chunk as a DataFrame in the register's column layout (positional column labels)"""
+    length = len(codes[0])
+    frame = {position: pd.Series([None] * length, dtype=object) for position in range(len(model.header))}
+    for column, position in enumerate(model.columns):
+        frame[position] = pd.Categorical.from_codes(codes[column], categories=pd.Index(vocabularies[column]))
+    frame[model.biopsy[0]] = _biopsy_numbers(model, start, length)
+    return pd.DataFrame(frame)
+
+
+def write_csv(model, chunks, path):
+    vocabularies = model.vocabularies()
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerow(model.header)
+        for start, codes in chunks:
+            chunk_frame(model, vocabularies, start, codes).to_csv(f, header=False, index=False)
+            yield len(codes[0])
+
+
+def write_parquet(model, chunks, path):
+    """Named columns only, typed like xlsx_ingest.py snapshots"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    vocabularies = model.vocabularies()
+    dictionaries = []
+    for values in vocabularies:
+        if _numeric(values):
+            dictionaries.append(pa.array([int(v) for v in values], pa.int64()))
+        else:
+            dictionaries.append(pa.array(values, pa.string()))
+    names = [name for name in model.header if name]
+    writer = None
+    try:
+        for start, codes in chunks:
+            arrays = {}
+            for column, position in enumerate(model.columns):
+                indices = pa.array(codes[column], pa.int32(), mask=codes[column] < 0)
+                # Decoded so pandas reads plain columns; the Parquet writer dictionary-encodes them again
+                array = pa.DictionaryArray.from_arrays(indices, dictionaries[column]).dictionary_decode()
+                arrays[model.header[position]] = array
+            length = len(codes[0])
+            arrays[model.header[model.biopsy[0]]] = pa.array(_biopsy_numbers(model, start, length), pa.string())
+            batch = pa.RecordBatch.from_arrays([arrays.get(name, pa.nulls(length, pa.string())) for name in names],
+                                               names=names)
+            if writer is None:
+                writer = pq.ParquetWriter(path, batch.schema)
+            writer.write_batch(batch)
+            yield len(codes[0])
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_xlsx(model, chunks, path):
+    """The register's layout in sheets of at most XLSX_SHEET_ROWS rows"""
+    from openpyxl import Workbook
+
+    vocabularies = model.vocabularies()
+    typed = [[int(v) for v in values] if _numeric(values) else values for values in vocabularies]
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows = None, XLSX_SHEET_ROWS
+    for start, codes in chunks:
+        length = len(codes[0])
+        cells = [[None] * length for _ in model.header]
+        for column, position in enumerate(model.columns):
+            lookup = np.array(typed[column] + [None], dtype=object)
+            cells[position] = lookup[codes[column]].tolist()
+        cells[model.biopsy[0]] = _biopsy_numbers(model, start, length).tolist()
+        for row in zip(*cells):
+            if sheet_rows >= XLSX_SHEET_ROWS:
+                sheet = workbook.create_sheet(f'Sheet{len(workbook.sheetnames) + 1}')
+                sheet.append([name or None for name in model.header])
+                sheet_rows = 0
+            sheet.append(row)
+            sheet_rows += 1
+        yield length
+    workbook.save(path)
+
+
+WRITERS = {'csv': write_csv, 'parquet': write_parquet, 'xlsx': write_xlsx}
+
+
+def generate(rows, output, fmt=None, seed=0, data_path=DEFAULT_DATA_PATH, smoothing=0.0):
+    """
+    Write a synthetic register
+
+    Args:
+        rows: Number of rows
+        output: Output path; the format follows its extension unless fmt is given
+        fmt: 'csv', 'xlsx' or 'parquet'
+        seed: Random seed; the same seed gives the same rows in every format
+        data_path: Register the model is learned from
+        smoothing: See MasterchartModel.fit
+
+    Returns:
+        Path of the register
+    """
+    fmt = fmt or os.path.splitext(output)[1].lstrip('.').lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {', '.join(FORMATS)}")
+    model = MasterchartModel.fit(data_path, smoothing)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tmp_path = output + '.tmp'
+    started = last_report = time.perf_counter()
+    written = 0
+    try:
+        for length in WRITERS[fmt](model, iter_chunks(model, rows, seed), tmp_path):
+            written += length
+            if time.perf_counter() - last_report >= PROGRESS_SECONDS:
+                last_report = time.perf_counter()
+                print(f"[synthetic] {written:,} / {rows:,} rows ({last_report - started:.1f}s)")
+        os.replace(tmp_path, output)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    elapsed = time.perf_counter() - started
+    print(f"[synthetic] Wrote {written:,} rows to {output} in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f} rows/s)")
+    return output
+
+
+def parse_rows(value):
+    """Row counts such as 1000000, 1e6 or 1_000_000"""
+    rows = int(float(value.replace('_', '')))
+    if rows < 1:
+        raise argparse.ArgumentTypeError("the row count must be positive")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Masterchart register for scale testing")
+    parser.add_argument("--rows", type=parse_rows, default=10_000, help="Number of rows, e.g. 1e6 (default: 10000)")
+    parser.add_argument("--format", choices=FORMATS, help="Output format (default: from --output, else csv)")
+    parser.add_argument("--output", help="Output path (default: data/synthetic/<format>/Masterchart-<rows>-seed<seed>.<format>)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="Register to learn from")
+    parser.add_argument("--smoothing", type=float, default=0.0,
+                        help="Pseudo-count for unseen category combinations (default: 0)")
+    parser.add_argument("--describe", action="store_true", help="Print the learned model and exit")
+    args = parser.parse_args()
+
+    if args.describe:
+        print(MasterchartModel.fit(args.data, args.smoothing).describe())
+        return
+    fmt = args.format or (os.path.splitext(args.output)[1].lstrip('.').lower() if args.output else 'csv')
+    # One directory per format: loading a workbook writes its Parquet snapshot next to it
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, fmt, f"Masterchart-{args.rows}-seed{args.seed}.{fmt}")
+    generate(args.rows, output, fmt, args.seed, args.data, args.smoothing)
+    print(f"\n✓ Synthetic register '{output}': {args.rows:,} rows")
+
+
+if __name__ == "__main__":
+    main()
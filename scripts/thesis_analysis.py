@@ -9,77 +9,126 @@ Visualizations created:
 2. Age distribution of patients
 3. Common presenting complaints (with log scale option)
 4. Histopathological diagnoses by age group
-5. Correlation heatmap of key variables
+5. Association heatmap of key variables (Cramér's V)
 6. Sankey diagram showing relationships between age groups and diagnoses
 7. Additional insight: Drug history impact on diagnoses (new)
 8. Interactive visualization options
 
-All visualizations are saved to the figures folder.
+All visualizations are saved to the figures folder: each run renders into a new
+figures version that is published atomically (see publish.py) and then
+mirrored into figures/, so the dashboard never serves a half-written chart.
+--figures writes straight to another directory instead. Each chart is registered in
+CHARTS with the plotting backends it needs and the cleaned columns it reads;
+backends are imported lazily, so generating one chart only loads that chart's
+libraries, and watch.py re-renders only the charts whose columns changed.
+
+Usage:
+  python thesis_analysis.py
+  python thesis_analysis.py --list
+  python thesis_analysis.py --only age_distribution diagnosis_by_age
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
+import importlib
+import importlib.util
 import os
 import numpy as np
-from matplotlib.colors import LinearSegmentedColormap
-import plotly.graph_objects as go
-import plotly.express as px
-import plotly.io as pio
-from plotly.subplots import make_subplots
-import matplotlib.ticker as ticker
-import networkx as nx
-from scipy import stats
+import pandas as pd
+from bootstrap_ci import bootstrap_crosstab, ci_frames
+from age_density import age_density
+from clinical_parsers import parse_clinical_columns
+from label_canonicalizer import canonicalize_labels
+from publish import FIGURES_ARTIFACT, read_pointer, staged_version
+from xlsx_ingest import load_masterchart
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LazyModule:
+    """Module proxy that imports the module on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+# Plotting backends are imported by the first chart that uses them, so
+# rendering a single chart only pays for that chart's libraries
+plt = LazyModule('matplotlib.pyplot')
+mcolors = LazyModule('matplotlib.colors')
+ticker = LazyModule('matplotlib.ticker')
+sns = LazyModule('seaborn')
+go = LazyModule('plotly.graph_objects')
+px = LazyModule('plotly.express')
+pio = LazyModule('plotly.io')
+nx = LazyModule('networkx')
+stats = LazyModule('scipy.stats')
+
+# Interactive charts are exported as JSON specs for the dashboard; the plotly.js
+# runtime itself is served once by enhanced_server.py. Pages opened from disk or
+# from a server without that route fall back to the CDN build of the same version.
+FIGURE_SPECS_DIR = 'specs'
+PLOTLY_RUNTIME_URL = '/vendor/plotly.min.js'
+PLOTLY_RUNTIME_LOADER = """    <script charset="utf-8" src="{local}"></script>
+    <script>window.Plotly || document.write('<script charset="utf-8" src="{cdn}"><\\/script>');</script>
+"""
+
+# Histogram bins of the age distribution chart
+AGE_BINS = np.arange(20, 71, 5)
+
+# Packages behind each backend a chart can declare
+BACKEND_PACKAGES = {
+    'matplotlib': "For static visualizations",
+    'seaborn': "For enhanced matplotlib plots and the shared plot style",
+    'plotly': "For interactive and beautiful visualizations",
+    'networkx': "For network graph and chord diagrams",
+    'scipy': "For statistical functions",
+}
 
 def main():
-    # Set up paths with raw strings to handle Windows backslashes
-    base_dir = r"C:\Users\coad1\OneDrive\Desktop\Thesis Figures and descriptions"
-    data_path = os.path.join(base_dir, "data", "Masterchart.csv")
-    figures_dir = os.path.join(base_dir, "figures")
-    
-    # Ensure figures directory exists
-    os.makedirs(figures_dir, exist_ok=True)
+    parser = argparse.ArgumentParser(description="Generate the thesis figures")
+    parser.add_argument("--data", default=os.path.join(ROOT, "data", "Masterchart.csv"),
+                        help="Path to Masterchart.csv or the .xlsx register")
+    parser.add_argument("--figures", help="Write the figures directly to this directory instead of "
+                                          "publishing a new figures version (mirrored to figures/)")
+    parser.add_argument("--only", nargs="+", metavar="CHART", help="Charts to generate (see --list)")
+    parser.add_argument("--list", action="store_true", help="List the available charts and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, chart in CHARTS.items():
+            print(f"{name:<24} [{', '.join(chart['backends'])}] {chart['description']}")
+        return
+    unknown = [name for name in args.only or [] if name not in CHARTS]
+    if unknown:
+        parser.error(f"unknown chart(s): {', '.join(unknown)} (see --list)")
+    selected = args.only or list(CHARTS)
+    data_path = args.data
     
     try:
-        # --- Check for required libraries ---
-        check_required_libraries()
+        # --- Check the libraries the selected charts need ---
+        check_required_libraries(selected)
         
         # --- Data Loading and Cleaning ---
         print("Loading and cleaning dataset...")
         df = load_and_clean_data(data_path)
         
         # --- Set plot styling for consistent look and feel ---
-        set_plot_style()
+        if any('matplotlib' in CHARTS[name]['backends'] for name in selected):
+            set_plot_style()
         
-        # --- Generate all visualizations ---
+        # --- Generate the selected visualizations ---
         print("\nGenerating visualizations...")
-        
-        # 1. Distribution of Histopathological Diagnoses (with log scale)
-        create_diagnosis_distribution_chart(df, figures_dir, use_log_scale=True)
-        
-        # 2. Age Distribution of Patients
-        create_age_distribution_chart(df, figures_dir)
-        
-        # 3. Common Presenting Complaints (with log scale)
-        create_complaints_chart(df, figures_dir, use_log_scale=True)
-        
-        # 4. Histopathological Diagnosis by Age Group
-        create_diagnosis_by_age_chart(df, figures_dir)
-        
-        # 5. Correlation Heatmap
-        create_correlation_heatmap(df, figures_dir)
-        
-        # 6. Sankey Diagram (Age Group to Diagnosis)
-        create_sankey_diagram(df, figures_dir)
-        
-        # 7. Drug History Impact on Diagnoses
-        create_drug_history_impact_chart(df, figures_dir)
-        
-        # 8. Create chord diagram for relationships
-        create_chord_diagram(df, figures_dir)
-        
-        # 9. Create sunburst chart for hierarchical view
-        create_sunburst_chart(df, figures_dir)
+        if args.figures:
+            os.makedirs(args.figures, exist_ok=True)
+            generate_charts(df, args.figures, selected)
+        else:
+            print(f"\nPublished figures version {publish_charts(df, selected)}.")
         
         print("\nAll visualizations have been successfully generated in the figures folder.")
         
@@ -87,43 +136,90 @@ def main():
         print(f"Error: '{data_path}' not found. Please ensure the file is in the correct directory.")
     except ModuleNotFoundError as e:
         print(f"Missing required library: {e}")
-        print("Please install required libraries using: pip install plotly networkx matplotlib seaborn pandas numpy scipy")
     except Exception as e:
         print(f"An error occurred during analysis: {e}")
 
 
-def check_required_libraries():
-    """Check if all required libraries are installed"""
-    required_libraries = {
-        'plotly': "For interactive and beautiful visualizations",
-        'networkx': "For network graph and chord diagrams",
-        'matplotlib': "For static visualizations",
-        'seaborn': "For enhanced matplotlib plots",
-        'pandas': "For data manipulation",
-        'numpy': "For numerical operations",
-        'scipy': "For statistical functions"
-    }
-    
-    missing_libraries = []
-    for lib, purpose in required_libraries.items():
-        try:
-            __import__(lib)
-        except ImportError:
-            missing_libraries.append(f"- {lib}: {purpose}")
+def generate_charts(df, figures_dir, charts, progress=None):
+    """
+    Run the builders of the given charts, writing into figures_dir
+
+    progress, if given, is called as progress(fraction_done, chart_name) after
+    each chart; an exception it raises stops the run (e.g. a cancelled job).
+    """
+    for done, name in enumerate(charts, 1):
+        chart = CHARTS[name]
+        chart['builder'](df, figures_dir, **chart['kwargs'])
+        if progress is not None:
+            progress(done / len(charts), name)
+
+
+def publish_charts(df, charts, progress=None):
+    """
+    Render charts into a new figures version, publish it and mirror it to figures/
+
+    The version is seeded with the current one, so publishing a subset of the
+    charts still yields a complete set.
+
+    Args:
+        df: Cleaned DataFrame
+        charts: Chart names from CHARTS
+        progress: Optional callback, see generate_charts
+
+    Returns:
+        The published version name
+    """
+    with staged_version(FIGURES_ARTIFACT, mirror=os.path.join(ROOT, "figures")) as staging:
+        generate_charts(df, str(staging), charts, progress)
+    return read_pointer(FIGURES_ARTIFACT)['version']
+
+
+def charts_using(columns):
+    """Names of the charts that read any of the given (cleaned) columns"""
+    columns = set(columns)
+    return [name for name, chart in CHARTS.items() if columns & set(chart['columns'])]
+
+
+def check_required_libraries(charts=None):
+    """
+    Check that the backends of the given charts are installed
+
+    Uses importlib.util.find_spec, so nothing is imported by the check itself.
+
+    Args:
+        charts: Chart names from CHARTS (default: all charts)
+    """
+    backends = []
+    for name in charts or CHARTS:
+        backends.extend(b for b in CHARTS[name]['backends'] if b not in backends)
+    
+    missing_libraries = [lib for lib in backends if importlib.util.find_spec(lib) is None]
     
     if missing_libraries:
         print("Missing required libraries:")
         for lib in missing_libraries:
-            print(lib)
+            print(f"- {lib}: {BACKEND_PACKAGES[lib]}")
         print("\nPlease install these libraries using:")
-        print("pip install plotly networkx matplotlib seaborn pandas numpy scipy")
-        raise ModuleNotFoundError("Missing required libraries")
+        print(f"pip install {' '.join(missing_libraries)}")
+        raise ModuleNotFoundError(f"Missing required libraries: {', '.join(missing_libraries)}")
+
 
+def load_and_clean_data(data_path, reference_date=None):
+    """
+    Load and clean the dataset for analysis
 
-def load_and_clean_data(data_path):
-    """Load and clean the dataset for analysis"""
-    # Load the dataset
-    df = pd.read_csv(data_path)
+    Args:
+        data_path: Path to Masterchart.csv, the .xlsx register or a Parquet snapshot
+        reference_date: Date 'Days Since LMP' is counted to (left NA without one)
+    """
+    # Load the dataset (the .xlsx register is read through its Parquet snapshot)
+    extension = os.path.splitext(data_path)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        df = load_masterchart(data_path)
+    elif extension == '.parquet':
+        df = pd.read_parquet(data_path)
+    else:
+        df = pd.read_csv(data_path)
     
     # The first few columns are unnamed and empty, find the first valid column
     first_valid_col = df.columns[df.columns.str.contains('Histopathological', case=False, na=False)][0]
@@ -132,21 +228,13 @@ def load_and_clean_data(data_path):
     # Clean column names by stripping whitespace
     df.columns = df.columns.str.strip()
     
+    # Map headers and category labels (case, spacing, spelling variants) onto
+    # the curated vocabulary; see label_canonicalizer.py
+    df = canonicalize_labels(df)
+    
     # Drop rows where 'Histopathological diagnosis' is NaN
     df.dropna(subset=['Histopathological diagnosis'], inplace=True)
     
-    # Clean the 'Histopathological diagnosis' column
-    df['Histopathological diagnosis'] = df['Histopathological diagnosis'].str.strip()
-    
-    # Clean and standardize 'Drug history'
-    if 'Drug history' in df.columns:
-        df['Drug history'] = df['Drug history'].str.strip().str.lower()
-        df['Drug history'] = df['Drug history'].replace({
-            'no': 'No Hormonal Intake',
-            'hormonal intake': 'Hormonal Intake',
-            'hormonal hx': 'Hormonal Intake'
-        })
-    
     # Convert 'Age' to numeric, handling errors
     df['Age'] = pd.to_numeric(df['Age'], errors='coerce')
     df.dropna(subset=['Age'], inplace=True)  # Drop rows where age couldn't be converted
@@ -159,14 +247,40 @@ def load_and_clean_data(data_path):
         labels=['20-30', '31-40', '41-50', '51-60', '60+']
     )
     
+    # Parse free-text LMP dates and parity codes into typed columns
+    parse_clinical_columns(df, reference_date)
+    
     return df
 
 
+def save_interactive_figure(fig, figures_dir, name):
+    """
+    Save a plotly figure for the dashboard
+
+    Writes the figure as a compact JSON spec (figures/specs/<name>.json) that
+    the dashboard renders into a container, and an HTML page that loads the
+    shared plotly runtime served by the dashboard server (or, when that is not
+    reachable, the CDN) instead of inlining the multi-megabyte plotly.js bundle.
+    """
+    from plotly.offline import get_plotlyjs_version
+
+    spec_dir = os.path.join(figures_dir, FIGURE_SPECS_DIR)
+    os.makedirs(spec_dir, exist_ok=True)
+    with open(os.path.join(spec_dir, f'{name}.json'), 'w', encoding='utf-8') as f:
+        f.write(fig.to_json())
+    loader = PLOTLY_RUNTIME_LOADER.format(
+        local=PLOTLY_RUNTIME_URL, cdn=f'https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js')
+    page = fig.to_html(include_plotlyjs=False, full_html=True).replace('</head>', loader + '</head>', 1)
+    with open(os.path.join(figures_dir, f'{name}.html'), 'w', encoding='utf-8') as f:
+        f.write(page)
+
+
 def set_plot_style():
     """Set consistent styling for all visualizations"""
     sns.set_style("whitegrid")
     plt.rcParams['figure.figsize'] = (12, 8)
     plt.rcParams['figure.dpi'] = 300  # Higher resolution
+    plt.rcParams['savefig.dpi'] = 'figure'  # Charts are saved at figure.dpi
     plt.rcParams['axes.titlesize'] = 18
     plt.rcParams['axes.labelsize'] = 14
     plt.rcParams['xtick.labelsize'] = 12
@@ -175,7 +289,7 @@ def set_plot_style():
     # Create custom color palettes
     global custom_palette, custom_cmap
     custom_palette = sns.color_palette("viridis", 12)
-    custom_cmap = LinearSegmentedColormap.from_list("custom_cmap", sns.color_palette("coolwarm", 12))
+    custom_cmap = mcolors.LinearSegmentedColormap.from_list("custom_cmap", sns.color_palette("coolwarm", 12))
 
 
 def create_diagnosis_distribution_chart(df, figures_dir, use_log_scale=False):
@@ -256,7 +370,7 @@ def create_diagnosis_distribution_chart(df, figures_dir, use_log_scale=False):
     # Save the standard figure
     suffix = "_log" if use_log_scale else ""
     output_path = os.path.join(figures_dir, f'histopathological_diagnoses{suffix}.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.savefig(output_path, bbox_inches='tight')
     plt.close()
     print(f"✓ Generated 'histopathological_diagnoses{suffix}.png'")
     
@@ -282,34 +396,43 @@ def create_diagnosis_distribution_chart(df, figures_dir, use_log_scale=False):
             plot_bgcolor='rgba(245, 245, 245, 1)',
         )
         
-        # Save as interactive HTML
-        html_path = os.path.join(figures_dir, f'histopathological_diagnoses{suffix}_interactive.html')
-        fig.write_html(html_path)
+        # Save as a compact JSON spec plus an HTML page using the shared plotly runtime
+        save_interactive_figure(fig, figures_dir, f'histopathological_diagnoses{suffix}_interactive')
         print(f"✓ Generated interactive 'histopathological_diagnoses{suffix}_interactive.html'")
     except Exception as e:
         print(f"  Warning: Could not generate interactive plot: {e}")
 
 
-def create_age_distribution_chart(df, figures_dir):
-    """Create a visually enhanced histogram showing age distribution of patients"""
+def create_age_distribution_chart(df, figures_dir, density=None):
+    """
+    Create a visually enhanced histogram showing age distribution of patients
+
+    Args:
+        df: DataFrame with the data
+        figures_dir: Directory to save the figure
+        density: Precomputed age_density result for df (e.g. cached per cohort)
+    """
+    if density is None:
+        density = age_density(df['Age'], edges=AGE_BINS)
+    edges = density['histogram']['edges']
+    counts = density['histogram']['counts']
+    bin_width = edges[1] - edges[0]
+    summary = density['stats']
+
     plt.figure(figsize=(14, 8))
     
-    # Create a color gradient for the histogram bars
-    color_gradient = sns.color_palette("viridis", n_colors=10)
-    
-    # Create a more detailed histogram with KDE
-    ax = sns.histplot(
-        df['Age'], 
-        bins=np.arange(20, 71, 5), 
-        kde=True, 
-        color='teal'
-    )
+    # Histogram and KDE from the binned density (the KDE is scaled to patients per bin)
+    ax = plt.gca()
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge',
+           color='teal', alpha=0.6, edgecolor='white', linewidth=1)
+    ax.plot(density['kde']['x'], density['kde']['density'] * density['n'] * bin_width,
+            color='teal', linewidth=2)
     
     # Add statistical annotations
-    mean_age = df['Age'].mean()
-    median_age = df['Age'].median()
-    std_age = df['Age'].std()
-    mode_age = df['Age'].mode()[0]
+    mean_age = summary['mean']
+    median_age = summary['median']
+    std_age = summary['std']
+    mode_age = summary['mode']
     
     # Add mean line
     plt.axvline(mean_age, color='red', linestyle='dashed', linewidth=2, alpha=0.8)
@@ -342,10 +465,10 @@ def create_age_distribution_chart(df, figures_dir):
     stats_text = f"""Statistics:
 Mean: {mean_age:.1f} years
 Median: {median_age:.1f} years
-Mode: {mode_age} years
+Mode: {mode_age:g} years
 Std Dev: {std_age:.1f} years
-Min: {df['Age'].min()} years
-Max: {df['Age'].max()} years
+Min: {summary['min']:g} years
+Max: {summary['max']:g} years
 """
     
     plt.text(
@@ -373,39 +496,51 @@ Max: {df['Age'].max()} years
     
     # Save the figure with higher resolution
     output_path = os.path.join(figures_dir, 'age_distribution.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.savefig(output_path, bbox_inches='tight')
     plt.close()
     print(f"✓ Generated 'age_distribution.png'")
     
     # Create an interactive plotly version
     try:
-        # Create a figure with plotly
-        fig = px.histogram(
-            df, 
-            x="Age",
-            nbins=50,
-            marginal="box",  # Add a box plot on the margin
-            color_discrete_sequence=['teal'],
+        # Bars, KDE and box are drawn from the binned density, so the spec stays
+        # the same size however many patients there are
+        percent = counts / density['n'] * 100
+        kde_percent = density['kde']['density'] * bin_width * 100
+        peak = max(percent.max(), kde_percent.max())
+
+        fig = go.Figure()
+        fig.add_bar(
+            x=edges[:-1] + np.diff(edges) / 2,
+            y=percent,
+            width=np.diff(edges),
+            marker_color='teal',
             opacity=0.7,
-            histnorm="percent",  # Show as percentages
-            title="Age Distribution of Patients with AUB"
+            name='Patients'
         )
         
         # Add a KDE curve
         fig.add_scatter(
-            x=np.linspace(df['Age'].min(), df['Age'].max(), 100),
-            y=stats.gaussian_kde(df['Age'])(np.linspace(df['Age'].min(), df['Age'].max(), 100)) * 100,
+            x=density['kde']['x'],
+            y=kde_percent,
             mode='lines',
             line=dict(color='darkblue', width=2),
             name='KDE'
         )
+
+        # Box plot on the margin from the precomputed quartiles
+        fig.add_box(
+            q1=[summary['q1']], median=[summary['median']], q3=[summary['q3']],
+            lowerfence=[summary['min']], upperfence=[summary['max']],
+            mean=[mean_age], y=['Age'], orientation='h',
+            marker_color='teal', name='Age', yaxis='y2', showlegend=False
+        )
         
         # Add age group markers
         for age in [30, 40, 50, 60]:
             fig.add_shape(
                 type="line",
                 x0=age, y0=0,
-                x1=age, y1=fig.data[0]['y'].max(),
+                x1=age, y1=peak,
                 line=dict(color="gray", width=1, dash="dot")
             )
         
@@ -413,13 +548,13 @@ Max: {df['Age'].max()} years
         fig.add_shape(
             type="line",
             x0=mean_age, y0=0,
-            x1=mean_age, y1=fig.data[0]['y'].max(),
+            x1=mean_age, y1=peak,
             line=dict(color="red", width=2, dash="dash")
         )
         
         # Add annotations
         fig.add_annotation(
-            x=mean_age+2, y=fig.data[0]['y'].max()*0.9,
+            x=mean_age+2, y=peak*0.9,
             text=f"Mean: {mean_age:.1f} yrs",
             showarrow=True,
             arrowhead=1,
@@ -429,15 +564,17 @@ Max: {df['Age'].max()} years
         )
         
         fig.update_layout(
+            title="Age Distribution of Patients with AUB",
             xaxis_title="Age (years)",
-            yaxis_title="Percentage of Patients (%)",
+            yaxis=dict(title="Percentage of Patients (%)", domain=[0, 0.8]),
+            yaxis2=dict(domain=[0.85, 1], showticklabels=False),
+            bargap=0,
             hoverlabel=dict(bgcolor="white", font_size=14),
             plot_bgcolor='rgba(245, 245, 245, 1)'
         )
         
-        # Save as interactive HTML
-        html_path = os.path.join(figures_dir, 'age_distribution_interactive.html')
-        fig.write_html(html_path)
+        # Save as a compact JSON spec plus an HTML page using the shared plotly runtime
+        save_interactive_figure(fig, figures_dir, 'age_distribution_interactive')
         print(f"✓ Generated interactive 'age_distribution_interactive.html'")
     except Exception as e:
         print(f"  Warning: Could not generate interactive plot: {e}")
@@ -454,8 +591,8 @@ def create_complaints_chart(df, figures_dir, use_log_scale=False):
     """
     plt.figure(figsize=(14, 9))
     
-    # Correct for potential typos in 'Compalints' column name
-    complaint_col = 'Compalints' if 'Compalints' in df.columns else 'Complaints'
+    # The raw 'Compalints' header is canonicalized by load_and_clean_data
+    complaint_col = 'Complaints'
     
     if complaint_col not in df.columns:
         print(f"Warning: No column found for complaints. Available columns: {df.columns.tolist()}")
@@ -514,7 +651,7 @@ def create_complaints_chart(df, figures_dir, use_log_scale=False):
     # Save the standard figure
     suffix = "_log" if use_log_scale else ""
     output_path = os.path.join(figures_dir, f'common_complaints{suffix}.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.savefig(output_path, bbox_inches='tight')
     plt.close()
     print(f"✓ Generated 'common_complaints{suffix}.png'")
     
@@ -547,9 +684,8 @@ def create_complaints_chart(df, figures_dir, use_log_scale=False):
             textfont=dict(size=12)
         )
         
-        # Save as interactive HTML
-        html_path = os.path.join(figures_dir, f'common_complaints{suffix}_interactive.html')
-        fig.write_html(html_path)
+        # Save as a compact JSON spec plus an HTML page using the shared plotly runtime
+        save_interactive_figure(fig, figures_dir, f'common_complaints{suffix}_interactive')
         print(f"✓ Generated interactive 'common_complaints{suffix}_interactive.html'")
     except Exception as e:
         print(f"  Warning: Could not generate interactive plot: {e}")
@@ -567,11 +703,30 @@ def create_diagnosis_by_age_chart(df, figures_dir):
     # Normalize to get proportions
     age_diag_crosstab_norm = age_diag_crosstab.div(age_diag_crosstab.sum(axis=1), axis=0)
     
+    # Bootstrap 95% confidence intervals for every age group x diagnosis proportion
+    _, ci_low, ci_high = ci_frames(
+        bootstrap_crosstab(df_top, 'Age Group', 'Histopathological diagnosis'),
+        'Age Group', 'Histopathological diagnosis'
+    )
+    
     # Create the plot
-    plt.figure(figsize=(16, 10))
-    age_diag_crosstab_norm.plot(kind='bar', stacked=True, colormap='tab20')
+    ax = age_diag_crosstab_norm.plot(kind='bar', stacked=True, colormap='tab20', figsize=(16, 10))
+    
+    # Error bars at the top of each segment show the uncertainty of that segment's share
+    tops = age_diag_crosstab_norm.cumsum(axis=1)
+    for container, diagnosis in zip(ax.containers, age_diag_crosstab_norm.columns):
+        proportion = age_diag_crosstab_norm[diagnosis]
+        low = ci_low.reindex(proportion.index)[diagnosis]
+        high = ci_high.reindex(proportion.index)[diagnosis]
+        ax.errorbar(
+            [p.get_x() + p.get_width() / 2 for p in container.patches],
+            tops[diagnosis].values,
+            yerr=[(proportion - low).clip(lower=0).values, (high - proportion).clip(lower=0).values],
+            fmt='none', ecolor='black', elinewidth=0.8, capsize=3, alpha=0.7
+        )
+    ax.set_ylim(0, 1.05)  # shares cannot exceed 1; keep wide intervals from stretching the axis
     
-    plt.title('Histopathological Diagnosis Distribution by Age Group')
+    plt.title('Histopathological Diagnosis Distribution by Age Group (95% bootstrap CI)')
     plt.xlabel('Age Group')
     plt.ylabel('Proportion of Cases')
     plt.xticks(rotation=0)
@@ -587,39 +742,36 @@ def create_diagnosis_by_age_chart(df, figures_dir):
 
 
 def create_correlation_heatmap(df, figures_dir):
-    """Create a heatmap showing correlations between key variables"""
-    # Create a copy for encoding
-    df_corr = df.copy()
-    
-    # Select relevant columns
-    key_columns = ['Age']
-    
-    # Check if other columns exist in the dataset
-    for col in ['Histopathological diagnosis', 'Compalints', 'Drug history', 'correlation with LMP']:
-        if col in df_corr.columns:
-            # Convert categorical columns to numerical using factorize
-            df_corr[col] = pd.factorize(df_corr[col])[0]
-            key_columns.append(col)
+    """
+    Create a heatmap of associations between key variables
+
+    The variables are nominal, so Pearson correlation of their factorized codes
+    would be meaningless; Cramér's V from the chi-square test is shown instead.
+    """
+    from association_stats import association_matrix, compute_associations
+
+    associations = compute_associations(df, permute='none')
+    association = association_matrix(associations, 'cramers_v')
     
-    # Calculate correlation
     plt.figure(figsize=(12, 10))
-    correlation_matrix = df_corr[key_columns].corr()
     
     # Create mask for the upper triangle
-    mask = np.triu(np.ones_like(correlation_matrix, dtype=bool))
+    mask = np.triu(np.ones_like(association, dtype=bool))
     
     # Create heatmap with annotations
     heatmap = sns.heatmap(
-        correlation_matrix, 
+        association, 
         mask=mask,
         annot=True, 
         cmap='coolwarm', 
         fmt=".2f",
+        vmin=0,
+        vmax=1,
         linewidths=0.5,
-        cbar_kws={"shrink": 0.8}
+        cbar_kws={"shrink": 0.8, "label": "Cramér's V"}
     )
     
-    plt.title('Correlation Heatmap of Key Variables', pad=20)
+    plt.title("Association Heatmap of Key Variables (Cramér's V)", pad=20)
     plt.xticks(rotation=45)
     plt.tight_layout()
     
@@ -650,11 +802,26 @@ def create_drug_history_impact_chart(df, figures_dir):
         normalize='index'
     ) * 100  # Convert to percentage
     
+    # Bootstrap 95% confidence intervals for the within-diagnosis percentages
+    _, ci_low, ci_high = ci_frames(
+        bootstrap_crosstab(df_subset, 'Histopathological diagnosis', 'Drug history'),
+        'Histopathological diagnosis', 'Drug history'
+    )
+    ci_low = ci_low.reindex(index=cross_tab.index, columns=cross_tab.columns) * 100
+    ci_high = ci_high.reindex(index=cross_tab.index, columns=cross_tab.columns) * 100
+    
     # Plot the data
-    plt.figure(figsize=(14, 10))
-    cross_tab.plot(kind='bar', stacked=False, rot=45)
+    ax = cross_tab.plot(kind='bar', stacked=False, rot=45, figsize=(14, 10))
+    for container, column in zip(ax.containers, cross_tab.columns):
+        ax.errorbar(
+            [p.get_x() + p.get_width() / 2 for p in container.patches],
+            cross_tab[column].values,
+            yerr=[(cross_tab[column] - ci_low[column]).clip(lower=0).values,
+                  (ci_high[column] - cross_tab[column]).clip(lower=0).values],
+            fmt='none', ecolor='black', elinewidth=0.8, capsize=3
+        )
     
-    plt.title('Impact of Hormonal Intake on Histopathological Diagnoses')
+    plt.title('Impact of Hormonal Intake on Histopathological Diagnoses (95% bootstrap CI)')
     plt.xlabel('Histopathological Diagnosis')
     plt.ylabel('Percentage (%)')
     plt.legend(title='Drug History')
@@ -742,9 +909,8 @@ def create_sankey_diagram(df, figures_dir):
             height=800,
         )
         
-        # Save as interactive HTML
-        html_path = os.path.join(figures_dir, 'age_to_diagnosis_sankey.html')
-        fig.write_html(html_path)
+        # Save as a compact JSON spec plus an HTML page using the shared plotly runtime
+        save_interactive_figure(fig, figures_dir, 'age_to_diagnosis_sankey')
         print(f"✓ Generated interactive Sankey diagram 'age_to_diagnosis_sankey.html'")
         
         # Also save as PNG for static view
@@ -761,8 +927,8 @@ def create_chord_diagram(df, figures_dir):
         # Focus on top categories for clarity
         top_diagnoses = df['Histopathological diagnosis'].value_counts().nlargest(5).index.tolist()
         
-        # Determine complaint column name
-        complaint_col = 'Compalints' if 'Compalints' in df.columns else 'Complaints'
+        # The raw 'Compalints' header is canonicalized by load_and_clean_data
+        complaint_col = 'Complaints'
         
         if complaint_col not in df.columns:
             print(f"Warning: No column found for complaints. Skipping chord diagram.")
@@ -821,7 +987,7 @@ def create_chord_diagram(df, figures_dir):
         
         # Save the figure
         output_path = os.path.join(figures_dir, 'diagnosis_complaint_relationships.png')
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
+        plt.savefig(output_path, bbox_inches='tight')
         plt.close()
         print(f"✓ Generated 'diagnosis_complaint_relationships.png'")
     except Exception as e:
@@ -862,9 +1028,8 @@ def create_sunburst_chart(df, figures_dir):
             height=1000
         )
         
-        # Save as interactive HTML
-        html_path = os.path.join(figures_dir, 'diagnosis_hierarchy_sunburst.html')
-        fig.write_html(html_path)
+        # Save as a compact JSON spec plus an HTML page using the shared plotly runtime
+        save_interactive_figure(fig, figures_dir, 'diagnosis_hierarchy_sunburst')
         print(f"✓ Generated interactive sunburst chart 'diagnosis_hierarchy_sunburst.html'")
         
         # Also save as PNG
@@ -875,5 +1040,75 @@ def create_sunburst_chart(df, figures_dir):
         print(f"  Warning: Could not generate sunburst chart: {e}")
 
 
+# Chart registry: CLI name -> builder, its extra arguments and the backends it needs
+CHARTS = {
+    'diagnosis_distribution': {
+        'builder': create_diagnosis_distribution_chart,
+        'kwargs': {'use_log_scale': True},
+        'backends': ('matplotlib', 'seaborn', 'plotly'),
+        'columns': ('Histopathological diagnosis',),
+        'description': "Distribution of histopathological diagnoses (log scale)",
+    },
+    'age_distribution': {
+        'builder': create_age_distribution_chart,
+        'kwargs': {},
+        'backends': ('matplotlib', 'seaborn', 'plotly'),
+        'columns': ('Age',),
+        # The builder accepts a precomputed age_density result for the cohort
+        'density': True,
+        'description': "Age distribution of patients",
+    },
+    'complaints': {
+        'builder': create_complaints_chart,
+        'kwargs': {'use_log_scale': True},
+        'backends': ('matplotlib', 'seaborn', 'plotly'),
+        'columns': ('Complaints',),
+        'description': "Common presenting complaints (log scale)",
+    },
+    'diagnosis_by_age': {
+        'builder': create_diagnosis_by_age_chart,
+        'kwargs': {},
+        'backends': ('matplotlib', 'seaborn'),
+        'columns': ('Age Group', 'Histopathological diagnosis'),
+        'description': "Histopathological diagnoses by age group with bootstrap CIs",
+    },
+    'correlation_heatmap': {
+        'builder': create_correlation_heatmap,
+        'kwargs': {},
+        'backends': ('matplotlib', 'seaborn', 'scipy'),
+        'columns': ('Age Group', 'Histopathological diagnosis', 'Complaints', 'Drug history', 'correlation with LMP'),
+        'description': "Association heatmap of key variables (Cramér's V)",
+    },
+    'sankey': {
+        'builder': create_sankey_diagram,
+        'kwargs': {},
+        'backends': ('plotly',),
+        'columns': ('Age Group', 'Histopathological diagnosis'),
+        'description': "Sankey diagram from age groups to diagnoses",
+    },
+    'drug_history_impact': {
+        'builder': create_drug_history_impact_chart,
+        'kwargs': {},
+        'backends': ('matplotlib', 'seaborn'),
+        'columns': ('Histopathological diagnosis', 'Drug history'),
+        'description': "Drug history impact on diagnoses with bootstrap CIs",
+    },
+    'chord': {
+        'builder': create_chord_diagram,
+        'kwargs': {},
+        'backends': ('matplotlib', 'seaborn', 'networkx'),
+        'columns': ('Histopathological diagnosis', 'Complaints'),
+        'description': "Network of diagnosis-complaint relationships",
+    },
+    'sunburst': {
+        'builder': create_sunburst_chart,
+        'kwargs': {},
+        'backends': ('plotly',),
+        'columns': ('Age Group', 'Histopathological diagnosis', 'Drug history'),
+        'description': "Sunburst of the diagnosis hierarchy",
+    },
+}
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
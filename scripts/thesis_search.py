@@ -0,0 +1,182 @@
+"""Server-side search over the thesis index built by build_thesis_index.py.
+
+Mirrors the ranking used by the dashboard's "Ask the Thesis" feature
+(TF-IDF cosine similarity) so the dashboard server can answer queries
+directly, and selects answer sentences from the sentence-level sub-index.
+Misspelled query words are corrected with the spelling table written next to
+the index (see spelling.py) before they are scored.
+
+Usage:
+  python thesis_search.py "What were the exclusion criteria?"
+"""
+
+from __future__ import annotations
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from build_thesis_index import OUTPUT_PATH, PLAIN_NORMALIZATION, published_index_path, tokenize
+from spelling import SpellCorrector
+
+MAX_PASSAGES = 5
+ANSWER_SENTENCES = 3
+SCORE_THRESHOLD = 0.05  # ignore extremely low similarity passages
+
+
+class ThesisSearch:
+    """In-memory TF-IDF retrieval over a loaded thesis index."""
+
+    def __init__(self, index: Dict, directory: Path | None = None):
+        self.meta = index.get("meta", {})
+        self.documents: List[Dict] = index.get("documents", [])
+        self.idf: Dict[str, float] = index.get("idf", {})
+        # Queries must go through the same token pipeline the index was built with
+        self.normalization: Dict = self.meta.get("normalization") or PLAIN_NORMALIZATION
+        self.speller: Optional[SpellCorrector] = None
+        spelling = self.meta.get("spelling")
+        if spelling and directory is not None and (Path(directory) / spelling["file"]).exists():
+            self.speller = SpellCorrector.load(Path(directory) / spelling["file"])
+        self._compile()
+
+    def _compile(self):
+        """Precompute what rank() scores against; backends override this with their own structures."""
+        # Passage TF-IDF weights and norms are fixed for an index, so compute them once
+        self._weights: List[Dict[str, float]] = []
+        self._norms: List[float] = []
+        for doc in self.documents:
+            weights = {t: tf * self.idf.get(t, 0.0) for t, tf in doc["tf"].items()}
+            self._weights.append(weights)
+            self._norms.append(math.sqrt(sum(w * w for w in weights.values())) or 1.0)
+
+    @classmethod
+    def load(cls, path: Path = OUTPUT_PATH) -> "ThesisSearch":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")), Path(path).parent)
+
+    def query_vector(self, tokens: List[str]) -> Dict[str, float]:
+        counts: Dict[str, int] = {}
+        for t in tokens:
+            counts[t] = counts.get(t, 0) + 1
+        total = len(tokens) or 1
+        return {t: (c / total) * self.idf.get(t, 0.0) for t, c in counts.items()}
+
+    def search(self, query: str, k: int = MAX_PASSAGES) -> List[Dict]:
+        """Return the top-k passages as dicts with their cosine score."""
+        return [self._result(i, score) for score, i in self.rank(self.tokenize(query), k)]
+
+    def tokenize(self, text: str) -> List[str]:
+        return tokenize(text, self.normalization, self.speller.correct if self.speller else None)
+
+    def corrections(self, text: str) -> Dict[str, str]:
+        """Misspelled words of a query and the words they are corrected to."""
+        if self.speller is None:
+            return {}
+        found = {}
+        for word in tokenize(text, dict(self.normalization, stem=False)):
+            correction = self.speller.correction(word)
+            if correction:
+                found[word] = correction
+        return found
+
+    def rank(self, tokens: List[str], k: int = MAX_PASSAGES) -> List[tuple]:
+        """Return (score, document_number) pairs for the top-k passages."""
+        qvec = self.query_vector(tokens)
+        qnorm = math.sqrt(sum(v * v for v in qvec.values())) or 1.0
+        scored = []
+        for i, weights in enumerate(self._weights):
+            dot = sum(qw * weights[t] for t, qw in qvec.items() if t in weights)
+            score = dot / (qnorm * self._norms[i])
+            if score > SCORE_THRESHOLD:
+                scored.append((score, i))
+        scored.sort(key=lambda r: -r[0])
+        return scored[:k]
+
+    def _result(self, i: int, score: float) -> Dict:
+        doc = self.documents[i]
+        return {
+            "id": doc["id"],
+            "file": doc["file"],
+            "section": doc.get("section"),
+            "section_path": doc.get("section_path"),
+            "offset": doc.get("offset"),
+            "sources": doc.get("sources"),
+            "text": doc["text"],
+            "score": round(score, 6),
+        }
+
+    def best_sentence(self, doc: Dict, query_tokens: List[str]) -> Optional[Dict]:
+        """Pick the sentence of a passage with the largest IDF-weighted query overlap.
+
+        Uses the sentence postings emitted by the index builder, so no text is
+        re-split or re-tokenized at query time.
+        """
+        postings = doc.get("sentence_postings")
+        if not postings:
+            return None
+        weights: Dict[int, float] = {}
+        for t in set(query_tokens):
+            for s in postings.get(t, ()):
+                weights[s] = weights.get(s, 0.0) + self.idf.get(t, 0.0)
+        if not weights:
+            return None
+        best = min(weights, key=lambda s: (-weights[s], s))
+        start, end = doc["sentences"][best]
+        return {"sentence": doc["text"][start:end], "offsets": [start, end], "weight": round(weights[best], 6)}
+
+    def answer(self, query: str, k: int = MAX_PASSAGES, sentences: int = ANSWER_SENTENCES) -> Dict:
+        """Search and compose ranked answer sentences (one per top passage)."""
+        query_tokens = self.tokenize(query)
+        ranked = self.rank(query_tokens, k)
+        passages = [self._result(i, score) for score, i in ranked]
+        answer = []
+        seen = set()
+        for rank, (_, i) in enumerate(ranked):
+            if len(answer) >= sentences:
+                break
+            best = self.best_sentence(self.documents[i], query_tokens)
+            if best and best["sentence"] not in seen:
+                seen.add(best["sentence"])
+                best.update({"source": passages[rank]["id"], "source_rank": rank + 1})
+                answer.append(best)
+        return {"query": query, "tokens": query_tokens, "corrections": self.corrections(query),
+                "passages": passages, "sentences": answer}
+
+
+def load_search(path: Path | None = None, backend: str = "auto") -> ThesisSearch:
+    """Load the index (default: the published version) with the requested scoring backend.
+
+    backend: "python" (dict scoring), "sparse" (SciPy CSR, see sparse_search.py),
+    "lsa" (sparse blended with LSA vectors, see lsa_search.py) or "auto" (lsa
+    when the index was built with --lsa and numpy/scipy are installed, sparse
+    otherwise, and python without numpy/scipy).
+    """
+    path = Path(path or published_index_path())
+    if backend in ("auto", "sparse", "lsa"):
+        try:
+            from lsa_search import LsaThesisSearch
+            from sparse_search import SparseThesisSearch
+        except ImportError:
+            if backend != "auto":
+                raise
+        else:
+            index = json.loads(path.read_text(encoding="utf-8"))
+            if backend == "lsa" or (backend == "auto" and index.get("meta", {}).get("lsa")):
+                return LsaThesisSearch(index, path.parent)
+            return SparseThesisSearch(index, path.parent)
+    return ThesisSearch.load(path)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('Usage: python thesis_search.py "your question"')
+        sys.exit(1)
+    result = ThesisSearch.load().answer(" ".join(sys.argv[1:]))
+    for i, s in enumerate(result["sentences"], 1):
+        print(f"[S{i}] {s['sentence']} ({s['source']})")
+    for p in result["passages"]:
+        print(f"  {p['score']:.3f}  {p['id']}  {p['section'] or p['file']}")
+
+
+if __name__ == "__main__":
+    main()
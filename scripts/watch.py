@@ -0,0 +1,340 @@
+"""
+Watch Mode: Incremental Rebuilds on File Changes
+
+Keeps the published index and figures in step with the sources while you
+edit. manuscript/, data/ and figures/ are watched with inotify (through libc,
+so no extra package is needed) or, where inotify is unavailable, by polling
+file modification times. A burst of changes (an editor's save, a copied
+folder) is collected until DEBOUNCE_SECONDS pass without another change and
+then handled as one batch:
+
+- manuscript/: the index is rebuilt, re-parsing only the files whose content
+  changed; the other files' passages (their index shards) are kept in memory
+  from the previous build
+- data/ (the dataset and label_mappings.json): the dataset is reloaded and
+  only the charts that read a column whose values changed are re-rendered
+- figures/: files edited by hand are published as a new figures version;
+  changes made by publishing itself (the mirror of a version) are ignored
+
+Every rebuild is published as a new version (publish.py). A running
+enhanced_server.py hot-swaps to it and pushes an event naming the changed
+manuscript files or figures to open dashboards (/api/events), which refetch
+only those.
+
+Usage:
+  python watch.py
+  python watch.py --poll --debounce 1.0
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import filecmp
+import hashlib
+import os
+import select
+import shutil
+import struct
+import sys
+import time
+from pathlib import Path
+
+from build_thesis_index import (DEFAULT_DEDUP_THRESHOLD, DEFAULT_LSA_DIMS, MANUSCRIPT_DIR, NORMALIZATION, SOURCE_SUFFIXES,
+                                build_documents, build_index, publish_index)
+from label_canonicalizer import DEFAULT_MAPPING_PATH
+from publish import FIGURES_ARTIFACT, current_dir, read_pointer, staged_version
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DATA_PATH = ROOT / "data" / "Masterchart.csv"
+DATA_DIR = ROOT / "data"
+FIGURES_DIR = ROOT / "figures"
+
+DEBOUNCE_SECONDS = 0.5
+# A batch is handled after this long even if changes keep arriving
+MAX_BATCH_SECONDS = 5.0
+POLL_SECONDS = 1.0
+
+# Editor swap files, Office lock files and atomic_write() temp files
+IGNORED_PREFIXES = (".", "~$")
+IGNORED_SUFFIXES = ("~", ".tmp", ".swp", ".partial")
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+def log(msg):
+    print(f"[watch] {time.strftime('%H:%M:%S')} {msg}", flush=True)
+
+
+class InotifyWatcher:
+    """Recursive inotify watch of directory trees (Linux)"""
+
+    def __init__(self, roots):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.roots = [Path(root) for root in roots]
+        self.dirs = {}  # watch descriptor -> directory
+        for root in self.roots:
+            self._add_tree(root)
+
+    def _add_tree(self, top):
+        """Watch a directory and its subdirectories; returns the files found in them"""
+        found = []
+        for dirpath, _, filenames in os.walk(top):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, os.strerror(errno), dirpath)
+            self.dirs[wd] = Path(dirpath)
+            found.extend(Path(dirpath) / name for name in filenames)
+        return found
+
+    def changes(self, timeout=None):
+        """Paths changed since the last call, waiting up to timeout seconds for the first"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; report the roots so everything is rechecked
+                changed.update(self.roots)
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            directory = self.dirs.get(wd)
+            if directory is None:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and path.is_dir():
+                    changed.update(self._add_tree(path))
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Detect changes by comparing modification times and sizes between scans"""
+
+    def __init__(self, roots, interval=POLL_SECONDS):
+        self.roots = [Path(root) for root in roots]
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for root in self.roots:
+            for dirpath, _, filenames in os.walk(root):
+                for name in filenames:
+                    path = Path(dirpath) / name
+                    try:
+                        stat = path.stat()
+                    except FileNotFoundError:
+                        continue
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout=None):
+        """Paths changed since the last call (one scan after up to interval seconds)"""
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        snapshot = self._scan()
+        changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                   if snapshot.get(path) != self.snapshot.get(path)}
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(roots, poll=False):
+    """An InotifyWatcher, or a PollingWatcher if polling is requested or inotify is unavailable"""
+    if not poll:
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError) as e:
+            log(f"inotify unavailable ({e}); polling every {POLL_SECONDS}s instead")
+    return PollingWatcher(roots)
+
+
+def collect(watcher, debounce=DEBOUNCE_SECONDS, max_wait=MAX_BATCH_SECONDS):
+    """Wait for a change, then gather changes until debounce seconds pass without one"""
+    changed = set()
+    while not changed:
+        changed = {path for path in watcher.changes(POLL_SECONDS) if not ignored(path)}
+    deadline = time.monotonic() + max_wait
+    while time.monotonic() < deadline:
+        more = watcher.changes(debounce)
+        if not more:
+            break
+        changed.update(path for path in more if not ignored(path))
+    return changed
+
+
+def ignored(path):
+    """Temporary and lock files that never affect a build"""
+    return path.name.startswith(IGNORED_PREFIXES) or path.name.endswith(IGNORED_SUFFIXES)
+
+
+def within(path, directory):
+    return path == directory or directory in path.parents
+
+
+def column_digests(df):
+    """Content hash of each column the charts read"""
+    import pandas as pd
+    from thesis_analysis import CHARTS
+
+    columns = {column for chart in CHARTS.values() for column in chart['columns'] if column in df.columns}
+    return {column: hashlib.sha1(pd.util.hash_pandas_object(df[column], index=False).to_numpy().tobytes()).hexdigest()
+            for column in sorted(columns)}
+
+
+class Rebuilder:
+    """Rebuild and publish what a batch of changed files affects"""
+
+    def __init__(self, data_path=DEFAULT_DATA_PATH, normalization=NORMALIZATION,
+                 dedup_threshold=DEFAULT_DEDUP_THRESHOLD, lsa_dims=None):
+        self.data_path = Path(data_path).resolve()
+        self.data_inputs = {self.data_path, Path(DEFAULT_MAPPING_PATH).resolve()}
+        self.normalization = normalization
+        self.dedup_threshold = dedup_threshold
+        self.lsa_dims = lsa_dims
+        self.shards = {}      # index shards per manuscript file, see build_documents
+        self.digests = None   # column digests of the dataset the figures were rendered from
+
+    def prime(self):
+        """Parse the manuscript and hash the dataset once, so the first rebuild is incremental"""
+        from thesis_analysis import load_and_clean_data
+        build_documents(self.normalization, self.shards)
+        self.digests = column_digests(load_and_clean_data(str(self.data_path)))
+        log(f"Primed {len(self.shards)} index shards and {len(self.digests)} chart columns")
+
+    def handle(self, changed):
+        """Rebuild for one batch of changed paths"""
+        manuscript = sorted(p for p in changed if within(p, MANUSCRIPT_DIR)
+                            and (p == MANUSCRIPT_DIR or p.suffix.lower() in SOURCE_SUFFIXES))
+        data = [p for p in changed if p.resolve() in self.data_inputs or p == DATA_DIR]
+        figures = [p for p in changed if within(p, FIGURES_DIR)]
+        # Hand edits go first: publishing mirrors a version over figures/
+        if figures:
+            self.publish_figure_edits(figures)
+        if manuscript:
+            self.rebuild_index(manuscript)
+        if data:
+            self.rebuild_charts()
+
+    def rebuild_index(self, paths):
+        log(f"Manuscript changed: {', '.join(p.name for p in paths)}")
+        start = time.perf_counter()
+        data = build_index(self.normalization, self.dedup_threshold, self.normalization["min_df"],
+                           self.normalization["max_df"], shards=self.shards)
+        version = publish_index(data, self.lsa_dims)
+        log(f"Index version {version} published in {time.perf_counter() - start:.2f}s")
+
+    def rebuild_charts(self):
+        from thesis_analysis import (CHARTS, charts_using, check_required_libraries, load_and_clean_data,
+                                     publish_charts, set_plot_style)
+        start = time.perf_counter()
+        df = load_and_clean_data(str(self.data_path))
+        digests = column_digests(df)
+        previous = self.digests or {}
+        columns = [column for column, digest in digests.items() if previous.get(column) != digest]
+        self.digests = digests
+        charts = charts_using(columns)
+        if not charts:
+            log("Dataset changed, but no chart input column did")
+            return
+        log(f"Columns changed: {', '.join(columns)}; re-rendering {', '.join(charts)}")
+        check_required_libraries(charts)
+        if any('matplotlib' in CHARTS[name]['backends'] for name in charts):
+            set_plot_style()
+        version = publish_charts(df, charts)
+        log(f"Figures version {version} published in {time.perf_counter() - start:.2f}s")
+
+    def publish_figure_edits(self, paths):
+        current = current_dir(FIGURES_ARTIFACT)
+        if FIGURES_DIR in paths:
+            paths = [p for p in FIGURES_DIR.rglob("*") if p.is_file() and not ignored(p)]
+        edits = []
+        for path in paths:
+            relative = path.relative_to(FIGURES_DIR)
+            published = current / relative if current is not None else None
+            if path.is_file():
+                if published is not None and published.is_file() and filecmp.cmp(path, published, shallow=False):
+                    continue  # already the published content, e.g. written by the mirror
+                edits.append(relative)
+            elif published is not None and published.exists():
+                edits.append(relative)
+        if not edits:
+            return
+        log(f"Figures edited: {', '.join(p.as_posix() for p in edits)}")
+        with staged_version(FIGURES_ARTIFACT) as staging:
+            for relative in edits:
+                source, target = FIGURES_DIR / relative, staging / relative
+                if source.is_file():
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copy2(source, target)
+                elif target.exists():
+                    target.unlink()
+        log(f"Figures version {read_pointer(FIGURES_ARTIFACT)['version']} published")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the index and figures when their sources change")
+    parser.add_argument("--data", default=str(DEFAULT_DATA_PATH), help="Path to Masterchart.csv or the .xlsx register")
+    parser.add_argument("--poll", action="store_true", help="Poll modification times instead of using inotify")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS,
+                        help="Quiet period that ends a burst of changes, in seconds (default: %(default)s)")
+    parser.add_argument("--lsa", type=int, nargs="?", const=DEFAULT_LSA_DIMS, metavar="DIMS",
+                        help="Also store LSA passage vectors in each index version")
+    args = parser.parse_args()
+
+    rebuilder = Rebuilder(args.data, lsa_dims=args.lsa)
+    rebuilder.prime()
+    watcher = create_watcher([MANUSCRIPT_DIR, DATA_DIR, FIGURES_DIR], poll=args.poll)
+    log(f"Watching manuscript/, data/ and figures/ ({type(watcher).__name__}); press Ctrl+C to stop")
+    try:
+        while True:
+            changed = collect(watcher, args.debounce)
+            try:
+                rebuilder.handle(changed)
+            except Exception as e:
+                # Keep watching: the next save (e.g. of a half-written file) retries
+                log(f"Rebuild failed: {e}")
+    except KeyboardInterrupt:
+        log("Stopped")
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Streaming Ingestion of Masterchart Workbooks
+
+Reads data/Masterchart.xlsx (the authoritative register) directly instead of a
+hand-exported CSV. Workbooks are opened with openpyxl in read-only mode and
+streamed row by row, so memory stays bounded by CHUNK_ROWS no matter how large
+the register is:
+
+- Header detection: the first row (within HEADER_SCAN_ROWS) containing the
+  header keyword is the header; rows above it and unnamed columns are skipped
+- usecols-style selection by header name, position or predicate
+- Multi-sheet workbooks: every sheet with a detectable header is appended,
+  matched by header name, with a 'Source sheet' column
+- Column types are inferred from the first chunk (int, float, datetime or
+  string) and every chunk is written to a typed Parquet snapshot with pyarrow
+
+Excel converts typed dates such as "09-03-23" into US month-first datetimes,
+while the register is written day-first. Datetime cells in TEXT_COLUMNS are
+therefore rendered back to the text that was typed, and left to
+clinical_parsers.py to interpret like the CSV export.
+
+Requires openpyxl and pyarrow (pip install openpyxl pyarrow).
+
+Usage:
+  python xlsx_ingest.py
+  python xlsx_ingest.py --workbook partner_register.xlsx --sheets Sheet1 Sheet3 --usecols "Histopathological diagnosis" Age LMP
+"""
+
+import argparse
+import datetime
+import numbers
+import os
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_WORKBOOK_PATH = os.path.join(ROOT, "data", "Masterchart.xlsx")
+
+HEADER_KEYWORD = 'Histopathological'
+HEADER_SCAN_ROWS = 20
+CHUNK_ROWS = 50_000
+SHEET_COLUMN = 'Source sheet'
+
+# Free-text columns whose cells Excel may have auto-converted to dates
+TEXT_COLUMNS = ('LMP',)
+
+
+def snapshot_path(workbook_path):
+    """Default Parquet snapshot location next to the workbook"""
+    return os.path.splitext(workbook_path)[0] + '.parquet'
+
+
+def detect_header(rows, keyword=HEADER_KEYWORD, max_scan=HEADER_SCAN_ROWS):
+    """
+    Find the header row in a row iterator
+
+    Returns:
+        (header, rows) where rows continues after the header, or (None, None)
+        if no row within max_scan contains the keyword
+    """
+    needle = keyword.lower()
+    rows = iter(rows)
+    for i, row in enumerate(rows):
+        if i >= max_scan:
+            break
+        if any(isinstance(v, str) and needle in v.lower() for v in row):
+            return [v.strip() if isinstance(v, str) else v for v in row], rows
+    return None, None
+
+
+def select_columns(header, usecols=None):
+    """
+    Resolve a usecols spec against a header
+
+    Args:
+        header: Header row values (None for unnamed columns)
+        usecols: None (all named columns), a list of names and/or positions,
+            or a predicate called with each header name
+
+    Returns:
+        List of (position, name) pairs
+    """
+    named = [(j, name) for j, name in enumerate(header) if name not in (None, '')]
+    if usecols is None:
+        return named
+    if callable(usecols):
+        return [(j, name) for j, name in named if usecols(name)]
+    by_name = {name: j for j, name in reversed(named)}
+    selected = []
+    for col in usecols:
+        if isinstance(col, int):
+            selected.append((col, header[col] if col < len(header) and header[col] else f'Column {col}'))
+        elif col in by_name:
+            selected.append((by_name[col], col))
+        else:
+            raise KeyError(f"Column '{col}' not found in header: {[n for _, n in named]}")
+    return selected
+
+
+def _render_typed_date(value):
+    """Text Excel parsed as month-first: 2023-09-03 was typed as 09-03-23"""
+    return f"{value.month:02d}-{value.day:02d}-{value.year % 100:02d}"
+
+
+def _cell_text(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def infer_type(values):
+    """Column type of a chunk of cell values: int, float, datetime or string"""
+    present = [v for v in values if v is not None]
+    if not present:
+        return 'string'
+    if all(isinstance(v, numbers.Number) and not isinstance(v, bool) for v in present):
+        return 'int' if all(float(v).is_integer() for v in present) else 'float'
+    if all(isinstance(v, (datetime.datetime, datetime.date)) for v in present):
+        return 'datetime'
+    return 'string'
+
+
+def to_arrow(values, kind, name):
+    """Convert cell values to a typed pyarrow array"""
+    import pyarrow as pa
+
+    if kind == 'string':
+        return pa.array([None if v is None else _cell_text(v) for v in values], pa.string())
+    if kind == 'datetime':
+        return pa.array(values, pa.timestamp('us'))
+    try:
+        if kind == 'int':
+            return pa.array([None if v is None else int(v) for v in values], pa.int64())
+        return pa.array([None if v is None else float(v) for v in values], pa.float64())
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Column '{name}' was inferred as {kind} from the first chunk but contains "
+                         f"other values; pass dtypes={{'{name}': 'string'}}") from e
+
+
+def iter_sheet_chunks(path, sheets=None, usecols=None, keyword=HEADER_KEYWORD, chunk_rows=CHUNK_ROWS):
+    """
+    Stream (sheet, column names, column value lists) chunks from a workbook
+
+    Sheets without a detectable header (e.g. empty sheets) are skipped.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in sheets or workbook.sheetnames:
+            rows = workbook[sheet].iter_rows(values_only=True)
+            header, rows = detect_header(rows, keyword)
+            if header is None:
+                print(f"[xlsx_ingest] Skipping sheet '{sheet}': no header containing '{keyword}'")
+                continue
+            selected = select_columns(header, usecols)
+            names = [name for _, name in selected]
+            text = [name in TEXT_COLUMNS for name in names]
+            columns = [[] for _ in selected]
+            for row in rows:
+                values = [row[j] if j < len(row) else None for j, _ in selected]
+                if all(v is None or (isinstance(v, str) and not v.strip()) for v in values):
+                    continue
+                for c, v in enumerate(values):
+                    if text[c] and isinstance(v, datetime.datetime):
+                        v = _render_typed_date(v)
+                    columns[c].append(v)
+                if len(columns[0]) >= chunk_rows:
+                    yield sheet, names, columns
+                    columns = [[] for _ in selected]
+            if columns and columns[0]:
+                yield sheet, names, columns
+    finally:
+        workbook.close()
+
+
+def ingest_workbook(path=DEFAULT_WORKBOOK_PATH, output=None, sheets=None, usecols=None,
+                    dtypes=None, keyword=HEADER_KEYWORD, chunk_rows=CHUNK_ROWS):
+    """
+    Stream a workbook into a typed Parquet snapshot
+
+    Args:
+        path: .xlsx workbook
+        output: Parquet path (default: next to the workbook)
+        sheets: Sheet names to read (default: all)
+        usecols: Column selection, see select_columns
+        dtypes: Optional {column: 'int'|'float'|'datetime'|'string'} overrides
+        keyword: Text identifying the header row
+        chunk_rows: Rows buffered per written row group
+
+    Returns:
+        Path of the snapshot
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    output = output or snapshot_path(path)
+    tmp_path = output + '.tmp'
+    writer = None
+    schema_names = None
+    kinds = dict(dtypes or {})
+    total = 0
+    try:
+        for sheet, names, columns in iter_sheet_chunks(path, sheets, usecols, keyword, chunk_rows):
+            if schema_names is None:
+                # The first sheet fixes the snapshot columns; later sheets are matched by name
+                schema_names = names
+                for name, values in zip(names, columns):
+                    kinds.setdefault(name, infer_type(values))
+            by_name = dict(zip(names, columns))
+            extra = [n for n in names if n not in schema_names]
+            if extra:
+                print(f"[xlsx_ingest] Sheet '{sheet}': ignoring columns not in the first sheet: {extra}")
+            length = len(columns[0])
+            arrays = [to_arrow(by_name.get(name, [None] * length), kinds[name], name) for name in schema_names]
+            arrays.append(pa.array([sheet] * length, pa.string()))
+            batch = pa.RecordBatch.from_arrays(arrays, names=schema_names + [SHEET_COLUMN])
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, batch.schema)
+            writer.write_batch(batch)
+            total += length
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError(f"No sheet in '{path}' has a header containing '{keyword}'")
+    os.replace(tmp_path, output)
+    print(f"[xlsx_ingest] Wrote {total} rows to {output}")
+    return output
+
+
+def load_masterchart(path=DEFAULT_WORKBOOK_PATH, columns=None, refresh=False, **ingest_kwargs):
+    """
+    Load a workbook as a DataFrame through its Parquet snapshot
+
+    The snapshot is (re)built when missing, older than the workbook or when
+    refresh is set; otherwise only the snapshot is read.
+    """
+    snapshot = ingest_kwargs.pop('output', None) or snapshot_path(path)
+    stale = (not os.path.exists(snapshot)
+             or os.path.getmtime(snapshot) < os.path.getmtime(path))
+    if refresh or stale:
+        ingest_workbook(path, snapshot, **ingest_kwargs)
+    return pd.read_parquet(snapshot, columns=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream an .xlsx register into a Parquet snapshot")
+    parser.add_argument("--workbook", default=DEFAULT_WORKBOOK_PATH, help="Path to the .xlsx register")
+    parser.add_argument("--output", help="Parquet snapshot path (default: next to the workbook)")
+    parser.add_argument("--sheets", nargs="+", help="Sheets to read (default: all)")
+    parser.add_argument("--usecols", nargs="+", help="Header names to keep (default: all named columns)")
+    parser.add_argument("--header-keyword", default=HEADER_KEYWORD, help="Text identifying the header row")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    output = ingest_workbook(args.workbook, args.output, args.sheets, args.usecols,
+                             keyword=args.header_keyword, chunk_rows=args.chunk_rows)
+    df = pd.read_parquet(output)
+    print(df.dtypes.to_string())
+    print(f"\n✓ Snapshot '{output}': {len(df)} rows x {len(df.columns)} columns")
+
+
+if __name__ == "__main__":
+    main()